@@ -15,7 +15,11 @@ import matplotlib.pyplot as plt
 from matplotlib import colors
 
 from OccupancyGridMap import OccupancyGridMap
-from MapFileUnpacker import Unpacker
+from MapCache import MapCache
+
+# Four Directions, up, down, left, right
+NEAR_SQUARES = ((0, -1), (0, 1), (-1, 0), (1, 0))
+DIAGONAL_SQUARES = ((1, 1), (1, -1), (-1, 1), (-1, -1))
 
 
 class NodeStar:
@@ -40,7 +44,7 @@ class NodeStar:
         return self.f > other.f
 
 
-def return_path(current_node):
+def return_path(current_node, path_file=None):
     path = []
     current = current_node
     i = 0
@@ -49,11 +53,48 @@ def return_path(current_node):
         current = current.parent
 
     path = path[::-1]
+    path = annotate_path(path)
+    save_path(path, path_file)
+    return path  # Reversed path
+
+
+def save_path(path, path_file):
+    """
+    Saves a turn annotated path as a .csv file, to be used in sending data.
+
+    Args:
+        path (list of [x, y, angle]): The path.
+        path_file (string):           The .csv file, or None to not save.
+    """
+    if path_file is not None:
+        np.savetxt(path_file, path, delimiter=',')
+
+
+def annotate_path(path):
+    """
+    Adds the heading (0, 90, 180 or 270 degrees, or the diagonals between them
+    for 8-connected paths) to every point of an index path.
+
+    The heading of a point is the direction of travel to the next point, the
+    last point keeps the heading of the point before it.
+
+    Args:
+        path (list of (x, y)): The index points of the path, start to end.
+
+    Returns:
+        path (list of [x, y, angle]): The turn annotated path.
+    """
+    path = [list(pos) for pos in path]
+    if len(path) == 1:
+        return [[path[0][0], path[0][1], 0]]
 
     for i in range(len(path) - 1):
         pos = path[i]
         next_pos = path[i + 1]
-        if next_pos[0] - pos[0] == 0:
+        if next_pos[0] != pos[0] and next_pos[1] != pos[1]:
+            # Diagonal step of an 8-connected path
+            angle = int(np.degrees(np.arctan2(next_pos[1] - pos[1], next_pos[0] - pos[0]))) % 360
+        elif next_pos[0] - pos[0] == 0:
             if next_pos[1] > pos[1]:
                 angle = 90
             else:
@@ -65,11 +106,10 @@ def return_path(current_node):
                 angle = 180
         path[i] = [pos[0], pos[1], angle]
     path[-1] = [path[-1][0], path[-1][1], path[-2][2]]
-    np.savetxt('../data/path.csv', path, delimiter=',')  # To be used in sending data
-    return path  # Reversed path
+    return path
 
 
-def astar(map, start, end):
+def astar(map, start, end, path_file=None):
     start = (start[1], start[0])
     end = (end[1], end[0])
     # Create start and end nodes
@@ -101,7 +141,7 @@ def astar(map, start, end):
             # If we hit this point, it technically did not find a path so
             # Return the path
             print("Inefficient Path")
-            return return_path(current_node)
+            return return_path(current_node, path_file)
 
         # Grab current node off of the heap
         current_node = heapq.heappop(open_list)
@@ -109,7 +149,7 @@ def astar(map, start, end):
 
         # If goal is found, return the path
         if current_node == end_node:
-            return return_path(current_node)
+            return return_path(current_node, path_file)
 
         # Children!
         children = []
@@ -145,20 +185,829 @@ def astar(map, start, end):
     return None
 
 
+def astar_array(map, start, end, path_file=None):
+    """
+    Array backed A* search on an OccupancyGridMap.
+
+    Works directly on the grid_map array using flat cell indices. The g-costs,
+    parents and closed set are preallocated arrays so open/closed membership
+    is O(1), and the open list is a heap of (f, tie, index) tuples with lazy
+    deletion of stale entries.
+
+    Args:
+        map (OccupancyGridMap): The map to search.
+        start (tuple of int):   The start index point (x, y).
+        end (tuple of int):     The end index point (x, y).
+        path_file (string):     Optional .csv file to save the path to.
+
+    Returns:
+        path (list of [x, y, angle]): The path, or None if no path exists.
+    """
+    cells = astar_cells(map.free_mask(), start, end)
+    if cells is None:
+        return None
+
+    path = annotate_path(cells)
+    save_path(path, path_file)
+    return path
+
+
+def astar_cells(free, start, end, stats=None):
+    """
+    The A* search used by astar_array, on a boolean mask of free cells.
+
+    Args:
+        free (matrix of bool): The traversable cells, indexed [y, x].
+        start (tuple of int):  The start index point (x, y).
+        end (tuple of int):    The end index point (x, y).
+        stats (dict):          Optional dict to fill with the number of expansions.
+
+    Returns:
+        cells (list of (x, y)): The cells of the path, or None if no path exists.
+    """
+    rows, cols = free.shape
+    sx, sy = int(start[0]), int(start[1])
+    ex, ey = int(end[0]), int(end[1])
+    if not (0 <= sx < cols and 0 <= sy < rows and 0 <= ex < cols and 0 <= ey < rows):
+        return None
+
+    start_i = sy * cols + sx
+    end_i = ey * cols + ex
+
+    # Preallocated search state, accessed through memoryviews for fast scalar indexing
+    free_flat = np.ascontiguousarray(free, dtype=bool).ravel()
+    g_arr = np.full(rows * cols, np.inf)
+    parent_arr = np.full(rows * cols, -1, dtype=np.int64)
+    closed_arr = np.zeros(rows * cols, dtype=bool)
+    free_v, g, parent, closed = (memoryview(free_flat), memoryview(g_arr),
+                                 memoryview(parent_arr), memoryview(closed_arr))
+
+    g[start_i] = 0
+    h = abs(sx - ex) + abs(sy - ey)
+    open_list = [(h, h, start_i)]
+    expansions = 0
+
+    while open_list:
+        f, h, current = heapq.heappop(open_list)
+        if closed[current]:
+            continue  # Stale entry
+        closed[current] = True
+        expansions += 1
+
+        if current == end_i:
+            break
+
+        y, x = divmod(current, cols)
+        child_g = g[current] + 1
+
+        # Four Directions, up, down, left, right
+        for child, valid in ((current - cols, y > 0), (current + cols, y < rows - 1),
+                             (current - 1, x > 0), (current + 1, x < cols - 1)):
+            if not valid or closed[child] or not free_v[child] or child_g >= g[child]:
+                continue
+            g[child] = child_g
+            parent[child] = current
+            cy, cx = divmod(child, cols)
+            h = abs(cx - ex) + abs(cy - ey)
+            heapq.heappush(open_list, (child_g + h, h, child))
+
+    if stats is not None:
+        stats['expansions'] = expansions
+
+    if not closed[end_i]:
+        return None
+
+    cells = []
+    current = end_i
+    while current != -1:
+        y, x = divmod(current, cols)
+        cells.append((x, y))
+        current = parent[current]
+    return cells[::-1]
+
+
+def astar_bidirectional(map, start, end, stats=None, path_file=None):
+    """
+    Bidirectional A* search on an OccupancyGridMap.
+
+    Searches forward from start and backward from end at the same time,
+    always growing the side with the smaller open list, and joins the two
+    searches where they meet. Returns a path as short as astar_array's.
+
+    Args:
+        map (OccupancyGridMap): The map to search.
+        start (tuple of int):   The start index point (x, y).
+        end (tuple of int):     The end index point (x, y).
+        stats (dict):           Optional dict to fill with the number of expansions.
+        path_file (string):     Optional .csv file to save the path to.
+
+    Returns:
+        path (list of [x, y, angle]): The path, or None if no path exists.
+    """
+    cells = bidirectional_cells(map.free_mask(), start, end, stats)
+    if cells is None:
+        return None
+
+    path = annotate_path(cells)
+    save_path(path, path_file)
+    return path
+
+
+def bidirectional_cells(free, start, end, stats=None):
+    """
+    The search used by astar_bidirectional, on a boolean mask of free cells.
+
+    mu is the length of the shortest path found through a cell reached by
+    both searches. Every path shorter than mu must pass through a cell on
+    each open list with f at most its length, so the search stops as soon as
+    mu <= max(min f forward, min f backward).
+
+    Args:
+        free (matrix of bool): The traversable cells, indexed [y, x].
+        start (tuple of int):  The start index point (x, y).
+        end (tuple of int):    The end index point (x, y).
+        stats (dict):          Optional dict to fill with the number of expansions.
+
+    Returns:
+        cells (list of (x, y)): The cells of the path, or None if no path exists.
+    """
+    rows, cols = free.shape
+    sx, sy = int(start[0]), int(start[1])
+    ex, ey = int(end[0]), int(end[1])
+    if not (0 <= sx < cols and 0 <= sy < rows and 0 <= ex < cols and 0 <= ey < rows):
+        return None
+    if not free[ey, ex]:
+        return None
+
+    free_v = memoryview(np.ascontiguousarray(free, dtype=bool).ravel())
+    start_i = sy * cols + sx
+    end_i = ey * cols + ex
+
+    # One set of search state per direction, the backward search heads for start
+    searches = []
+    for origin, (tx, ty) in ((start_i, (ex, ey)), (end_i, (sx, sy))):
+        g_arr = np.full(rows * cols, np.inf)
+        parent_arr = np.full(rows * cols, -1, dtype=np.int64)
+        closed_arr = np.zeros(rows * cols, dtype=bool)
+        g, parent, closed = memoryview(g_arr), memoryview(parent_arr), memoryview(closed_arr)
+        g[origin] = 0
+        oy, ox = divmod(origin, cols)
+        h = abs(ox - tx) + abs(oy - ty)
+        searches.append((g, parent, closed, [(h, h, origin)], tx, ty))
+
+    mu = np.inf if start_i != end_i else 0
+    meet = start_i if start_i == end_i else -1
+    expansions = 0
+
+    while True:
+        # Drop stale entries so the heads of the open lists are exact
+        for _, _, closed, open_list, _, _ in searches:
+            while open_list and closed[open_list[0][2]]:
+                heapq.heappop(open_list)
+        forward_open, backward_open = searches[0][3], searches[1][3]
+        if not forward_open or not backward_open:
+            break
+        if mu <= max(forward_open[0][0], backward_open[0][0]):
+            break
+
+        g, parent, closed, open_list, tx, ty = searches[0 if len(forward_open) <= len(backward_open) else 1]
+        other_g = searches[1][0] if open_list is forward_open else searches[0][0]
+
+        f, h, current = heapq.heappop(open_list)
+        closed[current] = True
+        expansions += 1
+
+        y, x = divmod(current, cols)
+        child_g = g[current] + 1
+
+        # Four Directions, up, down, left, right
+        for child, valid in ((current - cols, y > 0), (current + cols, y < rows - 1),
+                             (current - 1, x > 0), (current + 1, x < cols - 1)):
+            if not valid or closed[child] or not free_v[child] or child_g >= g[child]:
+                continue
+            g[child] = child_g
+            parent[child] = current
+            if child_g + other_g[child] < mu:
+                mu = child_g + other_g[child]
+                meet = child
+            cy, cx = divmod(child, cols)
+            h = abs(cx - tx) + abs(cy - ty)
+            heapq.heappush(open_list, (child_g + h, h, child))
+
+    if stats is not None:
+        stats['expansions'] = expansions
+
+    if meet == -1:
+        return None
+
+    # Join start -> meet from the forward search with meet -> end from the backward one
+    cells = []
+    current = meet
+    while current != -1:
+        y, x = divmod(current, cols)
+        cells.append((x, y))
+        current = searches[0][1][current]
+    cells.reverse()
+    current = searches[1][1][meet]
+    while current != -1:
+        y, x = divmod(current, cols)
+        cells.append((x, y))
+        current = searches[1][1][current]
+    return cells
+
+
+def distance_field(free, goal):
+    """
+    Computes the number of steps from every cell to a goal with a breadth
+    first wavefront over the free mask.
+
+    Every wave is handled as one numpy operation on the flat indexes of the
+    frontier, so the cost is one pass over the reachable cells plus a small
+    overhead per wave.
+
+    Args:
+        free (matrix of bool): The traversable cells, indexed [y, x].
+        goal (tuple of int):   The goal index point (x, y).
+
+    Returns:
+        field (matrix of int32): The steps to the goal with the 4-connected
+                                 moves of astar, -1 where it is unreachable.
+    """
+    rows, cols = free.shape
+    free_flat = np.ascontiguousarray(free, dtype=bool).ravel()
+    field = np.full(rows * cols, -1, dtype=np.int32)
+    gx, gy = int(goal[0]), int(goal[1])
+    if not (0 <= gx < cols and 0 <= gy < rows) or not free_flat[gy * cols + gx]:
+        return field.reshape(rows, cols)
+
+    frontier = np.array([gy * cols + gx])
+    field[frontier] = 0
+    distance = 0
+    while len(frontier):
+        distance += 1
+        x = frontier % cols
+        # Four Directions, up, down, left, right
+        neighbors = np.concatenate((frontier[frontier >= cols] - cols,
+                                    frontier[frontier < (rows - 1) * cols] + cols,
+                                    frontier[x > 0] - 1,
+                                    frontier[x < cols - 1] + 1))
+        neighbors = neighbors[free_flat[neighbors] & (field[neighbors] == -1)]
+        frontier = np.unique(neighbors)
+        field[frontier] = distance
+    return field.reshape(rows, cols)
+
+
+def descend_field(field, start):
+    """
+    Follows a distance field downhill from start to its goal.
+
+    Args:
+        field (matrix of int32): A distance field from distance_field.
+        start (tuple of int):    The start index point (x, y).
+
+    Returns:
+        cells (list of (x, y)): The cells of a shortest path, or None if the
+                                goal can not be reached from start.
+    """
+    rows, cols = field.shape
+    x, y = int(start[0]), int(start[1])
+    if not (0 <= x < cols and 0 <= y < rows) or field[y, x] < 0:
+        return None
+
+    field_v = memoryview(np.ascontiguousarray(field).ravel())
+    current = y * cols + x
+    cells = [(x, y)]
+    while field_v[current] > 0:
+        y, x = divmod(current, cols)
+        downhill = field_v[current] - 1
+        for child, valid in ((current - cols, y > 0), (current + cols, y < rows - 1),
+                             (current - 1, x > 0), (current + 1, x < cols - 1)):
+            if valid and field_v[child] == downhill:
+                current = child
+                break
+        y, x = divmod(current, cols)
+        cells.append((x, y))
+    return cells
+
+
+def astar_hierarchical(map, start, end, level=3, corridor_radius=1, factor=2, mode="all", stats=None,
+                       path_file=None):
+    """
+    Hierarchical A* search on an OccupancyGridMap.
+
+    Finds a path on a coarse level of the map pyramid (see buildPyramid),
+    widens it by corridor_radius coarse cells, and refines it with A* at full
+    resolution inside that corridor only. If the corridor holds no path, or
+    the coarse level holds none, the full resolution map is searched instead,
+    so a path is found whenever astar_array finds one. The refined path is
+    optimal within the corridor, which may make it slightly longer than the
+    path of astar_array.
+
+    Args:
+        map (OccupancyGridMap): The map to search.
+        start (tuple of int):   The start index point (x, y).
+        end (tuple of int):     The end index point (x, y).
+        level (int):            The pyramid level to find the corridor on.
+        corridor_radius (int):  The number of coarse cells to widen the corridor by.
+        factor (int):           The pyramid reduction factor.
+        mode (string):          The pyramid mode, "all" or "any".
+        stats (dict):           Optional dict to fill with search statistics.
+        path_file (string):     Optional .csv file to save the path to.
+
+    Returns:
+        path (list of [x, y, angle]): The path, or None if no path exists.
+    """
+    pyramid = map.buildPyramid(levels=level + 1, factor=factor, mode=mode)
+    free = pyramid[0]
+    coarse = pyramid[level]
+    scale = factor ** level
+    rows, cols = free.shape
+
+    coarse_start = (int(start[0]) // scale, int(start[1]) // scale)
+    coarse_end = (int(end[0]) // scale, int(end[1]) // scale)
+    coarse_stats = {}
+    coarse_cells = None
+    if (0 <= coarse_start[0] < coarse.shape[1] and 0 <= coarse_start[1] < coarse.shape[0] and
+            0 <= coarse_end[0] < coarse.shape[1] and 0 <= coarse_end[1] < coarse.shape[0]):
+        # The blocks around the start and end often hold walls, open them up
+        # so the coarse search can leave them (the fine search checks them)
+        coarse = coarse.copy()
+        for cx, cy in (coarse_start, coarse_end):
+            coarse[max(cy - corridor_radius, 0):cy + corridor_radius + 1,
+                   max(cx - corridor_radius, 0):cx + corridor_radius + 1] = True
+        coarse_cells = astar_cells(coarse, coarse_start, coarse_end, coarse_stats)
+
+    cells = None
+    fine_stats = {}
+    if coarse_cells is not None:
+        # Widen the coarse path into a corridor of coarse cells, one axis at a time
+        corridor = np.zeros(coarse.shape, dtype=bool)
+        coarse_path = np.array(coarse_cells)
+        corridor[coarse_path[:, 1], coarse_path[:, 0]] = True
+        for axis in (0, 1):
+            path_cells = corridor.copy()
+            for d in range(1, min(corridor_radius, corridor.shape[axis] - 1) + 1):
+                head = [slice(None), slice(None)]
+                tail = [slice(None), slice(None)]
+                head[axis], tail[axis] = slice(d, None), slice(None, -d)
+                corridor[tuple(head)] |= path_cells[tuple(tail)]
+                corridor[tuple(tail)] |= path_cells[tuple(head)]
+
+        # Search only the bounding box of the corridor at full resolution
+        cy, cx = np.nonzero(corridor)
+        x0, y0 = cx.min() * scale, cy.min() * scale
+        x1, y1 = min((cx.max() + 1) * scale, cols), min((cy.max() + 1) * scale, rows)
+        corridor = corridor[cy.min():cy.max() + 1, cx.min():cx.max() + 1]
+        corridor = np.repeat(np.repeat(corridor, scale, axis=0), scale, axis=1)
+        window = free[y0:y1, x0:x1] & corridor[:y1 - y0, :x1 - x0]
+
+        cells = astar_cells(window, (start[0] - x0, start[1] - y0),
+                            (end[0] - x0, end[1] - y0), fine_stats)
+        if cells is not None:
+            cells = [(x + x0, y + y0) for x, y in cells]
+
+    fallback = cells is None
+    if fallback:
+        cells = astar_cells(free, start, end, fine_stats)
+
+    if stats is not None:
+        stats['coarse_expansions'] = coarse_stats.get('expansions', 0)
+        stats['expansions'] = fine_stats.get('expansions', 0)
+        stats['fallback'] = fallback
+
+    if cells is None:
+        return None
+
+    path = annotate_path(cells)
+    save_path(path, path_file)
+    return path
+
+
+def astar_jps(map, start, end, diagonal=False, stats=None, path_file=None):
+    """
+    Jump Point Search on an OccupancyGridMap.
+
+    Returns the same path as astar_array (the 4-connected moves of
+    near_squares), but only expands the cells where a path may have to turn,
+    skipping the rest of long straight corridors and open rooms. With
+    diagonal set, the search is 8-connected instead, where a diagonal step
+    needs both of the cells it passes between to be unoccupied.
+
+    Args:
+        map (OccupancyGridMap): The map to search.
+        start (tuple of int):   The start index point (x, y).
+        end (tuple of int):     The end index point (x, y).
+        diagonal (bool):        Allow diagonal moves.
+        stats (dict):           Optional dict to fill with the number of expansions.
+        path_file (string):     Optional .csv file to save the path to.
+
+    Returns:
+        path (list of [x, y, angle]): The path, or None if no path exists.
+    """
+    cells = jps_cells(map.free_mask(), start, end, diagonal, stats)
+    if cells is None:
+        return None
+
+    path = annotate_path(cells)
+    save_path(path, path_file)
+    return path
+
+
+def jps_cells(free, start, end, diagonal=False, stats=None):
+    """
+    The Jump Point Search used by astar_jps, on a boolean mask of free cells.
+
+    4-connected jumps follow the canonical order of moving vertically as
+    early as possible: a horizontal move may only turn where an obstacle
+    forces it, and a vertical move stops wherever a horizontal jump from it
+    would find something. 8-connected jumps are the usual JPS without corner
+    cutting. The next jump point along every row and column is precomputed
+    for the whole mask, so every jump along a row or column is O(1).
+
+    Args:
+        free (matrix of bool): The traversable cells, indexed [y, x].
+        start (tuple of int):  The start index point (x, y).
+        end (tuple of int):    The end index point (x, y).
+        diagonal (bool):       Allow diagonal moves.
+        stats (dict):          Optional dict to fill with the number of expansions.
+
+    Returns:
+        cells (list of (x, y)): Every cell of the path, or None if no path exists.
+    """
+    free = np.ascontiguousarray(free, dtype=bool)
+    rows, cols = free.shape
+    sx, sy = int(start[0]), int(start[1])
+    ex, ey = int(end[0]), int(end[1])
+    if not (0 <= sx < cols and 0 <= sy < rows and 0 <= ex < cols and 0 <= ey < rows):
+        return None
+    if not free[ey, ex]:
+        return None
+
+    next_right, next_left, next_down, next_up = (memoryview(events.ravel())
+                                                 for events in _jump_events(free, diagonal))
+    free_v = memoryview(free.ravel())
+
+    def jump_x(x, y, dx):
+        # Next jump point from (x, y) along the row in direction dx
+        e = next_right[y * cols + x] if dx > 0 else next_left[y * cols + x]
+        if y == ey and (ex - x) * dx > 0 and (e - ex) * dx >= 0:
+            return ex, ey
+        if e < 0 or e >= cols or not free_v[y * cols + e]:
+            return None
+        return e, y
+
+    def jump_y(x, y, dy):
+        # Next jump point from (x, y) along the column in direction dy
+        e = next_down[y * cols + x] if dy > 0 else next_up[y * cols + x]
+        if (ey - y) * dy > 0 and (e - ey) * dy >= 0:
+            if ex == x:
+                return ex, ey
+            # A 4-connected vertical jump stops where a horizontal jump reaches the goal
+            if not diagonal and free_v[ey * cols + x] and jump_x(x, ey, 1 if ex > x else -1) == (ex, ey):
+                return x, ey
+        if e < 0 or e >= rows or not free_v[e * cols + x]:
+            return None
+        return x, e
+
+    def jump_diagonal(x, y, dx, dy):
+        # Next jump point from (x, y) along the diagonal (dx, dy)
+        while True:
+            nx, ny = x + dx, y + dy
+            if not (0 <= nx < cols and 0 <= ny < rows and free_v[ny * cols + nx] and
+                    free_v[y * cols + nx] and free_v[ny * cols + x]):
+                return None
+            x, y = nx, ny
+            if (x, y) == (ex, ey) or jump_x(x, y, dx) is not None or jump_y(x, y, dy) is not None:
+                return x, y
+
+    def distance(dx, dy):
+        dx, dy = abs(dx), abs(dy)
+        if diagonal:
+            return max(dx, dy) + (2 ** 0.5 - 1) * min(dx, dy)
+        return dx + dy
+
+    start_i = sy * cols + sx
+    end_i = ey * cols + ex
+    g_arr = np.full(rows * cols, np.inf)
+    parent_arr = np.full(rows * cols, -1, dtype=np.int64)
+    closed_arr = np.zeros(rows * cols, dtype=bool)
+    g, parent, closed = memoryview(g_arr), memoryview(parent_arr), memoryview(closed_arr)
+
+    g[start_i] = 0
+    h = distance(sx - ex, sy - ey)
+    open_list = [(h, h, start_i)]
+    expansions = 0
+    all_moves = NEAR_SQUARES + (DIAGONAL_SQUARES if diagonal else ())
+
+    while open_list:
+        f, h, current = heapq.heappop(open_list)
+        if closed[current]:
+            continue  # Stale entry
+        closed[current] = True
+        expansions += 1
+
+        if current == end_i:
+            break
+
+        y, x = divmod(current, cols)
+        if parent[current] == -1:
+            moves = all_moves
+        else:
+            # Prune the moves by the direction the jump point was entered from
+            py, px = divmod(parent[current], cols)
+            dx, dy = (x > px) - (x < px), (y > py) - (y < py)
+            if dx and dy:
+                moves = ((dx, 0), (0, dy), (dx, dy))
+            elif diagonal:
+                # Without corner cutting every open side may lead somewhere
+                moves = [(dx, dy)] + [(dy, dx), (-dy, -dx)] + [(dx + dy, dy + dx), (dx - dy, dy - dx)]
+            elif dy:
+                moves = ((0, dy), (1, 0), (-1, 0))
+            else:
+                # Horizontal moves only turn at obstacle corners
+                moves = [(dx, 0)] + [(0, side) for side in (-1, 1)
+                                     if 0 <= y + side < rows and 0 <= x - dx < cols and
+                                     free_v[(y + side) * cols + x] and
+                                     not free_v[(y + side) * cols + x - dx]]
+
+        for mx, my in moves:
+            if mx and my:
+                point = jump_diagonal(x, y, mx, my)
+            elif mx:
+                point = jump_x(x, y, mx)
+            else:
+                point = jump_y(x, y, my)
+            if point is None:
+                continue
+
+            child = point[1] * cols + point[0]
+            child_g = g[current] + distance(point[0] - x, point[1] - y)
+            if closed[child] or child_g >= g[child]:
+                continue
+            g[child] = child_g
+            parent[child] = current
+            h = distance(point[0] - ex, point[1] - ey)
+            heapq.heappush(open_list, (child_g + h, h, child))
+
+    if stats is not None:
+        stats['expansions'] = expansions
+
+    if not closed[end_i]:
+        return None
+
+    # Walk back through the jump points, filling in the straight runs between them
+    cells = [(ex, ey)]
+    current = end_i
+    while parent[current] != -1:
+        py, px = divmod(parent[current], cols)
+        x, y = cells[-1]
+        dx, dy = (px > x) - (px < x), (py > y) - (py < y)
+        while (x, y) != (px, py):
+            x, y = x + dx, y + dy
+            cells.append((x, y))
+        current = parent[current]
+    return cells[::-1]
+
+
+def astar_turns(map, start, end, forward_cost=1.4, turn_cost=4.2, start_angle=None, stats=None,
+                path_file=None):
+    """
+    Heading aware A* search on an OccupancyGridMap.
+
+    Searches over (cell, heading) states, where a step forward costs
+    forward_cost and a 90 degree turn in place costs turn_cost, so the path
+    minimizes the time the robot takes to drive it rather than the number of
+    cells. The defaults are the forward and turn times main uses on the robot.
+
+    Args:
+        map (OccupancyGridMap): The map to search.
+        start (tuple of int):   The start index point (x, y).
+        end (tuple of int):     The end index point (x, y).
+        forward_cost (float):   The cost of one step forward.
+        turn_cost (float):      The cost of one 90 degree turn.
+        start_angle (int):      The heading at the start (0, 90, 180 or 270), or
+                                None if the robot may start in any heading.
+        stats (dict):           Optional dict to fill with the number of
+                                expansions and the cost of the path.
+        path_file (string):     Optional .csv file to save the path to.
+
+    Returns:
+        path (list of [x, y, angle]): The path, or None if no path exists.
+    """
+    cells = heading_cells(map.free_mask(), start, end, forward_cost, turn_cost, start_angle, stats)
+    if cells is None:
+        return None
+
+    path = annotate_path(cells)
+    save_path(path, path_file)
+    return path
+
+
+def heading_cells(free, start, end, forward_cost=1.4, turn_cost=4.2, start_angle=None, stats=None):
+    """
+    The search used by astar_turns, on a boolean mask of free cells.
+
+    The heuristic is the Manhattan distance times forward_cost plus the
+    fewest turns needed to face every direction the goal still lies in
+    times turn_cost, which never overestimates the remaining cost.
+
+    Args:
+        free (matrix of bool): The traversable cells, indexed [y, x].
+        start (tuple of int):  The start index point (x, y).
+        end (tuple of int):    The end index point (x, y).
+        forward_cost (float):  The cost of one step forward.
+        turn_cost (float):     The cost of one 90 degree turn.
+        start_angle (int):     The heading at the start, or None for any heading.
+        stats (dict):          Optional dict to fill with the number of
+                               expansions and the cost of the path.
+
+    Returns:
+        cells (list of (x, y)): The cells of the path, or None if no path exists.
+    """
+    rows, cols = free.shape
+    sx, sy = int(start[0]), int(start[1])
+    ex, ey = int(end[0]), int(end[1])
+    if not (0 <= sx < cols and 0 <= sy < rows and 0 <= ex < cols and 0 <= ey < rows):
+        return None
+
+    # Headings 0, 1, 2, 3 are the angles 0, 90, 180, 270 of annotate_path
+    steps = (1, cols, -1, -cols)
+
+    def heuristic(x, y, heading):
+        dx, dy = ex - x, ey - y
+        needed = []
+        if dx:
+            needed.append(0 if dx > 0 else 2)
+        if dy:
+            needed.append(1 if dy > 0 else 3)
+        if not needed:
+            turns = 0
+        elif heading in needed:
+            turns = len(needed) - 1
+        elif len(needed) == 1 and (heading - needed[0]) % 2 == 0:
+            turns = 2 # Facing away
+        else:
+            turns = len(needed)
+        return (abs(dx) + abs(dy)) * forward_cost + turns * turn_cost
+
+    # Preallocated search state over cell * 4 + heading
+    free_flat = np.ascontiguousarray(free, dtype=bool).ravel()
+    g_arr = np.full(rows * cols * 4, np.inf)
+    parent_arr = np.full(rows * cols * 4, -1, dtype=np.int64)
+    closed_arr = np.zeros(rows * cols * 4, dtype=bool)
+    free_v, g, parent, closed = (memoryview(free_flat), memoryview(g_arr),
+                                 memoryview(parent_arr), memoryview(closed_arr))
+
+    start_i = sy * cols + sx
+    end_i = ey * cols + ex
+    if start_angle is None:
+        start_headings = range(4)
+    else:
+        start_headings = (int(start_angle) % 360 // 90,)
+
+    open_list = []
+    for heading in start_headings:
+        state = start_i * 4 + heading
+        g[state] = 0
+        h = heuristic(sx, sy, heading)
+        open_list.append((h, h, state))
+    heapq.heapify(open_list)
+
+    expansions = 0
+    goal = -1
+    while open_list:
+        f, h, state = heapq.heappop(open_list)
+        if closed[state]:
+            continue  # Stale entry
+        closed[state] = True
+        expansions += 1
+
+        current, heading = divmod(state, 4)
+        if current == end_i:
+            goal = state
+            break
+
+        y, x = divmod(current, cols)
+        moves = [((current * 4 + (heading + 1) % 4), g[state] + turn_cost),
+                 ((current * 4 + (heading - 1) % 4), g[state] + turn_cost)]
+        if ((heading == 0 and x < cols - 1) or (heading == 1 and y < rows - 1) or
+                (heading == 2 and x > 0) or (heading == 3 and y > 0)):
+            child = current + steps[heading]
+            if free_v[child]:
+                moves.append((child * 4 + heading, g[state] + forward_cost))
+
+        for child, child_g in moves:
+            if closed[child] or child_g >= g[child]:
+                continue
+            g[child] = child_g
+            parent[child] = state
+            cy, cx = divmod(child // 4, cols)
+            h = heuristic(cx, cy, child % 4)
+            heapq.heappush(open_list, (child_g + h, h, child))
+
+    if stats is not None:
+        stats['expansions'] = expansions
+        stats['cost'] = g[goal] if goal != -1 else None
+
+    if goal == -1:
+        return None
+
+    # Turns in place repeat a cell, keep one point per cell
+    cells = []
+    state = goal
+    while state != -1:
+        y, x = divmod(state // 4, cols)
+        if not cells or cells[-1] != (x, y):
+            cells.append((x, y))
+        state = parent[state]
+    return cells[::-1]
+
+
+def _jump_events(free, diagonal=False):
+    """
+    Precomputes where every row and column jump of jps_cells stops.
+
+    Returns:
+        next_right, next_left (matrix of int32): For every cell, the x of the
+            first cell after it along its row that is occupied or a jump point.
+        next_down, next_up (matrix of int32):    For every cell, the y of the
+            first cell after it along its column that is occupied or a jump point.
+    """
+    rows, cols = free.shape
+    padded = np.pad(free, 1)
+    up, down = padded[:-2, 1:-1], padded[2:, 1:-1]
+    left, right = padded[1:-1, :-2], padded[1:-1, 2:]
+    up_left, up_right = padded[:-2, :-2], padded[:-2, 2:]
+    down_left, down_right = padded[2:, :-2], padded[2:, 2:]
+
+    # A side cell opens up where the cell before it along the move was occupied
+    forced_right = free & ((up & ~up_left) | (down & ~down_left))
+    forced_left = free & ((up & ~up_right) | (down & ~down_right))
+
+    next_right = _next_along(~free | forced_right, axis=1, forward=True)
+    next_left = _next_along(~free | forced_left, axis=1, forward=False)
+
+    if diagonal:
+        stop_down = ~free | (free & ((left & ~up_left) | (right & ~up_right)))
+        stop_up = ~free | (free & ((left & ~down_left) | (right & ~down_right)))
+    else:
+        # Vertical moves stop wherever a horizontal jump from them finds a jump point
+        row_index = np.arange(rows)[:, None]
+        reach_right = (next_right < cols) & free[row_index, np.minimum(next_right, cols - 1)]
+        reach_left = (next_left >= 0) & free[row_index, np.maximum(next_left, 0)]
+        stop_down = stop_up = ~free | (free & (reach_right | reach_left))
+
+    next_down = _next_along(stop_down, axis=0, forward=True)
+    next_up = _next_along(stop_up, axis=0, forward=False)
+    return next_right, next_left, next_down, next_up
+
+
+def _next_along(stops, axis, forward):
+    """
+    For every cell, the index of the first stop strictly after it along an axis.
+
+    Cells with no stop after them get the index one past the edge (the
+    length of the axis going forward, -1 going backward).
+    """
+    length = stops.shape[axis]
+    shape = [1, 1]
+    shape[axis] = length
+    positions = np.arange(length, dtype=np.int32).reshape(shape)
+    if forward:
+        index = np.where(stops, positions, np.int32(length))
+        index = np.flip(np.minimum.accumulate(np.flip(index, axis), axis=axis), axis)
+        edge = length
+    else:
+        index = np.where(stops, positions, np.int32(-1))
+        index = np.maximum.accumulate(index, axis=axis)
+        edge = -1
+
+    # Shift by one so a cell does not count as its own stop
+    result = np.full(stops.shape, edge, dtype=np.int32)
+    if axis == 1 and forward:
+        result[:, :-1] = index[:, 1:]
+    elif axis == 1:
+        result[:, 1:] = index[:, :-1]
+    elif forward:
+        result[:-1] = index[1:]
+    else:
+        result[1:] = index[:-1]
+    return result
+
+
 if __name__ == "__main__":
     ogm = OccupancyGridMap()
 
-    # Get keyframe data from map file
+    # Get keyframe data from map file (cached after the first run)
     print("Unpacking MSG file...")
-    unpack = Unpacker()
-    unpack.unpackMSGmap("../data/map.msg")
-    keyframes = unpack.extract_keyframe_data()
+    cache = MapCache()
+    keyframes, _ = cache.extractMapData("../data/map.msg")
     # Remove z axis data
     keyframes = np.delete(keyframes, 2, 1)
 
     # Create mapdata
     print("Loading map data...")
-    ogm.fromMapMSGData(keyframes)
+    cache.buildGrid(ogm, keyframes)
     # ogm.fromCSV("Map.csv")
     # ogm.fromKeyframesCSV("../data/keyframes.csv")
 
@@ -0,0 +1,951 @@
+# ------------------------------------------------------------------------------
+# Name         : Benchmarks.py
+# Date Created : 10/18/2026
+# Author(s)    : Micheal Caracciolo, Chris Lloyd, Owen Casciotti
+# Github Link  : https://github.com/michealcarac/VSLAM-Mapping
+# Description  : Timing benchmarks for the mapping and path planning code.
+#                Usage: python Benchmarks.py <benchmark> [options]
+# ------------------------------------------------------------------------------
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import msgpack
+
+import numpy as np
+
+from scipy.spatial.transform import Rotation as R
+
+from AStarOCC import (astar, astar_array, astar_cells, astar_hierarchical, astar_turns,
+                      bidirectional_cells, distance_field, jps_cells, _jump_events)
+from DStarLite import DStarLite
+from MapFileUnpacker import Unpacker
+from OccupancyGridMap import OccupancyGridMap
+from PlannerCache import DistanceFieldCache, PathCache
+from TiledGridMap import TiledGridMap
+
+
+def make_random_grid(size, density=0.2, seed=0):
+    """
+    Creates a square OccupancyGridMap with randomly occupied cells.
+
+    The corners (0, 0) and (size - 1, size - 1) are always unoccupied.
+
+    Args:
+        size (int):      The number of rows and columns.
+        density (float): The fraction of occupied cells.
+        seed (int):      The random seed.
+
+    Returns:
+        ogm (OccupancyGridMap): The random map.
+    """
+    rng = np.random.default_rng(seed)
+    grid_map = np.where(rng.random((size, size)) < density, 0.9, 0.1)
+    grid_map[0, 0] = grid_map[-1, -1] = 0.1
+    return OccupancyGridMap(grid_map)
+
+
+def timed(func, *args, **kwargs):
+    """
+    Runs a function once.
+
+    Returns:
+        result, seconds: The function result and the wall time it took.
+    """
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def bench_astar(max_size=4096, legacy_max=256):
+    """
+    Compares astar_array to the original astar on random grids.
+
+    Args:
+        max_size (int):   The largest grid size to run.
+        legacy_max (int): The largest grid size to run the original astar on.
+    """
+    print(f"{'size':>6} {'astar (s)':>12} {'astar_array (s)':>16} {'speedup':>9} {'path len':>9}")
+    size = 32
+    while size <= max_size:
+        ogm = make_random_grid(size)
+        start, end = (0, 0), (size - 1, size - 1)
+
+        path, new_time = timed(astar_array, ogm, start, end)
+        path_len = len(path) if path is not None else "-"
+        if size <= legacy_max:
+            _, old_time = timed(astar, ogm, start, end)
+            print(f"{size:>6} {old_time:>12.4f} {new_time:>16.4f} {old_time / new_time:>8.1f}x {path_len:>9}")
+        else:
+            print(f"{size:>6} {'skipped':>12} {new_time:>16.4f} {'-':>9} {path_len:>9}")
+        size *= 2
+
+
+def is_map_valid_loop(ogm):
+    """
+    The original per-cell OccupancyGridMap.isMapValid, kept as a reference.
+
+    Args:
+        ogm (OccupancyGridMap): The map to check.
+
+    Returns:
+        valid (bool): Whether or not the gridmap is valid.
+    """
+    for y in range(len(ogm.grid_map)):
+        for x in range(len(ogm.grid_map[0])):
+            if ogm.isUnoccupiedIndex((x,y)):
+                currPt = (x,y)
+                adjacentEdgePts =   [(0,-1),(0,1),(-1,0),(1,0)]
+                diagonalCornerPts = [(1,1), (1,-1), (-1,1), (-1,-1)]
+
+                # Check to see if there are any corners with an adjacent edge
+                for cornerPt in diagonalCornerPts:
+                    edge1Pt = (currPt[0] + cornerPt[0], currPt[1])
+                    edge2Pt = (currPt[0], currPt[1] + cornerPt[1])
+                    cornerPt = (currPt[0] + cornerPt[0], currPt[1] + cornerPt[1])
+
+                    if ogm.isValidIndexPoint(cornerPt) and ogm.isUnoccupiedIndex(cornerPt):
+                        if not ((ogm.isValidIndexPoint(edge1Pt) and ogm.isUnoccupiedIndex(edge1Pt)) or
+                                (ogm.isValidIndexPoint(edge2Pt) and ogm.isUnoccupiedIndex(edge2Pt))):
+                            return False
+
+                # Check to see if there are any adjacent edges
+                validEdge = False
+                for edgePt in adjacentEdgePts:
+                    adjacentPt = (currPt[0] + edgePt[0], currPt[1] + edgePt[1])
+                    if ogm.isValidIndexPoint(adjacentPt) and ogm.isUnoccupiedIndex(adjacentPt):
+                        validEdge = True
+                if not validEdge:
+                    return False
+    return True
+
+
+def bench_map_valid(sizes=(32, 128, 512, 2048)):
+    """
+    Times isMapValid against the original loop on valid grids.
+
+    Args:
+        sizes (tuple of int): The grid sizes to run.
+    """
+    print(f"{'size':>6} {'loop (s)':>10} {'vectorized (s)':>15} {'speedup':>9}")
+    for size in sizes:
+        # A valid map, every other row is a free corridor joined at the left edge
+        grid_map = np.full((size, size), 0.6)
+        grid_map[::2, :] = 0
+        grid_map[:, 0] = 0
+        ogm = OccupancyGridMap(grid_map)
+
+        _, new_time = timed(ogm.isMapValid)
+        if size <= 512:
+            _, old_time = timed(is_map_valid_loop, ogm)
+            print(f"{size:>6} {old_time:>10.4f} {new_time:>15.4f} {old_time / new_time:>8.1f}x")
+        else:
+            print(f"{size:>6} {'skipped':>10} {new_time:>15.4f} {'-':>9}")
+
+
+def make_keyframe_walk(num_keyframes, step=0.05, seed=0):
+    """
+    Creates a synthetic 2D keyframe trajectory, a random walk of hallway segments.
+
+    Args:
+        num_keyframes (int): The number of keyframes.
+        step (float):        The distance between keyframes.
+        seed (int):          The random seed.
+
+    Returns:
+        keyframes (array of float): An (N, 2) array of keyframe positions.
+    """
+    rng = np.random.default_rng(seed)
+    # Straight segments in one of the four directions
+    segment_dirs = rng.integers(0, 4, size=num_keyframes // 50 + 1)
+    headings = np.repeat(segment_dirs, 50)[:num_keyframes] * (np.pi / 2)
+    steps = np.stack([np.cos(headings), np.sin(headings)], axis=1) * step
+    steps += rng.normal(scale=step / 10, size=steps.shape)
+    return np.cumsum(steps, axis=0)
+
+
+def bench_scale_search(keyframe_file="../data/keyframes.csv", walk_sizes=(1000, 5000)):
+    """
+    Compares the linear and bisection scale searches of fromMapMSGData.
+
+    Args:
+        keyframe_file (string):   A csv file of keyframe points.
+        walk_sizes (tuple of int): Synthetic keyframe trajectory sizes to run.
+    """
+    datasets = [(keyframe_file, np.genfromtxt(keyframe_file, delimiter=","))]
+    datasets += [(f"walk {n}", make_keyframe_walk(n)) for n in walk_sizes]
+    modes = [("linear", {"scale_search": "linear"}),
+             ("bisect lattice", {"scale_search": "bisect"}),
+             ("bisect 0.01", {"scale_search": "bisect", "snap_to_lattice": False})]
+
+    print(f"{'keyframes':>24} {'mode':>15} {'candidates':>11} {'time (s)':>9} {'scale':>8}")
+    for name, keyframes in datasets:
+        for mode, kwargs in modes:
+            ogm = OccupancyGridMap()
+            ogm.fromMapMSGData(keyframes, **kwargs)
+            stats = ogm.scale_search_stats
+            print(f"{name:>24} {mode:>15} {stats['candidates']:>11} "
+                  f"{stats['seconds']:>9.3f} {ogm.cell_size:>8.4f}")
+
+
+def rasterize_loop(ogm, keyframes, scale):
+    """
+    The original per-keyframe rasterization of fromMapMSGData, kept as a reference.
+
+    Args:
+        ogm (OccupancyGridMap):      The map to build.
+        keyframes (array of float):  The keyframe point data.
+        scale (float):               The cell size to build at.
+    """
+    scaledKeyframes = keyframes / scale
+    minValueX = np.amin(scaledKeyframes[:, 0])
+    minValueY = np.amin(scaledKeyframes[:, 1])
+    if (minValueX < 0):
+        scaledKeyframes[:, 0] -= minValueX
+    if (minValueY < 0):
+        scaledKeyframes[:, 1] -= minValueY
+    max_point = np.ceil(np.amax(scaledKeyframes, axis=0)).astype(int)
+    ogm.grid_map = np.full(max_point, 0.6).transpose()
+    for point in scaledKeyframes:
+        x_index = int(np.floor(point[0]))
+        y_index = int(np.floor(point[1]))
+        if ogm.isValidIndexPoint((x_index, y_index)):
+            ogm.setDataIndex((x_index, y_index), 0)
+
+
+def bench_rasterize(sizes=(1000, 10000, 100000), scale=0.1):
+    """
+    Checks and times the vectorized keyframe rasterization against the loop.
+
+    Args:
+        sizes (tuple of int): The synthetic keyframe trajectory sizes.
+        scale (float):        The cell size to build at.
+    """
+    print(f"{'keyframes':>10} {'loop (s)':>10} {'vectorized (s)':>15} {'speedup':>9}")
+    for size in sizes:
+        keyframes = make_keyframe_walk(size)
+
+        expected = OccupancyGridMap()
+        _, old_time = timed(rasterize_loop, expected, keyframes, scale)
+        ogm = OccupancyGridMap()
+        _, new_time = timed(ogm._buildGridAtScale, keyframes, scale, np.empty_like(keyframes))
+        assert np.array_equal(ogm.grid_map, expected.grid_map)
+        print(f"{size:>10} {old_time:>10.4f} {new_time:>15.4f} {old_time / new_time:>8.1f}x")
+
+
+def make_map_data(num_keyframes, num_landmarks=0, seed=0):
+    """
+    Creates a synthetic OpenVSLAM map dict with random keyframes and landmarks.
+
+    Args:
+        num_keyframes (int): The number of keyframes.
+        num_landmarks (int): The number of landmarks.
+        seed (int):          The random seed.
+
+    Returns:
+        data (dict): The map, in the layout msgpack.unpackb gives for a .msg file.
+    """
+    rng = np.random.default_rng(seed)
+    quats = rng.normal(size=(num_keyframes, 4))
+    quats /= np.linalg.norm(quats, axis=1, keepdims=True)
+    trans = rng.normal(scale=5, size=(num_keyframes, 3))
+    landmarks = rng.normal(scale=5, size=(num_landmarks, 3))
+    return {
+        'keyframes': {str(i): {'rot_cw': quats[i].tolist(), 'trans_cw': trans[i].tolist()}
+                      for i in range(num_keyframes)},
+        'landmarks': {str(i): {'pos_w': landmarks[i].tolist()}
+                      for i in range(num_landmarks)},
+    }
+
+
+def extract_keyframe_loop(data):
+    """
+    The original per-keyframe Unpacker.extract_keyframe_data, kept as a reference.
+
+    Args:
+        data (dict): The unpacked map.
+
+    Returns:
+        keyframes (array of float): The keyframe positions (x, z, -y).
+    """
+    kfs_pos = []
+    for kf in data['keyframes']:
+        ktrans = data['keyframes'][kf]['trans_cw']
+        kf_trans = [ktrans[0], ktrans[1], ktrans[2]]
+        krot = data['keyframes'][kf]['rot_cw']
+        kf_rot = [krot[0], krot[1], krot[2], krot[3]]
+        kf_rot_mat = R.from_quat(kf_rot)
+        kfs_pos.append(np.matmul(-np.transpose(kf_rot_mat.as_matrix()), np.transpose(kf_trans)))
+    kfs_pos = np.array(kfs_pos)
+    return np.array([[pos[0], pos[2], -pos[1]] for pos in kfs_pos])
+
+
+def bench_extract_keyframes(num_keyframes=100000):
+    """
+    Checks and times the batched keyframe extraction against the loop.
+
+    Args:
+        num_keyframes (int): The number of synthetic keyframes.
+    """
+    unpack = Unpacker()
+    unpack.data = make_map_data(num_keyframes)
+
+    expected, old_time = timed(extract_keyframe_loop, unpack.data)
+    keyframes, new_time = timed(unpack.extract_keyframe_data)
+    assert np.allclose(keyframes, expected)
+
+    print(f"{num_keyframes} keyframes: loop {old_time:.3f}s, batched {new_time:.3f}s "
+          f"({old_time / new_time:.1f}x), max difference {np.abs(keyframes - expected).max():.2e}")
+
+
+def write_map_file(filename, num_keyframes, num_landmarks, num_keypoints=500, seed=0):
+    """
+    Writes a synthetic OpenVSLAM .msg map with descriptor-sized keyframe payloads.
+
+    Args:
+        filename (string):   The file to write.
+        num_keyframes (int): The number of keyframes.
+        num_landmarks (int): The number of landmarks.
+        num_keypoints (int): The number of keypoints and descriptors per keyframe.
+        seed (int):          The random seed.
+    """
+    data = make_map_data(num_keyframes, num_landmarks, seed)
+    descriptors = bytes(32 * num_keypoints)
+    for kf in data['keyframes'].values():
+        kf['descs'] = [descriptors[i:i + 32] for i in range(0, len(descriptors), 32)]
+        kf['lm_ids'] = list(range(num_keypoints))
+    for lm in data['landmarks'].values():
+        lm['n_vis'] = lm['n_fnd'] = 1
+    with open(filename, "wb") as msg_pack_file:
+        msg_pack_file.write(msgpack.packb(data))
+
+
+def bench_stream_map(num_keyframes=2000, num_landmarks=100000):
+    """
+    Compares the peak memory and time of the full and streaming map readers.
+
+    Args:
+        num_keyframes (int): The number of synthetic keyframes.
+        num_landmarks (int): The number of synthetic landmarks.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        map_file = os.path.join(tmp_dir, "map.msg")
+        write_map_file(map_file, num_keyframes, num_landmarks)
+        print(f"{num_keyframes} keyframes, {num_landmarks} landmarks, "
+              f"{os.path.getsize(map_file) / 2 ** 20:.1f} MiB file")
+
+        results = {}
+        for name, kwargs in (("unpackb", {}),
+                             ("streaming", {"streaming": True}),
+                             ("streaming mmap", {"streaming": True, "use_mmap": True})):
+            unpack = Unpacker()
+            tracemalloc.start()
+            start = time.perf_counter()
+            unpack.unpackMSGmap(map_file, **kwargs)
+            keyframes = unpack.extract_keyframe_data()
+            landmarks = unpack.extract_landmark_data()
+            seconds = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            del unpack
+
+            results[name] = (keyframes, landmarks)
+            print(f"{name:>15}: peak {peak / 2 ** 20:8.1f} MiB, {seconds:.3f}s")
+
+        for keyframes, landmarks in results.values():
+            assert np.array_equal(keyframes, results["unpackb"][0])
+            assert np.array_equal(landmarks, results["unpackb"][1])
+
+
+def bench_grid_file(sizes=(256, 1024, 4096)):
+    """
+    Compares loading csv gridmaps with fromCSV to opening native grid files.
+
+    Args:
+        sizes (tuple of int): The grid sizes to run.
+    """
+    print(f"{'size':>6} {'csv MiB':>8} {'fromCSV (s)':>12} {'grid MiB':>9} {'loadGrid (s)':>13} {'cell read (s)':>14}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_file = os.path.join(tmp_dir, "map.csv")
+        grid_file = os.path.join(tmp_dir, "map.grid")
+        for size in sizes:
+            ogm = make_random_grid(size)
+            ogm.numpyArrayToCSV(csv_file)
+            ogm.saveGrid(grid_file)
+
+            _, csv_time = timed(OccupancyGridMap().fromCSV, csv_file)
+            loaded = OccupancyGridMap()
+            _, grid_time = timed(loaded.loadGrid, grid_file)
+            _, read_time = timed(loaded.getDataIndex, (size - 1, size - 1))
+            assert np.array_equal(loaded.grid_map, ogm.grid_map)
+
+            print(f"{size:>6} {os.path.getsize(csv_file) / 2 ** 20:>8.1f} {csv_time:>12.4f} "
+                  f"{os.path.getsize(grid_file) / 2 ** 20:>9.1f} {grid_time:>13.5f} {read_time:>14.5f}")
+
+
+def delete_points_loop(data, m=2.5):
+    """
+    The original three pass Unpacker.delete_points, kept as a reference.
+    """
+    new = data
+    for axis in range(3):
+        bools = abs(new[:, axis] - np.mean(new[:, axis])) < m * np.std(new[:, axis])
+        falseindexes = []
+        for i in range(len(new)):
+            if not bools[i]:
+                falseindexes.append(i)
+        new = np.delete(new, falseindexes, axis=0)
+    return new
+
+
+def bench_outliers(num_points=1000000, seed=0):
+    """
+    Times the landmark outlier filter modes against the original loop.
+
+    Args:
+        num_points (int): The number of synthetic landmarks.
+        seed (int):       The random seed.
+    """
+    rng = np.random.default_rng(seed)
+    landmarks = rng.standard_t(3, size=(num_points, 3))
+    unpack = Unpacker()
+
+    expected, old_time = timed(delete_points_loop, landmarks)
+    print(f"{num_points} landmarks, loop: {old_time:.3f}s, {len(expected)} kept")
+    for mode in ("sequential", "combined", "mad", "voxel"):
+        keep, new_time = timed(unpack.filter_outliers, landmarks, mode=mode, voxel_size=0.1)
+        if mode == "sequential":
+            assert np.array_equal(landmarks[keep], expected)
+        print(f"{mode:>12}: {new_time:.3f}s, {len(keep)} kept")
+
+
+def make_room_observations(num_rays, num_keyframes=500, num_landmarks=20000, seed=0):
+    """
+    Creates keyframes walking down a 20m x 12m room and observations of its walls.
+
+    Args:
+        num_rays (int):      The number of observations.
+        num_keyframes (int): The number of keyframes.
+        num_landmarks (int): The number of landmarks on the walls.
+        seed (int):          The random seed.
+
+    Returns:
+        keyframes, landmarks, observations: The fromLandmarkRays inputs.
+    """
+    rng = np.random.default_rng(seed)
+    keyframes = np.stack([np.linspace(1, 19, num_keyframes), np.full(num_keyframes, 6.0)], axis=1)
+    wall = rng.integers(0, 4, num_landmarks)
+    along = rng.uniform(0, 1, num_landmarks)
+    landmarks = np.select([wall[:, None] == 0, wall[:, None] == 1, wall[:, None] == 2],
+                          [np.stack([along * 20, np.zeros(num_landmarks)], axis=1),
+                           np.stack([along * 20, np.full(num_landmarks, 12.0)], axis=1),
+                           np.stack([np.zeros(num_landmarks), along * 12], axis=1)],
+                          np.stack([np.full(num_landmarks, 20.0), along * 12], axis=1))
+    observations = np.stack([rng.integers(0, num_keyframes, num_rays),
+                             rng.integers(0, num_landmarks, num_rays)], axis=1)
+    return keyframes, landmarks, observations
+
+
+def bench_landmark_rays(ray_counts=(10000, 100000, 1000000), cell_size=0.05):
+    """
+    Times fromLandmarkRays for growing numbers of observation rays.
+
+    Args:
+        ray_counts (tuple of int): The numbers of rays.
+        cell_size (float):         The cell size.
+    """
+    print(f"{'rays':>9} {'grid':>11} {'time (s)':>9} {'rays/s':>11}")
+    for num_rays in ray_counts:
+        keyframes, landmarks, observations = make_room_observations(num_rays)
+        ogm = OccupancyGridMap()
+        _, seconds = timed(ogm.fromLandmarkRays, keyframes, landmarks, observations, cell_size)
+        shape = "x".join(str(axis) for axis in ogm.grid_map.shape)
+        print(f"{num_rays:>9} {shape:>11} {seconds:>9.3f} {num_rays / seconds:>11.0f}")
+
+
+def bench_append_keyframes(num_keyframes=100000, batch=10, cell_size=0.05):
+    """
+    Compares appendKeyframes to rebuilding and validating the whole gridmap.
+
+    Args:
+        num_keyframes (int): The keyframes in the existing map.
+        batch (int):         The keyframes added per update.
+        cell_size (float):   The cell size.
+    """
+    keyframes = make_keyframe_walk(num_keyframes + 10 * batch)
+    ogm = OccupancyGridMap()
+    ogm._buildGridAtScale(keyframes[:num_keyframes], cell_size, np.empty((num_keyframes, 2)))
+    ogm.isMapValid()
+
+    append_times, rebuild_times = [], []
+    for first in range(num_keyframes, len(keyframes), batch):
+        _, seconds = timed(ogm.appendKeyframes, keyframes[first:first + batch])
+        append_times.append(seconds)
+
+        rebuilt = OccupancyGridMap()
+        points = keyframes[:first + batch]
+        _, build_time = timed(rebuilt._buildGridAtScale, points, cell_size, np.empty_like(points))
+        _, valid_time = timed(rebuilt.isMapValid)
+        rebuild_times.append(build_time + valid_time)
+
+    shape = "x".join(str(axis) for axis in ogm.grid_map.shape)
+    print(f"{num_keyframes} keyframes ({shape} grid), adding {batch} at a time: "
+          f"append {np.mean(append_times) * 1000:.2f}ms, rebuild {np.mean(rebuild_times) * 1000:.2f}ms")
+
+
+def make_corridor_floor(size_m=100.0, cell_size=0.05, corridor_m=2.0):
+    """
+    Creates a square floor with an L-shaped corridor along two of its edges.
+
+    Args:
+        size_m (float):     The floor width and height in meters.
+        cell_size (float):  The cell size in meters.
+        corridor_m (float): The corridor width in meters.
+
+    Returns:
+        grid_map (matrix of float): The floor, unknown (0.6) outside the
+                                    corridor, which is unoccupied with walls.
+    """
+    cells = int(round(size_m / cell_size))
+    width = int(round(corridor_m / cell_size))
+    grid_map = np.full((cells, cells), 0.6)
+    grid_map[:width + 2, :] = 1.0 # Horizontal leg with walls
+    grid_map[:, :width + 2] = 1.0 # Vertical leg with walls
+    grid_map[1:width + 1, 1:] = 0.0
+    grid_map[1:, 1:width + 1] = 0.0
+    return grid_map
+
+
+def bench_tiled_grid(num_queries=100000, seed=0):
+    """
+    Compares memory and query latency of the dense and tiled gridmaps on a
+    100m x 100m floor with 5cm cells.
+
+    Args:
+        num_queries (int): The number of random cell reads.
+        seed (int):        The random seed.
+    """
+    grid_map = make_corridor_floor()
+    rows, cols = grid_map.shape
+    rng = np.random.default_rng(seed)
+    points = [tuple(point) for point in rng.integers(0, [cols, rows], size=(num_queries, 2)).tolist()]
+
+    print(f"{rows}x{cols} cells, L-shaped corridor")
+    print(f"{'backend':>8} {'MiB':>8} {'build (s)':>10} {'getDataIndex (us)':>18} {'64x64 region (us)':>18}")
+    for name, backend in (("dense", OccupancyGridMap), ("tiled", TiledGridMap)):
+        ogm, build_time = timed(backend, grid_map.copy())
+        nbytes = ogm.nbytes() if isinstance(ogm, TiledGridMap) else ogm.grid_map.nbytes
+
+        start = time.perf_counter()
+        for point in points:
+            ogm.getDataIndex(point)
+        query_time = (time.perf_counter() - start) / num_queries
+
+        start = time.perf_counter()
+        for x, y in points[:1000]:
+            if isinstance(ogm, TiledGridMap):
+                ogm.getRegion(x, y, x + 64, y + 64)
+            else:
+                ogm.grid_map[y:y + 64, x:x + 64].copy()
+        region_time = (time.perf_counter() - start) / 1000
+
+        print(f"{name:>8} {nbytes / 2 ** 20:>8.2f} {build_time:>10.3f} "
+              f"{query_time * 1e6:>18.2f} {region_time * 1e6:>18.2f}")
+
+
+def make_building(size=2048, room=64, wall=2, door=16, seed=0):
+    """
+    Builds a gridmap of a building: a lattice of square rooms with one
+    doorway at a random place in every wall.
+
+    Args:
+        size (int): The width and height of the grid.
+        room (int): The width and height of a room, including its walls.
+        wall (int): The thickness of a wall.
+        door (int): The width of a doorway.
+        seed (int): The random seed.
+
+    Returns:
+        grid_map (matrix of float32): The building.
+    """
+    rng = np.random.default_rng(seed)
+    grid_map = np.zeros((size, size))
+    for offset in range(0, size, room):
+        grid_map[offset:offset + wall, :] = 1
+        grid_map[:, offset:offset + wall] = 1
+
+    rooms = size // room
+    for ry in range(rooms):
+        for rx in range(rooms):
+            x0, y0 = rx * room, ry * room
+            if rx > 0:  # Doorway in the west wall
+                y = y0 + rng.integers(wall, room - door)
+                grid_map[y:y + door, x0:x0 + wall] = 0
+            if ry > 0:  # Doorway in the north wall
+                x = x0 + rng.integers(wall, room - door)
+                grid_map[y0:y0 + wall, x:x + door] = 0
+    return grid_map
+
+
+def bench_hierarchical(size=2048, levels=(2, 3, 4), seed=0):
+    """
+    Compares astar_hierarchical to astar_array on cross-building queries.
+
+    Args:
+        size (int):             The width and height of the building grid.
+        levels (tuple of int):  The pyramid levels to plan the corridor on.
+        seed (int):             The random seed.
+    """
+    ogm = OccupancyGridMap(make_building(size, seed=seed))
+    start, end = (4, 4), (size - 5, size - 5)
+
+    path, full_time = timed(astar_array, ogm, start, end)
+    print(f"{size}x{size} building, {start} -> {end}")
+    print(f"{'planner':>16} {'time (s)':>10} {'speedup':>9} {'path len':>9} {'fallback':>9}")
+    print(f"{'astar_array':>16} {full_time:>10.4f} {'-':>9} {len(path):>9} {'-':>9}")
+
+    for level in levels:
+        # Build the pyramid outside of the timed query, like a long-lived map
+        ogm.buildPyramid(levels=level + 1)
+        stats = {}
+        path, time_taken = timed(astar_hierarchical, ogm, start, end, level=level, stats=stats)
+        print(f"{'level ' + str(level):>16} {time_taken:>10.4f} {full_time / time_taken:>8.1f}x "
+              f"{len(path):>9} {str(stats['fallback']):>9}")
+
+
+def make_maze(size=511, seed=0):
+    """
+    Creates a perfect maze with one cell wide passages by a randomized
+    depth first search.
+
+    Args:
+        size (int): The width and height of the grid, odd.
+        seed (int): The random seed.
+
+    Returns:
+        grid_map (matrix of float32): The maze, passages at odd index points.
+    """
+    rng = np.random.default_rng(seed)
+    grid_map = np.ones((size, size))
+    grid_map[1, 1] = 0
+    stack = [(1, 1)]
+    while stack:
+        x, y = stack[-1]
+        options = [(x + dx, y + dy) for dx, dy in ((2, 0), (-2, 0), (0, 2), (0, -2))
+                   if 0 < x + dx < size and 0 < y + dy < size and grid_map[y + dy, x + dx] == 1]
+        if not options:
+            stack.pop()
+            continue
+        nx, ny = options[rng.integers(len(options))]
+        grid_map[(y + ny) // 2, (x + nx) // 2] = 0
+        grid_map[ny, nx] = 0
+        stack.append((nx, ny))
+    return grid_map
+
+
+def make_hallways(size=1024, width=16, wall=2):
+    """
+    Creates a serpentine of parallel hallways, joined at alternating ends.
+
+    Args:
+        size (int):  The width and height of the grid.
+        width (int): The width of a hallway.
+        wall (int):  The thickness of the walls between hallways.
+
+    Returns:
+        grid_map (matrix of float32): The hallways.
+    """
+    grid_map = np.zeros((size, size))
+    grid_map[[0, -1], :] = grid_map[:, [0, -1]] = 1
+    for i, y in enumerate(range(width + 1, size - width, width + wall)):
+        grid_map[y:y + wall, :] = 1
+        if i % 2 == 0:
+            grid_map[y:y + wall, -width - 1:-1] = 0
+        else:
+            grid_map[y:y + wall, 1:width + 1] = 0
+    return grid_map
+
+
+def bench_jps(size=1024):
+    """
+    Compares Jump Point Search to A* on hallway, open room and maze maps.
+
+    The jump tables of jps_cells are built once per map, their time is
+    listed under prep and included in the JPS query times.
+
+    Args:
+        size (int): The width and height of the grids.
+    """
+    room = np.zeros((size, size))
+    room[[0, -1], :] = room[:, [0, -1]] = 1
+    room[size // 4:3 * size // 4, size // 2] = 1 # One wall to walk around
+    maze_size = size - 1 if size % 2 == 0 else size
+
+    maps = (("hallways", make_hallways(size), (1, 1), (1, size - 2)),
+            ("open room", room, (1, size // 2), (size - 2, size // 2)),
+            ("maze", make_maze(maze_size), (1, 1), (maze_size - 2, maze_size - 2)))
+
+    print(f"{'map':>10} {'planner':>12} {'time (s)':>10} {'prep (s)':>9} {'speedup':>9} "
+          f"{'expansions':>11} {'path len':>9}")
+    for name, grid_map, start, end in maps:
+        free = OccupancyGridMap(grid_map).free_mask()
+        stats = {}
+        path, base_time = timed(astar_cells, free, start, end, stats)
+        print(f"{name:>10} {'astar':>12} {base_time:>10.4f} {'-':>9} {'-':>9} "
+              f"{stats['expansions']:>11} {len(path):>9}")
+
+        for label, diagonal in (("jps", False), ("jps 8-conn", True)):
+            _, prep_time = timed(_jump_events, free, diagonal)
+            path, time_taken = timed(jps_cells, free, start, end, diagonal, stats)
+            print(f"{name:>10} {label:>12} {time_taken:>10.4f} {prep_time:>9.4f} "
+                  f"{base_time / time_taken:>8.1f}x {stats['expansions']:>11} {len(path):>9}")
+
+def count_turns(path):
+    """
+    Counts the 90 degree turns along a turn annotated path.
+
+    Args:
+        path (list of [x, y, angle]): The path.
+
+    Returns:
+        turns (int): The number of 90 degree turns.
+    """
+    turns = 0
+    for point, next_point in zip(path, path[1:]):
+        quarter = int(next_point[2] - point[2]) // 90 % 4
+        turns += min(quarter, 4 - quarter)
+    return turns
+
+
+def bench_turns(forward_cost=1.4, turn_cost=4.2, seed=0):
+    """
+    Compares the driving time of the paths of astar, astar_array and
+    astar_turns, using the forward and turn times main uses on the robot.
+
+    Args:
+        forward_cost (float): The seconds per step forward.
+        turn_cost (float):    The seconds per 90 degree turn.
+        seed (int):           The random seed.
+    """
+    maps = (("random 64", make_random_grid(64, seed=seed).grid_map, (0, 0), (63, 63)),
+            ("building 256", make_building(256, seed=seed), (4, 4), (251, 251)),
+            ("hallways 512", make_hallways(512), (1, 1), (1, 510)))
+
+    print(f"{'map':>13} {'planner':>12} {'plan (s)':>9} {'steps':>7} {'turns':>6} {'drive (s)':>10}")
+    for name, grid_map, start, end in maps:
+        ogm = OccupancyGridMap(grid_map)
+        planners = [("astar_array", astar_array, {}),
+                    ("astar_turns", astar_turns, {"forward_cost": forward_cost, "turn_cost": turn_cost})]
+        if grid_map.size <= 64 * 64:
+            planners.insert(0, ("astar", astar, {}))
+
+        for label, planner, kwargs in planners:
+            path, plan_time = timed(planner, ogm, start, end, **kwargs)
+            steps, turns = len(path) - 1, count_turns(path)
+            drive_time = steps * forward_cost + turns * turn_cost
+            print(f"{name:>13} {label:>12} {plan_time:>9.4f} {steps:>7} {turns:>6} {drive_time:>10.1f}")
+
+
+def bench_bidirectional(size=2048, distances=(64, 256, 1024, 2040), seed=0):
+    """
+    Compares bidirectional A* to A* for queries of growing length.
+
+    Args:
+        size (int):                The width and height of the grids.
+        distances (tuple of int):  The x and y offsets from start to end.
+        seed (int):                The random seed.
+    """
+    maps = (("random", make_random_grid(size, seed=seed).free_mask()),
+            ("building", OccupancyGridMap(make_building(size, seed=seed)).free_mask()))
+
+    print(f"{'map':>9} {'distance':>9} {'astar (s)':>10} {'bidir (s)':>10} {'speedup':>9} "
+          f"{'astar exp':>10} {'bidir exp':>10} {'path len':>9}")
+    for name, free in maps:
+        for distance in distances:
+            # The nearest free cells to the query corners
+            free_cells = np.argwhere(free)
+            start = tuple(free_cells[np.argmin(np.abs(free_cells - 4).sum(axis=1))][::-1])
+            end = tuple(free_cells[np.argmin(np.abs(free_cells - (4 + distance)).sum(axis=1))][::-1])
+
+            astar_stats, bidir_stats = {}, {}
+            path, astar_time = timed(astar_cells, free, start, end, astar_stats)
+            bidir_path, bidir_time = timed(bidirectional_cells, free, start, end, bidir_stats)
+            assert len(path) == len(bidir_path)
+            print(f"{name:>9} {distance:>9} {astar_time:>10.4f} {bidir_time:>10.4f} "
+                  f"{astar_time / bidir_time:>8.1f}x {astar_stats['expansions']:>10} "
+                  f"{bidir_stats['expansions']:>10} {len(path):>9}")
+
+
+def bench_dstar(size=1024, moves=(50, 200, 800), seed=0):
+    """
+    Compares replanning with DStarLite to a new astar_cells search after an
+    obstacle appears on the path ahead of the robot.
+
+    Args:
+        size (int):            The width and height of the building grid.
+        moves (tuple of int):  The steps driven before each obstacle appears.
+        seed (int):            The random seed.
+    """
+    ogm = OccupancyGridMap(make_building(size, seed=seed))
+    start, goal = (4, 4), (size - 5, size - 5)
+
+    planner = DStarLite(ogm, start, goal)
+    path, plan_time = timed(planner.plan)
+    _, astar_time = timed(astar_cells, ogm.free_mask(), start, goal)
+    print(f"{size}x{size} building, initial plan: DStarLite {plan_time:.4f} s "
+          f"({planner.expansions} expansions), astar {astar_time:.4f} s")
+
+    print(f"{'moved':>6} {'replan (s)':>11} {'astar (s)':>10} {'speedup':>9} {'replan exp':>11} {'astar exp':>10}")
+    position = 0
+    for distance in moves:
+        # Drive along the path
+        position = min(position + distance, len(path) - 12)
+        planner.moveTo(path[position][:2])
+        path = path[position:]
+        position = 0
+        # A short wall across the path, a few cells ahead
+        x, y, angle = path[6]
+        wall_dx, wall_dy = (0, 1) if angle in (0, 180) else (1, 0)
+        for offset in range(-3, 4):
+            wall_point = (x + offset * wall_dx, y + offset * wall_dy)
+            if ogm.isValidIndexPoint(wall_point):
+                ogm.setDataIndex(wall_point, 0.9)
+
+        path, replan_time = timed(planner.plan)
+        astar_stats = {}
+        expected, astar_time = timed(astar_cells, ogm.free_mask(), planner.start, goal, astar_stats)
+        assert len(path) == len(expected)
+        print(f"{distance:>6} {replan_time:>11.4f} {astar_time:>10.4f} {astar_time / replan_time:>8.1f}x "
+              f"{planner.expansions:>11} {astar_stats['expansions']:>10}")
+    planner.close()
+
+
+def bench_distance_field(size=1024, num_goals=3, num_queries=100, seed=0):
+    """
+    Compares answering queries to a few shared goals with DistanceFieldCache
+    to running astar_cells for every query.
+
+    Args:
+        size (int):        The width and height of the building grid.
+        num_goals (int):   The number of distinct goals.
+        num_queries (int): The number of queries, spread over the goals.
+        seed (int):        The random seed.
+    """
+    rng = np.random.default_rng(seed)
+    ogm = OccupancyGridMap(make_building(size, seed=seed))
+    free_cells = np.argwhere(ogm.free_mask())[:, ::-1]
+    goals = [tuple(point) for point in free_cells[rng.integers(len(free_cells), size=num_goals)]]
+    queries = [(tuple(free_cells[rng.integers(len(free_cells))]), goals[i % num_goals])
+               for i in range(num_queries)]
+
+    _, field_time = timed(distance_field, ogm.free_mask(), goals[0])
+    print(f"{size}x{size} building, {num_queries} queries to {num_goals} goals, "
+          f"one distance field takes {field_time:.4f} s")
+
+    start = time.perf_counter()
+    expected = [astar_cells(ogm.free_mask(), query_start, goal) for query_start, goal in queries]
+    astar_time = time.perf_counter() - start
+
+    cache = DistanceFieldCache()
+    start = time.perf_counter()
+    paths = [cache.path(ogm, query_start, goal) for query_start, goal in queries]
+    cache_time = time.perf_counter() - start
+    assert [len(path) for path in paths] == [len(cells) for cells in expected]
+
+    print(f"{'planner':>20} {'total (s)':>10} {'per query (ms)':>15}")
+    print(f"{'astar_cells':>20} {astar_time:>10.3f} {astar_time / num_queries * 1e3:>15.2f}")
+    print(f"{'DistanceFieldCache':>20} {cache_time:>10.3f} {cache_time / num_queries * 1e3:>15.2f}"
+          f"   ({cache.hits} hits, {cache.misses} misses, {cache.nbytes() / 2 ** 20:.1f} MiB)")
+
+
+def bench_path_cache(size=512, num_pairs=20, num_queries=200, seed=0):
+    """
+    Compares repeated astar_array queries with and without a PathCache, and
+    the cost of writing the path file on every search.
+
+    Args:
+        size (int):        The width and height of the building grid.
+        num_pairs (int):   The number of distinct (start, end) queries.
+        num_queries (int): The number of queries, drawn from the pairs.
+        seed (int):        The random seed.
+    """
+    rng = np.random.default_rng(seed)
+    ogm = OccupancyGridMap(make_building(size, seed=seed))
+    free_cells = np.argwhere(ogm.free_mask())[:, ::-1]
+    pairs = [(tuple(free_cells[rng.integers(len(free_cells))]), tuple(free_cells[rng.integers(len(free_cells))]))
+             for _ in range(num_pairs)]
+    queries = [pairs[i] for i in rng.integers(num_pairs, size=num_queries)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path_file = os.path.join(tmp, "path.csv")
+        print(f"{size}x{size} building, {num_queries} queries over {num_pairs} distinct pairs")
+        print(f"{'mode':>24} {'total (s)':>10} {'per query (ms)':>15}")
+
+        for label, kwargs in (("astar_array", {}), ("astar_array + path file", {"path_file": path_file})):
+            start = time.perf_counter()
+            for query_start, query_end in queries:
+                astar_array(ogm, query_start, query_end, **kwargs)
+            total = time.perf_counter() - start
+            print(f"{label:>24} {total:>10.3f} {total / num_queries * 1e3:>15.2f}")
+
+        cache = PathCache()
+        start = time.perf_counter()
+        for query_start, query_end in queries:
+            cache.plan(astar_array, ogm, query_start, query_end)
+        total = time.perf_counter() - start
+        print(f"{'PathCache':>24} {total:>10.3f} {total / num_queries * 1e3:>15.2f}"
+              f"   ({cache.hits} hits, {cache.misses} misses)")
+
+        # A changed cell makes every cached path stale
+        x, y = pairs[0][0]
+        ogm.setDataIndex((x, y), ogm.getDataIndex((x, y)))
+        cache.plan(astar_array, ogm, *pairs[0])
+        print(f"after setDataIndex: {cache.hits} hits, {cache.misses} misses")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mapping and path planning benchmarks")
+    parser.add_argument("benchmark", choices=["astar", "mapvalid", "scale", "raster", "keyframes", "stream", "gridfile", "outliers", "rays", "append", "tiled", "hierarchical", "jps", "turns", "bidirectional", "dstar", "field", "pathcache"])
+    parser.add_argument("--max-size", type=int, default=4096)
+    parser.add_argument("--legacy-max", type=int, default=256)
+    args = parser.parse_args()
+
+    if args.benchmark == "astar":
+        bench_astar(args.max_size, args.legacy_max)
+    elif args.benchmark == "mapvalid":
+        bench_map_valid()
+    elif args.benchmark == "scale":
+        bench_scale_search()
+    elif args.benchmark == "raster":
+        bench_rasterize()
+    elif args.benchmark == "keyframes":
+        bench_extract_keyframes()
+    elif args.benchmark == "stream":
+        bench_stream_map()
+    elif args.benchmark == "gridfile":
+        bench_grid_file()
+    elif args.benchmark == "outliers":
+        bench_outliers()
+    elif args.benchmark == "rays":
+        bench_landmark_rays()
+    elif args.benchmark == "append":
+        bench_append_keyframes()
+    elif args.benchmark == "tiled":
+        bench_tiled_grid()
+    elif args.benchmark == "hierarchical":
+        bench_hierarchical()
+    elif args.benchmark == "jps":
+        bench_jps()
+    elif args.benchmark == "turns":
+        bench_turns()
+    elif args.benchmark == "bidirectional":
+        bench_bidirectional()
+    elif args.benchmark == "dstar":
+        bench_dstar()
+    elif args.benchmark == "field":
+        bench_distance_field()
+    elif args.benchmark == "pathcache":
+        bench_path_cache()
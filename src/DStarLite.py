@@ -0,0 +1,291 @@
+# ------------------------------------------------------------------------------
+# Name         : DStarLite.py
+# Date Created : 10/18/2026
+# Author(s)    : Micheal Caracciolo, Chris Lloyd, Owen Casciotti
+# Github Link  : https://github.com/michealcarac/VSLAM-Mapping
+# Description  : Incremental D* Lite path planner for the occupancy grid map.
+# Paper        : S. Koenig and M. Likhachev, "D* Lite", AAAI 2002
+# ------------------------------------------------------------------------------
+
+# Internal Imports
+from AStarOCC import annotate_path
+
+# External Imports
+import heapq
+import numpy as np
+
+class DStarLite:
+    """
+    A path planner that keeps its search between queries and repairs it when
+    the map changes or the robot moves.
+
+    The planner searches backward from the goal over the unoccupied cells of
+    an OccupancyGridMap with the 4-connected moves of astar, and registers
+    itself as a listener of the map. Cells changed with setDataIndex are
+    collected and only the part of the search they affect is redone on the
+    next call to plan. Replacing the whole grid map starts a new search.
+
+    Attributes:
+        ogm (OccupancyGridMap): The map planned on.
+        start (tuple of int):   The current index point (x, y) of the robot.
+        goal (tuple of int):    The goal index point (x, y).
+        expansions (int):       The number of cells expanded by the last plan.
+    """
+
+    def __init__(self, ogm, start, goal):
+        """
+        The default constructor for class DStarLite.
+
+        Args:
+            ogm (OccupancyGridMap): The map to plan on.
+            start (tuple of int):   The start index point (x, y).
+            goal (tuple of int):    The goal index point (x, y).
+        """
+        self.ogm        = ogm
+        self.start      = (int(start[0]), int(start[1]))
+        self.goal       = (int(goal[0]), int(goal[1]))
+        self.expansions = 0
+
+        self._changed = set()
+        self._reset   = False
+        self._initialize()
+        self.ogm.addListener(self._cellsChanged)
+
+    # ----------------------------------------------------------------------------
+    # Class Methods
+    # ----------------------------------------------------------------------------
+
+    def plan(self):
+        """
+        Method to get the shortest path from the current start to the goal.
+
+        Returns:
+            path (list of [x, y, angle]): The path, or None if no path exists.
+        """
+        if self._reset:
+            self._initialize()
+        elif self._changed:
+            self._applyChanges()
+        self._computeShortestPath()
+
+        cells = self._extractPath()
+        if cells is None:
+            return None
+        return annotate_path(cells)
+
+    def moveTo(self, index_point):
+        """
+        Method to move the start to the robot's new position.
+
+        Args:
+            index_point (tuple of int): The new start index point (x, y).
+        """
+        x, y = int(index_point[0]), int(index_point[1])
+        # Keys already in the open list stay valid lower bounds by adding the move to km
+        self._km += abs(x - self._last[0]) + abs(y - self._last[1])
+        self._last = (x, y)
+        self.start = (x, y)
+
+    def close(self):
+        """
+        Method to stop listening to map changes.
+        """
+        self.ogm.removeListener(self._cellsChanged)
+
+    def _initialize(self):
+        """
+        Method to start a new search on the current map.
+        """
+        self._free = self.ogm.free_mask()
+        self._rows, self._cols = self._free.shape
+        size = self._rows * self._cols
+
+        # Flat views, the free mask one follows setDataIndex updates of the map
+        self._free_v  = memoryview(self._free.ravel())
+        self._g_arr   = np.full(size, np.inf)
+        self._rhs_arr = np.full(size, np.inf)
+        self._key_arr = np.full((2, size), np.inf) # Key in the open list, inf if not in it
+        self._g, self._rhs = memoryview(self._g_arr), memoryview(self._rhs_arr)
+        self._key1, self._key2 = memoryview(self._key_arr[0]), memoryview(self._key_arr[1])
+
+        self._km      = 0
+        self._last    = self.start
+        self._open    = []
+        self._changed = set()
+        self._reset   = False
+
+        self._goal_index = self._index(self.goal)
+        if self._goal_index is None:
+            return
+        self._rhs[self._goal_index] = 0
+        self._queue(self._goal_index)
+
+    def _cellsChanged(self, index_points):
+        """
+        Listener for OccupancyGridMap cell changes.
+        """
+        if index_points is None:
+            self._reset = True
+        elif not self._reset:
+            self._changed.update((int(x), int(y)) for x, y in index_points)
+
+    def _applyChanges(self):
+        """
+        Method to update the cells whose edge costs changed.
+        """
+        # A changed cell changes the cost of every edge to and from it
+        affected = set()
+        for x, y in self._changed:
+            index = self._index((x, y))
+            if index is None:
+                continue
+            affected.add(index)
+            affected.update(self._neighbors(index, blocked=True))
+        self._changed = set()
+
+        for index in affected:
+            self._updateRhs(index)
+            self._queue(index)
+
+    def _index(self, index_point):
+        """
+        Method to get the flat index of an index point, None if off the map.
+        """
+        x, y = index_point
+        if 0 <= x < self._cols and 0 <= y < self._rows:
+            return y * self._cols + x
+        return None
+
+    def _neighbors(self, index, blocked=False):
+        """
+        Method to get the flat indexes of the unoccupied neighbors of an
+        unoccupied cell, the cells it has an edge to. With blocked set, every
+        neighbor on the map is returned instead.
+        """
+        free, cols = self._free_v, self._cols
+        if not (blocked or free[index]):
+            return []
+        x = index % cols
+        neighbors = []
+        for neighbor, valid in ((index - cols, index >= cols), (index + cols, index < len(free) - cols),
+                                (index - 1, x > 0), (index + 1, x < cols - 1)):
+            if valid and (blocked or free[neighbor]):
+                neighbors.append(neighbor)
+        return neighbors
+
+    def _updateRhs(self, index):
+        """
+        Method to recompute the rhs of a cell from its neighbors.
+        """
+        if index == self._goal_index:
+            return
+        g = self._g
+        best = np.inf
+        for neighbor in self._neighbors(index):
+            if g[neighbor] + 1 < best:
+                best = g[neighbor] + 1
+        self._rhs[index] = best
+
+    def _queue(self, index):
+        """
+        Method to put an inconsistent cell in the open list with its current
+        key, or take a consistent one out.
+        """
+        g, rhs = self._g[index], self._rhs[index]
+        if g == rhs:
+            self._key1[index] = np.inf
+            return
+        best = g if g < rhs else rhs
+        y, x = divmod(index, self._cols)
+        k1 = best + abs(x - self.start[0]) + abs(y - self.start[1]) + self._km
+        self._key1[index], self._key2[index] = k1, best
+        heapq.heappush(self._open, (k1, best, index))
+
+    def _topKey(self):
+        """
+        Method to get the smallest key in the open list, dropping stale entries.
+        """
+        key1, key2 = self._key1, self._key2
+        while self._open:
+            k1, k2, index = self._open[0]
+            if key1[index] == k1 and key2[index] == k2:
+                return (k1, k2)
+            heapq.heappop(self._open)
+        return (np.inf, np.inf)
+
+    def _computeShortestPath(self):
+        """
+        Method to expand cells until the start is locally consistent.
+        """
+        start = self._index(self.start)
+        if start is None:
+            return
+        g, rhs, cols = self._g, self._rhs, self._cols
+        sx, sy = self.start
+        expansions = 0
+
+        while True:
+            top_key = self._topKey()
+            start_best = min(g[start], rhs[start])
+            if top_key[0] == np.inf or not (top_key < (start_best + self._km, start_best) or
+                                             rhs[start] > g[start]):
+                break
+
+            _, _, index = heapq.heappop(self._open)
+            g_old, best = g[index], min(g[index], rhs[index])
+            y, x = divmod(index, cols)
+            if top_key[0] < best + abs(x - sx) + abs(y - sy) + self._km:
+                # Key grew since the robot moved, put it back in order
+                self._queue(index)
+                continue
+
+            expansions += 1
+            self._key1[index] = np.inf
+            if g_old > rhs[index]:
+                # Overconsistent, its neighbors can only get cheaper through it
+                g[index] = rhs[index]
+                for neighbor in self._neighbors(index):
+                    if neighbor != self._goal_index and g[index] + 1 < rhs[neighbor]:
+                        rhs[neighbor] = g[index] + 1
+                        self._queue(neighbor)
+            else:
+                # Underconsistent, recompute every cell that went through it
+                g[index] = np.inf
+                for neighbor in self._neighbors(index) + [index]:
+                    if neighbor == index or rhs[neighbor] == g_old + 1:
+                        self._updateRhs(neighbor)
+                    self._queue(neighbor)
+
+        self.expansions = expansions
+
+    def _extractPath(self):
+        """
+        Method to follow the cheapest neighbors from the start to the goal.
+
+        Returns:
+            cells (list of (x, y)): The cells of the path, or None if no path exists.
+        """
+        start, goal = self._index(self.start), self._index(self.goal)
+        if start is None or goal is None or self._rhs[start] == np.inf:
+            return None
+
+        g = self._g
+        cells = [self.start]
+        current = start
+        for _ in range(self._rows * self._cols):
+            if current == goal:
+                return cells
+            best, best_cost = None, np.inf
+            for neighbor in self._neighbors(current):
+                if g[neighbor] < best_cost:
+                    best, best_cost = neighbor, g[neighbor]
+            if best is None:
+                return None
+            current = best
+            y, x = divmod(current, self._cols)
+            cells.append((x, y))
+        return None
+
+# ------------------------------------------------------------------------------
+# End of class DStarLite
+# ------------------------------------------------------------------------------
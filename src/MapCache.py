@@ -0,0 +1,266 @@
+# ------------------------------------------------------------------------------
+# Name         : MapCache.py
+# Date Created : 10/18/2026
+# Author(s)    : Micheal Caracciolo, Chris Lloyd, Owen Casciotti
+# Github Link  : https://github.com/michealcarac/VSLAM-Mapping
+# Description  : On-disk cache for parsed .msg maps and generated grid maps.
+# ------------------------------------------------------------------------------
+
+import hashlib
+import json
+import os
+import zipfile
+
+import numpy as np
+
+from MapFileUnpacker import Unpacker
+
+
+class MapCache:
+    """
+    A class to cache parsed maps and finished occupancy grid maps on disk.
+
+    Every entry is a .npz file named by a hash of its inputs. Keyframe and
+    landmark data is keyed by the content hash of the .msg file, so editing
+    or replacing a map file invalidates its entries automatically. Grid maps
+    are keyed by a hash of the keyframe array and the fromMapMSGData
+    arguments, which covers the source file as well as any rotation applied
+    to the keyframes before the grid is built.
+
+    The directory is kept under max_bytes by deleting the least recently
+    used entries whenever a new entry is stored.
+
+    Attributes:
+        cache_dir (string): The directory the entries are stored in.
+        max_bytes (int):    The maximum total size of the cache directory.
+    """
+
+    # Bump when the stored layout changes so old entries are not read
+    FORMAT_VERSION = 2
+
+    def __init__(self, cache_dir="../data/cache", max_bytes=256 * 2 ** 20):
+        """
+        The default constructor for class MapCache.
+
+        Args:
+            cache_dir (string): The directory the entries are stored in.
+            max_bytes (int):    The maximum total size of the cache directory.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    # ----------------------------------------------------------------------------
+    # Class Methods
+    # ----------------------------------------------------------------------------
+
+    def extractMapData(self, mapfile, streaming=True):
+        """
+        Method to get the keyframe and landmark data of a .msg map file.
+
+        Args:
+            mapfile (string): The .msg map file.
+            streaming (bool): Use the streaming reader on a cache miss.
+
+        Returns:
+            keyframes (array of float32): The keyframe positions (x, y, z).
+            landmarks (array of float32): The landmark positions (x, y, z).
+        """
+        key = self._makeKey("map", self.fileHash(mapfile), source=mapfile)
+        entry = self._load(key)
+        if entry is not None:
+            return entry["keyframes"], entry["landmarks"]
+
+        unpack = Unpacker()
+        unpack.unpackMSGmap(mapfile, streaming=streaming)
+        keyframes = unpack.extract_keyframe_data()
+        landmarks = unpack.extract_landmark_data()
+
+        self._store(key, mapfile, keyframes=keyframes, landmarks=landmarks)
+        return keyframes, landmarks
+
+    def buildGrid(self, ogm, keyframes, **kwargs):
+        """
+        Method to fill a gridmap from keyframe points, like fromMapMSGData.
+
+        A cache hit also restores scale_search_stats, as saved by the search
+        that built the entry, and hit_counts when count_hits is set.
+
+        Args:
+            ogm (OccupancyGridMap):              The gridmap to fill.
+            keyframes (array of float32 points): The keyframe point data.
+            kwargs:                              Arguments for fromMapMSGData.
+
+        Returns:
+            ogm (OccupancyGridMap): The filled gridmap.
+        """
+        keyframes = np.ascontiguousarray(keyframes, dtype=float)
+        keyframe_hash = hashlib.sha256(keyframes.tobytes())
+        keyframe_hash.update(str(keyframes.shape).encode())
+        key = self._makeKey("grid", keyframe_hash.hexdigest(), kwargs)
+
+        required = ["grid_map", "cell_size", "trans_pt", "cell_threshold", "scale_search_stats"]
+        if kwargs.get("count_hits"):
+            required.append("hit_counts")
+
+        entry = self._load(key, required)
+        if entry is not None:
+            ogm.grid_map           = entry["grid_map"]
+            ogm.cell_size          = float(entry["cell_size"])
+            ogm.trans_pt           = tuple(entry["trans_pt"])
+            ogm.cell_threshold     = float(entry["cell_threshold"])
+            ogm.scale_search_stats = json.loads(str(entry["scale_search_stats"]))
+            if "hit_counts" in entry:
+                ogm.hit_counts = entry["hit_counts"]
+            return ogm
+
+        ogm.fromMapMSGData(keyframes, **kwargs)
+        arrays = {"grid_map": ogm.grid_map, "cell_size": ogm.cell_size, "trans_pt": ogm.trans_pt,
+                  "cell_threshold": ogm.cell_threshold,
+                  "scale_search_stats": np.array(json.dumps(ogm.scale_search_stats))}
+        if kwargs.get("count_hits"):
+            arrays["hit_counts"] = ogm.hit_counts
+        self._store(key, None, **arrays)
+        return ogm
+
+    def fileHash(self, filename):
+        """
+        Method to hash the contents of a file.
+
+        Args:
+            filename (string): The file to hash.
+
+        Returns:
+            digest (string): The sha256 hex digest of the file contents.
+        """
+        file_hash = hashlib.sha256()
+        with open(filename, "rb") as fd:
+            for chunk in iter(lambda: fd.read(2 ** 20), b""):
+                file_hash.update(chunk)
+        return file_hash.hexdigest()
+
+    def clear(self):
+        """
+        Method to delete every entry in the cache directory.
+        """
+        for path, _, _ in self._entries():
+            os.remove(path)
+
+    def _makeKey(self, kind, content_hash, params=None, source=None):
+        """
+        Method to combine a content hash and generation parameters into a key.
+
+        The entries of a source file share the key prefix of _sourcePrefix,
+        so they can be found by name.
+
+        Returns:
+            key (string): The entry name.
+        """
+        params = json.dumps(params or {}, sort_keys=True, default=str)
+        key_hash = hashlib.sha256(f"{self.FORMAT_VERSION}:{content_hash}:{params}".encode())
+        if source is None:
+            return f"{kind}_{key_hash.hexdigest()[:32]}"
+        return f"{self._sourcePrefix(kind, source)}{key_hash.hexdigest()[:32]}"
+
+    def _sourcePrefix(self, kind, source):
+        """
+        Method to get the key prefix of the entries of a source file.
+
+        Returns:
+            prefix (string): The kind and a hash of the absolute source path.
+        """
+        source_hash = hashlib.sha256(os.path.abspath(source).encode())
+        return f"{kind}_{source_hash.hexdigest()[:16]}_"
+
+    def _entryPath(self, key):
+        return os.path.join(self.cache_dir, key + ".npz")
+
+    def _entries(self):
+        """
+        Method to list the cache entries.
+
+        Returns:
+            entries (list of (path, size, mtime)): Every .npz file in the cache.
+        """
+        if not os.path.isdir(self.cache_dir):
+            return []
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".npz"):
+                path = os.path.join(self.cache_dir, name)
+                stat = os.stat(path)
+                entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def _load(self, key, required=()):
+        """
+        Method to read a cache entry and mark it as recently used.
+
+        Args:
+            key (string):              The entry name.
+            required (list of string): Arrays the entry must hold, an entry
+                                       without them is treated as corrupt.
+
+        Returns:
+            entry (dict of arrays): The stored arrays, or None on a miss.
+        """
+        path = self._entryPath(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as npz:
+                # A missing required array raises KeyError
+                entry = {name: npz[name] for name in list(required) + npz.files}
+        except (OSError, EOFError, ValueError, KeyError, zipfile.BadZipFile):
+            # Corrupt or partially written entry
+            os.remove(path)
+            return None
+        os.utime(path)
+        return entry
+
+    def _store(self, key, source, **arrays):
+        """
+        Method to write a cache entry and evict old entries.
+
+        Entries written earlier for the same source file are removed, since a
+        new key for that file means its contents changed. They are found by
+        their key prefix, without opening any entry.
+
+        Args:
+            key (string):    The entry name, from _makeKey with the same source.
+            source (string): The source file path, or None.
+            arrays:          The arrays to store.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._entryPath(key)
+
+        if source is not None:
+            prefix = self._sourcePrefix(key.split("_", 1)[0], source)
+            for old_path, _, _ in self._entries():
+                if os.path.basename(old_path).startswith(prefix) and old_path != path:
+                    os.remove(old_path)
+
+        # Write then rename so readers never see a partial entry
+        # The file object keeps savez from adding .npz, so _entries skips it
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as fd:
+            np.savez(fd, **arrays)
+        os.replace(tmp_path, path)
+
+        self._evict(keep=path)
+
+    def _evict(self, keep=None):
+        """
+        Method to delete least recently used entries until under max_bytes.
+
+        Args:
+            keep (string): An entry path that is never evicted.
+        """
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            os.remove(path)
+            total -= size
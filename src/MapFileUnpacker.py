@@ -7,101 +7,234 @@
 # ------------------------------------------------------------------------------
 
 import csv
+import mmap
 import msgpack
 import numpy as np
 from scipy.spatial.transform import Rotation as R
 
 
 class Unpacker:
+    # Fields kept by the streaming reader, with their array widths.
+    # Fields with a width of None vary in length and are kept as a list of arrays.
+    STREAM_FIELDS = {
+        'keyframes': {'rot_cw': 4, 'trans_cw': 3, 'lm_ids': None},
+        'landmarks': {'pos_w': 3},
+    }
+
     def __init__(self):
-        pass
+        self.data = None
+        self.streamed = None
 
-    def unpackMSGmap(self,mapfile):
+    def unpackMSGmap(self,mapfile, streaming=False, use_mmap=False):
         # USAGE: Takes in map file in form of .msg
+        # With streaming, the file is walked with msgpack.Unpacker and only
+        # the keyframe poses and observations and landmark positions are
+        # kept, as arrays in self.streamed. use_mmap reads the file through a
+        # memory map.
+        if streaming:
+            self.data = None
+            with open(mapfile, "rb") as msg_pack_file:
+                if use_mmap:
+                    with mmap.mmap(msg_pack_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                        self.streamed = self.stream_fields(mapped)
+                else:
+                    self.streamed = self.stream_fields(msg_pack_file)
+            return
+
         with open(mapfile, "rb") as msg_pack_file:
             msg_pack_byte_data = msg_pack_file.read()
 
+        self.streamed = None
         self.data = msgpack.unpackb(msg_pack_byte_data)
 
+    def stream_fields(self, file_like):
+        # USAGE: Takes in a readable .msg file object, and returns a dict of
+        # (N,width) arrays for every field in STREAM_FIELDS, plus the list of
+        # entry ids of every section. Everything else in the map is skipped
+        # without being built. Raises a ValueError on a truncated file, like
+        # msgpack.unpackb does.
+        try:
+            return self._stream_fields(msgpack.Unpacker(file_like))
+        except msgpack.OutOfData:
+            raise ValueError("Unpack failed: incomplete input") from None
+
+    def _stream_fields(self, unpacker):
+        streamed = {}
+        for section, fields in self.STREAM_FIELDS.items():
+            streamed[section] = []
+            for field, width in fields.items():
+                streamed[field] = [] if width is None else np.empty((0, width))
+
+        for _ in range(unpacker.read_map_header()):
+            section = unpacker.unpack()
+            if section not in self.STREAM_FIELDS:
+                unpacker.skip()
+                continue
+
+            wanted = self.STREAM_FIELDS[section]
+            num_entries = unpacker.read_map_header()
+            arrays = {field: [np.empty(0, dtype=np.int64)] * num_entries if width is None
+                      else np.full((num_entries, width), np.nan)
+                      for field, width in wanted.items()}
+            ids = []
+            for i in range(num_entries):
+                ids.append(unpacker.unpack())
+                for _ in range(unpacker.read_map_header()):
+                    field = unpacker.unpack()
+                    if field not in wanted:
+                        unpacker.skip()
+                    elif wanted[field] is None:
+                        arrays[field][i] = np.array(unpacker.unpack(), dtype=np.int64)
+                    else:
+                        arrays[field][i] = unpacker.unpack()
+            streamed.update(arrays)
+            streamed[section] = ids
+
+        return streamed
+
     def extract_keyframe_data(self):
         # USAGE: Takes in zero arguments, and returns
         # the extracted keyframe data in the form (x,y,z)
-        kfs_trans = []
-        kfs_rot = []
-        kfs_pos = []
-        for kf in self.data['keyframes']:
-            ktrans = self.data['keyframes'][kf]['trans_cw']
-            kf_trans = [ktrans[0], ktrans[1], ktrans[2]]
-
-            krot = self.data['keyframes'][kf]['rot_cw']
-            kf_rot = [krot[0], krot[1], krot[2], krot[3]]
-
-            kf_rot_mat = R.from_quat(kf_rot)
-            kf_pos = np.matmul(-np.transpose(kf_rot_mat.as_matrix()), np.transpose(kf_trans))
-
-            kfs_trans.append(kf_trans)
-            kfs_rot.append(kf_rot)
-            kfs_pos.append(kf_pos)
-
-        self.keyframes_trans = np.array(kfs_trans)
-        self.keyframes_rot = np.array(kfs_rot)
-        self.keyframes_pos = np.array(kfs_pos)
-
-        placeholderX = self.keyframes_pos[:, 0]  # Can't use numpy arrays in append
-        placeholderY = self.keyframes_pos[:, 1]
-        placeholderZ = self.keyframes_pos[:, 2]
-        kf_pos = []
-        for i in range(len(self.keyframes_pos[:, 0])):
-            set = [placeholderX[i], placeholderZ[i], -placeholderY[i]]
-            kf_pos.append(set)
-        self.keyframes_pos = np.array(kf_pos)
+        if self.streamed is not None:
+            self.keyframes_rot = self.streamed['rot_cw']
+            self.keyframes_trans = self.streamed['trans_cw']
+        else:
+            keyframes = self.data['keyframes']
+            num_kfs = len(keyframes)
+
+            # Gather every keyframe into contiguous arrays in one pass,
+            # missing poses are left as NaN like the streaming reader does
+            self.keyframes_rot = np.full((num_kfs, 4), np.nan)
+            self.keyframes_trans = np.full((num_kfs, 3), np.nan)
+            for i, kf in enumerate(keyframes.values()):
+                if 'rot_cw' in kf:
+                    self.keyframes_rot[i] = kf['rot_cw']
+                if 'trans_cw' in kf:
+                    self.keyframes_trans[i] = kf['trans_cw']
+
+        self.keyframes_pos = self.keyframe_positions(self.keyframes_rot, self.keyframes_trans)
         data = self.keyframes_pos
 
         return data
 
+    @staticmethod
+    def keyframe_positions(rot_cw, trans_cw):
+        # USAGE: Takes in the (N,4) rot_cw quaternions and (N,3) trans_cw
+        # translations, and returns the camera centers in the form (x,y,z).
+        # Raises a ValueError if a keyframe is missing its pose (NaN rows).
+        if len(rot_cw) == 0:
+            return np.empty((0, 3))
+        for name, values in (('rot_cw', rot_cw), ('trans_cw', trans_cw)):
+            missing = np.flatnonzero(np.isnan(values).any(axis=1))
+            if len(missing):
+                raise ValueError(f"Keyframe {missing[0]} has no {name}")
+
+        # Camera center is -R^T * t for every keyframe
+        rot_mats = R.from_quat(rot_cw).as_matrix()
+        pos = -np.einsum('nji,nj->ni', rot_mats, trans_cw)
+
+        # Swap axes into [x, z, -y]
+        pos = pos[:, [0, 2, 1]]
+        pos[:, 2] *= -1
+        return pos
+
     def extract_landmark_data(self):
         # USAGE: Takes in zero arguments, and returns
         # the extracted landmark data in the form (x,y,z)
-        lms_trans = []
-        for lm in self.data['landmarks']:
-            lmtrans = self.data['landmarks'][lm]['pos_w']
-            lm_trans = [lmtrans[0], lmtrans[2], -lmtrans[1]]
-            lms_trans.append(lm_trans)
-
-        self.landmark_coords = np.array(lms_trans)
-        # Get rid of outliers
-        self.landmark_coords = self.delete_points(self.landmark_coords)
+        if self.streamed is not None:
+            lms_pos = self.streamed['pos_w']
+        else:
+            lms_pos = np.array([lm['pos_w'] for lm in self.data['landmarks'].values()]).reshape(-1, 3)
+
+        # Swap axes into [x, z, -y]
+        self.landmark_coords = lms_pos[:, [0, 2, 1]]
+        self.landmark_coords[:, 2] *= -1
+        # Get rid of outliers, keeping which landmarks survived
+        self.landmark_indexes = self.filter_outliers(self.landmark_coords)
+        self.landmark_coords = self.landmark_coords[self.landmark_indexes]
         data = self.landmark_coords
 
         return data
 
+    def extract_observation_data(self):
+        # USAGE: Takes in zero arguments, and returns an (K,2) array of
+        # (keyframe index, landmark index) pairs, one for every landmark a
+        # keyframe observed. The indexes are rows of extract_keyframe_data and
+        # extract_landmark_data, so observations of outlier landmarks are dropped.
+        self.extract_landmark_data()
+
+        if self.streamed is not None:
+            kfs_lm_ids = self.streamed['lm_ids']
+            lm_keys = self.streamed['landmarks']
+        else:
+            kfs_lm_ids = [kf.get('lm_ids', []) for kf in self.data['keyframes'].values()]
+            lm_keys = list(self.data['landmarks'].keys())
+
+        # Landmark id of every row of landmark_coords, sorted for lookups
+        lm_ids = np.array([int(key) for key in lm_keys], dtype=np.int64)[self.landmark_indexes]
+        order = np.argsort(lm_ids)
+        sorted_ids = lm_ids[order]
+
+        counts = np.array([len(ids) for ids in kfs_lm_ids], dtype=np.int64)
+        obs_kf = np.repeat(np.arange(len(kfs_lm_ids)), counts)
+        obs_lm = np.concatenate([np.asarray(ids, dtype=np.int64) for ids in kfs_lm_ids] +
+                                [np.empty(0, dtype=np.int64)])
+
+        # Keypoints without a landmark are -1, drop them and unknown ids
+        found = obs_lm >= 0
+        if len(sorted_ids):
+            pos = np.minimum(np.searchsorted(sorted_ids, obs_lm), len(sorted_ids) - 1)
+            found &= sorted_ids[pos] == obs_lm
+        else:
+            pos = np.zeros_like(obs_lm)
+            found[:] = False
+        self.observations = np.stack([obs_kf[found], order[pos[found]]], axis=1)
+        return self.observations
+
     def delete_points(self, data, m=2.5):
         # FOR LANDMARK DATA ONLY
         # Deletes the points that are outliers
-        # X outliers
-        boolsA = abs(data[:, 0] - np.mean(data[:, 0])) < m * np.std(data[:, 0])
-        falseindexes = []
-        for i in range(len(data)):
-            if not boolsA[i]:
-                falseindexes.append(i)
-        new = np.delete(data, falseindexes, axis=0)
-
-        # Y outliers
-        boolsB = abs(new[:, 1] - np.mean(new[:, 1])) < m * np.std(new[:, 1])
-        falseindexes = []
-        for i in range(len(new)):
-            if not boolsB[i]:
-                falseindexes.append(i)
-        newb = np.delete(new, falseindexes, axis=0)
-
-        # Z outliers
-        boolsC = abs(newb[:, 2] - np.mean(newb[:, 2])) < m * np.std(newb[:, 2])
-        falseindexes = []
-        for i in range(len(newb)):
-            if not boolsC[i]:
-                falseindexes.append(i)
-        newc = np.delete(newb, falseindexes, axis=0)
-        return newc
+        # X outliers, then Y outliers of what is left, then Z outliers
+        return data[self.filter_outliers(data, m)]
+
+    def filter_outliers(self, data, m=2.5, mode="sequential", voxel_size=0.05):
+        # USAGE: Takes in (N,3) point data, and returns the sorted indexes of
+        # the points to keep, so associated data can be filtered with them.
+        # Modes:
+        #   sequential: Per axis mean/std test, each axis on the points kept by
+        #               the axes before it (what delete_points does)
+        #   combined:   Per axis mean/std test on all points at once
+        #   mad:        Per axis median/MAD test, robust to the outliers themselves
+        #   voxel:      Keeps the first point in every voxel_size voxel
+        data = np.asarray(data)
+        keep = np.arange(len(data))
+
+        if mode == "sequential":
+            for axis in range(data.shape[1]):
+                values = data[keep, axis]
+                keep = keep[abs(values - np.mean(values)) < m * np.std(values)]
+        elif mode == "combined":
+            mask = np.all(abs(data - np.mean(data, axis=0)) < m * np.std(data, axis=0), axis=1)
+            keep = keep[mask]
+        elif mode == "mad":
+            median = np.median(data, axis=0)
+            # Scaled so the MAD estimates the std for normally distributed data
+            mad = 1.4826 * np.median(abs(data - median), axis=0)
+            keep = keep[np.all(abs(data - median) <= m * mad, axis=1)]
+        elif mode == "voxel":
+            voxels = np.floor(data / voxel_size).astype(np.int64)
+            voxels -= voxels.min(axis=0, initial=0)
+            dims = voxels.max(axis=0, initial=0) + 1
+            if np.prod(dims.astype(float)) < 2 ** 62:
+                # One integer key per voxel makes the unique much faster
+                _, first = np.unique(np.ravel_multi_index(voxels.T, dims), return_index=True)
+            else:
+                _, first = np.unique(voxels, axis=0, return_index=True)
+            keep = np.sort(first)
+        else:
+            raise ValueError(f"Unknown outlier mode: {mode}")
+
+        return keep
 
     def export(self):
         with open('../data/mapdataKeyframes.csv', 'w') as csvfile:
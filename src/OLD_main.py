@@ -12,17 +12,16 @@ import matplotlib.pyplot as plt
 # Import our custom modules
 from AStarOCC import astar
 from OccupancyGridMap import OccupancyGridMap
-from MapFileUnpacker import Unpacker
+from MapCache import MapCache
 
 if __name__ == "__main__":
     # Initialize Objects
     ogm = OccupancyGridMap()
-    unpack = Unpacker()
+    cache = MapCache()
 
-    # Get keyframe data from map file (.msg)
+    # Get keyframe data from map file (.msg), cached after the first run
     print("Unpacking MSG file...")
-    unpack.unpackMSGmap("../data/ECELAB_V3_map.msg")
-    keyframes = unpack.extract_keyframe_data()
+    keyframes, _ = cache.extractMapData("../data/ECELAB_V3_map.msg")
 
     t = 1  # Set 1 if need rotation
     p = np.deg2rad(-10)  # Rotation value
@@ -38,7 +37,7 @@ if __name__ == "__main__":
 
     # Create mapdata
     print("Loading map data...")
-    ogm.fromMapMSGData(keyframes)
+    cache.buildGrid(ogm, keyframes)
     # ogm.fromCSV("../data/Map.csv")
     # ogm.fromKeyframesCSV("../data/keyframes.csv")
 
@@ -47,7 +46,7 @@ if __name__ == "__main__":
     #       x^ ^y
     end = (0, 0)
     #    x^ ^y
-    line = astar(ogm, start, end)
+    line = astar(ogm, start, end, path_file='../data/path.csv')
     print(line)
 
     # Visualize gridmap
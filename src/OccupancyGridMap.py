@@ -8,12 +8,35 @@
 
 # Internal Imports
 from MapFileUnpacker import * # For test purposes
+from MapCache import MapCache # For test purposes
 
 # External Imports
 import matplotlib.pyplot as plt
 from matplotlib import colors
 import numpy as np
-import csv
+import itertools
+import os
+import struct
+import time
+
+# Cell classifications returned by OccupancyGridMap.classify
+CELL_INVALID    = -1
+CELL_UNKNOWN    = 0
+CELL_UNOCCUPIED = 1
+CELL_OCCUPIED   = 2
+
+# Adjacent edge offsets (x, y), in the bit order used by the neighbor masks
+NEIGHBOR_OFFSETS = ((0, -1), (0, 1), (-1, 0), (1, 0))
+
+# Native grid file header, followed by the raw row-major cell data:
+# magic, version, header size, rows, cols, dtype string, cell_threshold,
+# cell_size, trans_pt x, trans_pt y
+GRID_FILE_MAGIC   = b"OGMP"
+GRID_FILE_VERSION = 1
+GRID_FILE_HEADER  = struct.Struct("<4sHHqq8sdddd")
+
+# Source of OccupancyGridMap.map_id, unlike id() never reused within a process
+_MAP_IDS = itertools.count()
 
 class OccupancyGridMap:
     """
@@ -36,6 +59,13 @@ class OccupancyGridMap:
 
     This allows to go between coordinates and actual position.
 
+    The unoccupied/occupied classification of every cell is cached as boolean
+    masks. The cache is rebuilt when grid_map or cell_threshold is assigned and
+    kept up to date by setDataIndex. Writing into grid_map directly bypasses
+    the cache, so use setDataIndex or reassign grid_map instead. The same
+    changes increase version, which planners use to key cached results
+    together with map_id.
+
     Attributes:
         grid_map (matrix of float32): The occupancy grid map cell data.
         cell_threshold (float32):     The threshold to determine if a cell is
@@ -43,6 +73,8 @@ class OccupancyGridMap:
         cell_size (float32):          The unitless size that a single cell
                                                                     (width and height) represents.
         trans_pt (Tuple point):       A point to shift the gridmap by.
+        version (int):                The number of changes made to the cells.
+        map_id (int):                 A number unique to this map instance.
     """
 
     def __init__(self, _grid_map=[], _cell_threshold=0.5, _cell_size=1, _trans_pt = (0,0)):
@@ -56,11 +88,44 @@ class OccupancyGridMap:
             _trans_pt (Tuple point):       A point to shift the gridmap by.
         """
 
+        self.map_id         = next(_MAP_IDS)
+        self.version        = 0
+        self._listeners     = []
+        self._free_mask     = None
+        self._occupied_mask = None
+        self._neighbor_mask = None
+        self._pyramid       = None
+        self._grid_buffer   = None # Spare capacity for appendKeyframes
+        self._grid_origin   = (0, 0)
+
         self.grid_map       = _grid_map
         self.cell_threshold = _cell_threshold
         self.cell_size      = _cell_size
         self.trans_pt       = _trans_pt
 
+    @property
+    def grid_map(self):
+        """The occupancy grid map cell data."""
+        return self._grid_map
+
+    @grid_map.setter
+    def grid_map(self, value):
+        self._grid_map = value
+        self._grid_buffer = None
+        self._invalidateCache()
+        self._notifyListeners(None)
+
+    @property
+    def cell_threshold(self):
+        """The threshold to determine if a cell is occupied or not."""
+        return self._cell_threshold
+
+    @cell_threshold.setter
+    def cell_threshold(self, value):
+        self._cell_threshold = value
+        self._invalidateCache()
+        self._notifyListeners(None)
+
     # ----------------------------------------------------------------------------
     # Class Methods
     # ----------------------------------------------------------------------------
@@ -110,6 +175,14 @@ class OccupancyGridMap:
         # Set the occupancy value
         self.grid_map[y][x] = value
 
+        # Keep the cached classification up to date
+        if self._free_mask is not None:
+            self._free_mask[y, x]     = (0 <= value <= self.cell_threshold)
+            self._occupied_mask[y, x] = (self.cell_threshold <= value <= 1)
+            self._neighbor_mask       = None
+            self._pyramid             = None
+
+        self._notifyListeners([(x, y)])
         return value
 
     def isOccupiedIndex(self, index_point):
@@ -131,11 +204,14 @@ class OccupancyGridMap:
         # Get index point x,y
         x, y = index_point
 
-        # Get the occupancy value
+        # Read the cached mask if there is one, otherwise only this cell so a
+        # memory mapped grid is not classified as a whole for one query
+        if self._occupied_mask is not None:
+            return bool(self._occupied_mask[y, x])
         value = self.grid_map[y][x]
 
         # Get occupied status
-        return (self.cell_threshold <= value <= 1)
+        return bool(self.cell_threshold <= value <= 1)
 
     def isUnoccupiedIndex(self, index_point):
         """
@@ -156,11 +232,13 @@ class OccupancyGridMap:
         # Get index point x,y
         x, y = index_point
 
-        # Get the occupancy value
+        # Read the cached mask if there is one, otherwise only this cell
+        if self._free_mask is not None:
+            return bool(self._free_mask[y, x])
         value = self.grid_map[y][x]
 
-        # Get occupied status
-        return (0 <= value <= self.cell_threshold)
+        # Get unoccupied status
+        return bool(0 <= value <= self.cell_threshold)
 
     def isUnknownIndex(self, index_point):
         """
@@ -191,8 +269,221 @@ class OccupancyGridMap:
         x, y = index_point
 
         # Ensure the point is valid
-        return ((0 <= x < len(self.grid_map[0])) and
-                (0 <= y < len(self.grid_map)))
+        rows, cols = self._gridShape()
+        return ((0 <= x < cols) and
+                (0 <= y < rows))
+
+    def free_mask(self):
+        """
+        Method to get the cached mask of unoccupied cells.
+
+        Returns:
+            mask (matrix of bool): True where a cell is unoccupied, indexed [y, x].
+        """
+        if self._free_mask is None:
+            self._buildCache()
+        return self._free_mask
+
+    def occupied_mask(self):
+        """
+        Method to get the cached mask of occupied cells.
+
+        Returns:
+            mask (matrix of bool): True where a cell is occupied, indexed [y, x].
+        """
+        if self._occupied_mask is None:
+            self._buildCache()
+        return self._occupied_mask
+
+    def unknown_mask(self):
+        """
+        Method to get the mask of unknown cells.
+
+        Returns:
+            mask (matrix of bool): True where a cell is unknown, indexed [y, x].
+        """
+        return ~(self.free_mask() | self.occupied_mask())
+
+    def classify(self, index_points):
+        """
+        Method to classify many index points at once.
+
+        A cell at exactly cell_threshold is both occupied and unoccupied, it
+        is classified as CELL_UNOCCUPIED like isUnoccupiedIndex reports it.
+
+        Args:
+            index_points (array of int): An (N, 2) array of indexed points (x, y).
+
+        Returns:
+            classes (array of int): CELL_UNOCCUPIED, CELL_OCCUPIED, CELL_UNKNOWN
+                                    or CELL_INVALID for every point.
+        """
+        free = self.free_mask()
+        occupied = self.occupied_mask()
+        rows, cols = free.shape
+
+        index_points = np.asarray(index_points, dtype=int).reshape(-1, 2)
+        x, y = index_points[:, 0], index_points[:, 1]
+        valid = (0 <= x) & (x < cols) & (0 <= y) & (y < rows)
+
+        classes = np.full(len(index_points), CELL_INVALID)
+        xv, yv = x[valid], y[valid]
+        classes[valid] = np.where(free[yv, xv], CELL_UNOCCUPIED,
+                                  np.where(occupied[yv, xv], CELL_OCCUPIED, CELL_UNKNOWN))
+        return classes
+
+    def neighbor_mask(self):
+        """
+        Method to get the packed unoccupied neighbor bitmask of every cell.
+
+        Bit i of a cell is set when the cell at NEIGHBOR_OFFSETS[i] from it is
+        valid and unoccupied. The table is built on first use.
+
+        Returns:
+            mask (matrix of uint8): The neighbor bitmasks, indexed [y, x].
+        """
+        if self._neighbor_mask is None:
+            free = self.free_mask()
+            padded = np.pad(free, 1, constant_values=False)
+            rows, cols = free.shape
+            mask = np.zeros(free.shape, dtype=np.uint8)
+            for bit, (dx, dy) in enumerate(NEIGHBOR_OFFSETS):
+                shifted = padded[1 + dy:1 + dy + rows, 1 + dx:1 + dx + cols]
+                mask |= shifted.astype(np.uint8) << bit
+            self._neighbor_mask = mask
+        return self._neighbor_mask
+
+    def neighbors_free(self, index_point):
+        """
+        Method to get which adjacent edges of an index point are unoccupied.
+
+        Args:
+            index_point (tuple of int): An indexed point (x, y).
+
+        Returns:
+            mask (int): The neighbor bitmask, bit order of NEIGHBOR_OFFSETS.
+        """
+
+        # Ensure the point is valid
+        if (not self.isValidIndexPoint(index_point)):
+            print("ERROR: Entered point is invalid!")
+            return -1 # CDL=> Replace with exception later
+
+        # Get index point x,y
+        x, y = index_point
+
+        return int(self.neighbor_mask()[y, x])
+
+    def buildPyramid(self, levels=4, factor=2, mode="all"):
+        """
+        Method to get a pyramid of coarser unoccupied masks.
+
+        Level 0 is the unoccupied mask, every following level merges factor x
+        factor cells of the level below into one cell. With mode "all" a
+        coarse cell is unoccupied only if all of its cells are, which keeps
+        coarse paths safe. With mode "any" it is unoccupied if any of its
+        cells are, which keeps narrow doorways open. Cells past the edge of
+        the grid do not count against either mode. The pyramid is cached
+        until the grid map changes.
+
+        Args:
+            levels (int): The number of levels, including level 0.
+            factor (int): The number of cells merged along each axis per level.
+            mode (string): "all" or "any".
+
+        Returns:
+            pyramid (list of matrix of bool): The unoccupied mask of every level.
+        """
+        if mode not in ("all", "any"):
+            raise ValueError(f"Unknown pyramid mode: {mode}")
+
+        key = (levels, factor, mode)
+        if self._pyramid is not None and self._pyramid[0] == key:
+            return self._pyramid[1]
+
+        pyramid = [self.free_mask()]
+        for _ in range(1, levels):
+            below = pyramid[-1]
+            rows, cols = below.shape
+            coarse_rows, coarse_cols = -(-rows // factor), -(-cols // factor)
+
+            # Pad to whole blocks with the value that does not change the result
+            padded = np.full((coarse_rows * factor, coarse_cols * factor), mode == "all")
+            padded[:rows, :cols] = below
+            blocks = padded.reshape(coarse_rows, factor, coarse_cols, factor)
+            if mode == "all":
+                pyramid.append(blocks.all(axis=(1, 3)))
+            else:
+                pyramid.append(blocks.any(axis=(1, 3)))
+
+        self._pyramid = (key, pyramid)
+        return pyramid
+
+    def addListener(self, listener):
+        """
+        Method to register a function to call whenever cells change.
+
+        The listener is called as listener(index_points) after setDataIndex
+        or appendKeyframes change cells, with the changed index points (x, y),
+        and as listener(None) after the whole grid map or the cell threshold
+        is replaced, when every cell may have changed.
+
+        Args:
+            listener (function): The function to call.
+        """
+        self._listeners.append(listener)
+
+    def removeListener(self, listener):
+        """
+        Method to stop calling a function registered with addListener.
+
+        Args:
+            listener (function): The function to remove.
+        """
+        self._listeners.remove(listener)
+
+    def _notifyListeners(self, index_points):
+        """
+        Method to count a change and tell every listener which cells changed
+        (None for all).
+        """
+        self.version += 1
+        for listener in list(self._listeners):
+            listener(index_points)
+
+    def _buildCache(self):
+        """
+        Method to classify every cell of the grid map in one pass.
+        """
+        grid = np.asarray(self._grid_map, dtype=float)
+        if grid.ndim != 2:
+            grid = grid.reshape(0, 0)
+
+        self._free_mask     = (0 <= grid) & (grid <= self._cell_threshold)
+        self._occupied_mask = (self._cell_threshold <= grid) & (grid <= 1)
+        self._neighbor_mask = None
+        self._pyramid       = None
+
+    def _gridShape(self):
+        """
+        Method to get the (rows, cols) of the grid map without reading its cells.
+        """
+        shape = getattr(self._grid_map, "shape", None)
+        if shape is None:
+            # List of lists
+            shape = (len(self._grid_map), len(self._grid_map[0]) if len(self._grid_map) else 0)
+        if len(shape) != 2:
+            return (0, 0)
+        return shape
+
+    def _invalidateCache(self):
+        """
+        Method to drop the cached classification after the grid map changed.
+        """
+        self._free_mask     = None
+        self._occupied_mask = None
+        self._neighbor_mask = None
+        self._pyramid       = None
 
     def getMaxRow(self):
         """
@@ -300,6 +591,66 @@ class OccupancyGridMap:
         # save array into csv file
         np.savetxt(file, self.grid_map,delimiter=",")
 
+    def saveGrid(self, filename):
+        """
+        Method to save the gridmap in the native binary grid file format.
+
+        The file is a fixed size header holding the dimensions, dtype,
+        cell_threshold, cell_size and trans_pt, followed by the raw cell data,
+        so it can be opened again with loadGrid without parsing.
+
+        Args:
+            filename (string): The file to write.
+        """
+        grid = np.ascontiguousarray(self.grid_map)
+        if grid.ndim != 2:
+            grid = grid.reshape(0, 0)
+
+        header = GRID_FILE_HEADER.pack(GRID_FILE_MAGIC, GRID_FILE_VERSION, GRID_FILE_HEADER.size,
+                                       grid.shape[0], grid.shape[1], grid.dtype.str.encode(),
+                                       self.cell_threshold, self.cell_size,
+                                       self.trans_pt[0], self.trans_pt[1])
+        with open(filename, 'wb') as fd:
+            fd.write(header)
+            grid.tofile(fd)
+
+    def loadGrid(self, filename, mode="c"):
+        """
+        Method to open a gridmap saved with saveGrid.
+
+        The cell data is memory mapped, so only the pages that are touched are
+        read from disk.
+
+        Note: This method overwrites current grid map!
+
+        Args:
+            filename (string): The file to open.
+            mode (string):     The np.memmap mode. The default "c" allows
+                               setDataIndex without writing back to the file,
+                               "r+" writes changes back, "r" is read only.
+        """
+        with open(filename, 'rb') as fd:
+            header = fd.read(GRID_FILE_HEADER.size)
+        if len(header) != GRID_FILE_HEADER.size:
+            raise ValueError(f"{filename} is not a grid file")
+
+        (magic, version, header_size, rows, cols, dtype,
+         cell_threshold, cell_size, trans_x, trans_y) = GRID_FILE_HEADER.unpack(header)
+        if magic != GRID_FILE_MAGIC or version != GRID_FILE_VERSION:
+            raise ValueError(f"{filename} is not a version {GRID_FILE_VERSION} grid file")
+
+        dtype = np.dtype(dtype.rstrip(b"\0").decode())
+        if os.path.getsize(filename) < header_size + rows * cols * dtype.itemsize:
+            raise ValueError(f"{filename} is a truncated grid file")
+        if rows * cols == 0:
+            self.grid_map = np.empty((rows, cols), dtype=dtype)
+        else:
+            self.grid_map = np.memmap(filename, dtype=dtype, mode=mode, offset=header_size,
+                                      shape=(rows, cols))
+        self.cell_threshold = cell_threshold
+        self.cell_size      = cell_size
+        self.trans_pt       = (trans_x, trans_y)
+
 
     def fromCSV(self, filename):
         """
@@ -312,9 +663,7 @@ class OccupancyGridMap:
 
         Returns: None
         """ # CDL=> Not needed. Remove later
-        with open(filename, 'r') as fd:
-            reader = csv.reader(fd)
-            self.grid_map = np.array(list(reader)).astype("float")
+        self.grid_map = np.loadtxt(filename, delimiter=",", ndmin=2)
 
     def fromKeyframesCSV(self, filename):
         """
@@ -332,14 +681,34 @@ class OccupancyGridMap:
         # Create the gridmap
         self.fromMapMSGData(keyframes)
 
-    def fromMapMSGData(self, keyframes):
+    def fromMapMSGData(self, keyframes, scale_search="linear", scale_tolerance=0.01,
+                       snap_to_lattice=True, count_hits=False):
         """
         Method to import a gridmap from a array of keyframe points.
 
         Note: This method overwrites current grid map!
 
+        The cell size is the smallest scale that gives a valid gridmap. The
+        "linear" search tries every scale on a 0.01 lattice from zero, so it
+        always finds the smallest valid scale on that lattice. The
+        "bisect" search doubles the scale until the gridmap is valid and then
+        bisects between the last invalid and the first valid scale. With
+        snap_to_lattice the bisection runs over the same 0.01 lattice, giving
+        the linear result whenever validity does not flip back to invalid at a
+        larger scale. Otherwise it stops once the bracket is narrower than
+        scale_tolerance.
+
+        The number of candidate gridmaps built and the time spent is saved in
+        scale_search_stats, also when no scale is found. With count_hits, the number of keyframes that fell
+        in every cell of the final gridmap is saved in hit_counts.
+
         Args:
             keyframes (array of float32 points): The keyframe point data.
+            scale_search (string):               "linear" or "bisect".
+            scale_tolerance (float32):           The bisection tolerance when
+                                                 not snapping to the lattice.
+            snap_to_lattice (bool):              Bisect over the 0.01 lattice.
+            count_hits (bool):                   Save the keyframes per cell.
         """
         # Calculate scale factor for data
         # Keep increasing scale by factor until every gridmap is valid
@@ -349,44 +718,404 @@ class OccupancyGridMap:
         #     is an adjacent unoccupied tile to both the current tile and the
         #     corner tile of interest.
         scale_adjustment = 0.01
-        scale = 0
-        notdone = True
-        while notdone: # While the gridmap is not valid
-            scale += scale_adjustment
-            scaledKeyframes = keyframes / scale
+        max_doublings = 64
+
+        keyframes = np.asarray(keyframes, dtype=float)
+        # Reused for every candidate scale
+        scaledKeyframes = np.empty_like(keyframes)
+        stats = {"mode": scale_search, "candidates": 0, "seconds": 0.0}
+        start_time = time.perf_counter()
+
+        def isValidScale(scale):
+            stats["candidates"] += 1
+            self._buildGridAtScale(keyframes, scale, scaledKeyframes, count_hits)
+            return self.isMapValid()
+
+        def latticeScale(steps):
+            # The scale after steps increments, the same value for both searches
+            return steps * scale_adjustment
+
+        def saveStats():
+            stats["seconds"] = time.perf_counter() - start_time
+            self.scale_search_stats = stats
+
+        if scale_search == "linear":
+            steps = 0
+            notdone = True
+            while notdone: # While the gridmap is not valid
+                steps += 1
+                notdone = not isValidScale(latticeScale(steps))
+
+        elif scale_search == "bisect":
+            if snap_to_lattice:
+                toScale = latticeScale
+                low, high, resolution = 0, 1, 1
+            else:
+                toScale = float
+                low, high, resolution = 0.0, scale_tolerance, scale_tolerance
+
+            # Bracket a valid scale by doubling
+            doublings = 0
+            while not isValidScale(toScale(high)):
+                doublings += 1
+                if doublings > max_doublings:
+                    saveStats()
+                    print("ERROR: No valid scale found!")
+                    return # CDL=> Replace with exception later
+                low, high = high, high * 2
+
+            # Bisect between the invalid low and the valid high scale
+            last = high
+            while high - low > resolution:
+                mid = (low + high) // 2 if snap_to_lattice else (low + high) / 2
+                last = mid
+                if isValidScale(toScale(mid)):
+                    high = mid
+                else:
+                    low = mid
+
+            # Leave the gridmap built at the valid scale
+            if last != high:
+                isValidScale(toScale(high))
+
+        else:
+            saveStats()
+            print("ERROR: Unknown scale search!")
+            return # CDL=> Replace with exception later
+
+        saveStats()
+
+    def _buildGridAtScale(self, keyframes, scale, scaledKeyframes, count_hits=False):
+        """
+        Method to build the gridmap from keyframe points at one scale.
+
+        Args:
+            keyframes (array of float32 points): The keyframe point data.
+            scale (float32):                     The cell size to build at.
+            scaledKeyframes (array of float32):  Buffer the scaled points are written to.
+            count_hits (bool):                   Save the keyframes per cell in hit_counts.
+        """
+        np.divide(keyframes, scale, out=scaledKeyframes)
+
+        # Save the scale for further use
+        self.cell_size = scale
+
+        # Translate array of points to positive numbers
+        # Calculate minimum point
+        minValueX = np.amin(scaledKeyframes[:, 0])
+        minValueY = np.amin(scaledKeyframes[:, 1])
+
+        # Only translate dimension if smallest point is negative
+        if (minValueX < 0):
+            scaledKeyframes[:, 0] -= minValueX
+        if (minValueY < 0):
+            scaledKeyframes[:, 1] -= minValueY
+
+        # Save the translation point for further use
+        self.trans_pt = (minValueX, minValueY)
+
+        # Find the max point to allocate gridmap
+        max_x, max_y = np.ceil(np.amax(scaledKeyframes, axis=0)).astype(int)
+        # Allocate array to max point size
+        grid_map = np.full((max_y, max_x), 0.6)
+
+        # Set keyframe nearest integer point to 0 (unoccupied)
+        # Points on the far edge fall outside of the grid and are skipped
+        x_index = np.floor(scaledKeyframes[:, 0]).astype(int)
+        y_index = np.floor(scaledKeyframes[:, 1]).astype(int)
+        valid = (0 <= x_index) & (x_index < max_x) & (0 <= y_index) & (y_index < max_y)
+        x_index, y_index = x_index[valid], y_index[valid]
+        grid_map[y_index, x_index] = 0
+
+        if count_hits:
+            flat_index = y_index * max_x + x_index
+            self.hit_counts = np.bincount(flat_index, minlength=max_x * max_y).reshape(max_y, max_x)
+
+        self.grid_map = grid_map
+
+    def fromLandmarkRays(self, keyframes, landmarks, observations, cell_size=None,
+                         log_odds_free=-0.4, log_odds_occupied=0.85, log_odds_limit=5.0,
+                         unknown_value=0.6, batch_samples=2 ** 20):
+        """
+        Method to build a gridmap by casting rays from keyframes to the landmarks they observed.
+
+        Note: This method overwrites current grid map!
+
+        Every observation is a ray from a keyframe position to a landmark
+        position. The cells a ray passes through gain free evidence and the
+        landmark cell gains occupied evidence, summed as log-odds and clamped
+        to +-log_odds_limit. Rays are traversed in batches with a vectorized
+        DDA, one cell per step along the major axis. The log-odds are turned
+        back into the usual 0 - 1 occupancy values, cells without evidence get
+        unknown_value, and keyframe cells are unoccupied since the camera was
+        there. The summed log-odds are saved in log_odds.
+
+        Args:
+            keyframes (array of float32 points):  The (N, 2) or (N, 3) keyframe point data.
+            landmarks (array of float32 points):  The (M, 2) or (M, 3) landmark point data.
+            observations (array of int):          (K, 2) pairs of (keyframe index,
+                                                  landmark index), one per ray.
+            cell_size (float32):                  The cell size. None uses the
+                                                  fromMapMSGData scale search.
+            log_odds_free (float32):              Evidence for every cell a ray crosses.
+            log_odds_occupied (float32):          Evidence for the cell a ray ends in.
+            log_odds_limit (float32):             Clamp for the summed evidence.
+            unknown_value (float32):              Value of cells without evidence.
+            batch_samples (int):                  Max ray cells traversed per batch.
+        """
+        keyframes = np.asarray(keyframes, dtype=float)[:, :2]
+        landmarks = np.asarray(landmarks, dtype=float)[:, :2]
+        observations = np.asarray(observations, dtype=np.int64).reshape(-1, 2)
+
+        if cell_size is None:
+            self.fromMapMSGData(keyframes)
+            cell_size = self.cell_size
+
+        # Scale and translate every point to positive numbers
+        scaledKeyframes = keyframes / cell_size
+        scaledLandmarks = landmarks / cell_size
+        allPoints = np.concatenate([scaledKeyframes, scaledLandmarks])
+        minValueX, minValueY = np.amin(allPoints, axis=0)
+        shift = np.array([min(minValueX, 0), min(minValueY, 0)])
+        scaledKeyframes -= shift
+        scaledLandmarks -= shift
+
+        # Save the scale and translation point for further use
+        self.cell_size = cell_size
+        self.trans_pt = (minValueX, minValueY)
+
+        max_x, max_y = np.floor(np.amax(allPoints - shift, axis=0)).astype(int) + 1
+        kf_cells = np.floor(scaledKeyframes).astype(np.int64)
+        lm_cells = np.floor(scaledLandmarks).astype(np.int64)
+
+        free_hits = np.zeros(max_x * max_y, dtype=np.int64)
+        occupied_hits = np.zeros(max_x * max_y, dtype=np.int64)
+
+        # Ray start and end cells
+        start = kf_cells[observations[:, 0]]
+        end = lm_cells[observations[:, 1]]
+        delta = end - start
+        steps = np.abs(delta).max(axis=1)
+
+        # Landmark cells are occupied
+        np.add.at(occupied_hits, end[:, 1] * max_x + end[:, 0], 1)
+
+        # Cells before the landmark are free, batched so each batch has
+        # at most batch_samples cells
+        ends = np.cumsum(steps)
+        first = 0
+        while first < len(steps):
+            limit = (ends[first - 1] if first else 0) + batch_samples
+            last = max(int(np.searchsorted(ends, limit, side="right")), first + 1)
+            batch_steps = steps[first:last]
+
+            ray = np.repeat(np.arange(first, last), batch_steps)
+            offsets = np.cumsum(batch_steps) - batch_steps
+            k = np.arange(len(ray)) - np.repeat(offsets, batch_steps)
+            fraction = k / steps[ray]
+            x = start[ray, 0] + np.rint(fraction * delta[ray, 0]).astype(np.int64)
+            y = start[ray, 1] + np.rint(fraction * delta[ray, 1]).astype(np.int64)
+            free_hits += np.bincount(y * max_x + x, minlength=max_x * max_y)
+            first = last
+
+        log_odds = free_hits * log_odds_free + occupied_hits * log_odds_occupied
+        log_odds = np.clip(log_odds, -log_odds_limit, log_odds_limit).reshape(max_y, max_x)
+        self.log_odds = log_odds
+
+        grid_map = 1 / (1 + np.exp(-log_odds))
+        grid_map[(free_hits == 0).reshape(max_y, max_x) &
+                 (occupied_hits == 0).reshape(max_y, max_x)] = unknown_value
+        grid_map[kf_cells[:, 1], kf_cells[:, 0]] = 0
+
+        self.grid_map = grid_map
+
+    def appendKeyframes(self, keyframes, landmarks=None, return_violations=False):
+        """
+        Method to add new keyframes to the gridmap without rebuilding it.
 
-            # Save the scale for further use
-            self.cell_size = scale
+        The keyframe cells at the current cell_size are set unoccupied, and
+        landmark cells that are not unoccupied are set occupied. When points
+        fall outside of the gridmap it grows to fit them, with trans_pt
+        adjusted so existing cells keep their locations. The grid is kept in a
+        larger buffer that at least doubles when it runs out, so growing is
+        amortized O(1) per new cell.
 
-            # Translate array of points to positive numbers
-            # Calculate minimum point
-            minValueX = np.amin(scaledKeyframes[:, 0])
-            minValueY = np.amin(scaledKeyframes[:, 1])
+        Only the region around the modified cells is checked for validity,
+        so a gridmap that was valid before stays valid iff this returns True.
 
-            # Only translate dimension if smallest point is negative
-            if (minValueX < 0):
-                scaledKeyframes[:, 0] -= minValueX
-            if (minValueY < 0):
-                scaledKeyframes[:, 1] -= minValueY
+        Args:
+            keyframes (array of float32 points): The (N, 2) or (N, 3) new keyframe point data.
+            landmarks (array of float32 points): Optional (M, 2) or (M, 3) new landmark point data.
+            return_violations (bool):            Also return the cells breaking the conditions.
 
-            # Save the translation point for further use
-            self.trans_pt = (minValueX, minValueY)
+        Returns:
+            valid (bool):               Whether or not the modified region is valid.
+            violations (array of int):  Only if return_violations is set. An
+                                        (N, 2) array of the invalid index points (x, y).
+        """
+        self._prepareCellWrites()
+
+        keyframes = self._planarPoints(keyframes)
+        landmarks = self._planarPoints([] if landmarks is None else landmarks)
+
+        # Index points with the translation fromMapMSGData applied
+        kf_cells = self._locsToIndexes(keyframes)
+        lm_cells = self._locsToIndexes(landmarks)
+        cells = np.concatenate([kf_cells, lm_cells])
+        if len(cells) == 0:
+            return (True, np.empty((0, 2), dtype=int)) if return_violations else True
+
+        # Grow the gridmap to fit the new points
+        rows, cols = self._gridShape()
+        min_x, min_y = cells.min(axis=0)
+        max_x, max_y = cells.max(axis=0)
+        if min_x < 0 or min_y < 0 or max_x >= cols or max_y >= rows:
+            self._reserveGrid(min(min_x, 0), min(min_y, 0), max(max_x + 1, cols), max(max_y + 1, rows))
+            kf_cells -= [min(min_x, 0), min(min_y, 0)]
+            lm_cells -= [min(min_x, 0), min(min_y, 0)]
+            cells = np.concatenate([kf_cells, lm_cells])
+
+        # Landmarks first so keyframe cells always end up unoccupied
+        lm_free = self.free_mask()[lm_cells[:, 1], lm_cells[:, 0]]
+        self._setCells(lm_cells[~lm_free], 1.0)
+        self._setCells(kf_cells, 0.0)
+
+        # Check only the cells whose neighborhood changed
+        rows, cols = self._gridShape()
+        x0, y0 = np.maximum(cells.min(axis=0) - 1, 0)
+        x1, y1 = np.minimum(cells.max(axis=0) + 2, [cols, rows])
+        wx0, wy0 = max(x0 - 1, 0), max(y0 - 1, 0)
+        wx1, wy1 = min(x1 + 1, cols), min(y1 + 1, rows)
+
+        window = self._findViolations(self.free_mask()[wy0:wy1, wx0:wx1])
+        invalid = window[y0 - wy0:y1 - wy0, x0 - wx0:x1 - wx0]
+        valid = not invalid.any()
+
+        if return_violations:
+            return valid, np.argwhere(invalid)[:, ::-1] + [x0, y0]
+        return valid
+
+    @staticmethod
+    def _planarPoints(points):
+        """
+        Method to take the (x, y) columns of (N, 2) or (N, 3) point data.
 
-            # Find the max point to allocate gridmap
-            max_point = np.ceil(np.amax(scaledKeyframes, axis=0)).astype(int)
-            # Allocate array to max point size
-            self.grid_map = np.full(max_point, 0.6).transpose()
+        Returns:
+            points (array of float): An (N, 2) array, empty for no points.
+        """
+        points = np.asarray(points, dtype=float)
+        if points.size == 0:
+            return np.empty((0, 2))
+        return np.atleast_2d(points)[:, :2]
 
-            # Set keyframe nearest integer point to 0 (unoccupied)
-            for point in scaledKeyframes:
-                x_index = int(np.floor(point[0]))
-                y_index = int(np.floor(point[1]))
-                self.setDataIndex((x_index, y_index), 0)
+    def _locsToIndexes(self, loc_points):
+        """
+        Method to convert real world points to index points like fromMapMSGData does.
 
-            # Check if gridmap is valid
-            notdone = not self.isMapValid()
+        Returns:
+            index_points (array of int): An (N, 2) array of indexed points (x, y).
+        """
+        shift = np.minimum(np.asarray(self.trans_pt, dtype=float), 0)
+        return np.floor(loc_points / self.cell_size - shift).astype(np.int64)
 
-    def isMapValid(self):
+    def _prepareCellWrites(self):
+        """
+        Method to make the grid map an array that _writeCells can index.
+        """
+        if not isinstance(self._grid_map, np.ndarray):
+            self.grid_map = np.asarray(self._grid_map, dtype=float).reshape(self._gridShape())
+
+    def _reserveGrid(self, x0, y0, x1, y1):
+        """
+        Method to grow the gridmap to the index region [x0, x1) x [y0, y1).
+
+        x0 and y0 are <= 0 and x1 and y1 are at least the current size. New
+        cells are unknown (0.6). The cells are grown by _resizeCells, the
+        cached classification and trans_pt are updated here.
+        """
+        rows, cols = self._gridShape()
+        new_rows, new_cols = y1 - y0, x1 - x0
+        self._resizeCells(x0, y0, x1, y1)
+
+        # Grow the cached classification too instead of rebuilding it
+        if self._free_mask is not None:
+            free = np.zeros((new_rows, new_cols), dtype=bool)
+            occupied = np.full((new_rows, new_cols), self.cell_threshold <= 0.6 <= 1)
+            free[-y0:-y0 + rows, -x0:-x0 + cols] = self._free_mask
+            occupied[-y0:-y0 + rows, -x0:-x0 + cols] = self._occupied_mask
+            self._free_mask, self._occupied_mask = free, occupied
+            self._neighbor_mask = None
+            self._pyramid       = None
+
+        # Keep existing cells at the same real world location
+        if x0 < 0 or y0 < 0:
+            shift = np.minimum(np.asarray(self.trans_pt, dtype=float), 0)
+            trans_x = shift[0] + x0 if x0 < 0 else self.trans_pt[0]
+            trans_y = shift[1] + y0 if y0 < 0 else self.trans_pt[1]
+            self.trans_pt = (trans_x, trans_y)
+
+        # Index points of existing cells moved
+        self._notifyListeners(None)
+
+    def _resizeCells(self, x0, y0, x1, y1):
+        """
+        Method to grow the cell data to the index region [x0, x1) x [y0, y1).
+
+        The gridmap is a view into a larger buffer, which is reallocated with
+        at least double the size when the region does not fit.
+        """
+        rows, cols = self._gridShape()
+        new_rows, new_cols = y1 - y0, x1 - x0
+        origin_y, origin_x = self._grid_origin
+        buffer = self._grid_buffer
+
+        # Buffer position of the new region
+        buffer_y, buffer_x = origin_y + y0, origin_x + x0
+        fits = (buffer is not None and buffer_y >= 0 and buffer_x >= 0 and
+                buffer_y + new_rows <= buffer.shape[0] and buffer_x + new_cols <= buffer.shape[1])
+
+        if not fits:
+            old_grid = np.asarray(self._grid_map, dtype=float).reshape(rows, cols)
+            # Only double the axes that are growing
+            capacity = (max(2 * rows, new_rows) if new_rows > rows else rows,
+                        max(2 * cols, new_cols) if new_cols > cols else cols)
+            buffer = np.full(capacity, 0.6)
+            # Center the region so there is spare room on every side
+            buffer_y = (capacity[0] - new_rows) // 2
+            buffer_x = (capacity[1] - new_cols) // 2
+            buffer[buffer_y - y0:buffer_y - y0 + rows, buffer_x - x0:buffer_x - x0 + cols] = old_grid
+
+        self._grid_map = buffer[buffer_y:buffer_y + new_rows, buffer_x:buffer_x + new_cols]
+        self._grid_buffer = buffer
+        self._grid_origin = (buffer_y, buffer_x)
+
+    def _setCells(self, index_points, value):
+        """
+        Method to set many valid index points to one value, keeping the cached
+        classification up to date.
+
+        Args:
+            index_points (array of int): An (N, 2) array of indexed points (x, y).
+            value (float32):             The value of occupancy to set.
+        """
+        self._writeCells(index_points, value)
+        x, y = index_points[:, 0], index_points[:, 1]
+
+        if self._free_mask is not None:
+            self._free_mask[y, x]     = (0 <= value <= self.cell_threshold)
+            self._occupied_mask[y, x] = (self.cell_threshold <= value <= 1)
+            self._neighbor_mask       = None
+            self._pyramid             = None
+
+        self._notifyListeners(index_points)
+
+    def _writeCells(self, index_points, value):
+        """
+        Method to write one value into the cell data of many valid index points.
+        """
+        self._grid_map[index_points[:, 1], index_points[:, 0]] = value
+
+    def isMapValid(self, return_violations=False):
         """
         Method to ensure gridmap is valid.
 
@@ -395,57 +1124,90 @@ class OccupancyGridMap:
         unoccupied then a adjacent edge to that corner and the current tile,
         which is unoccupied exists.
 
+        Both conditions are checked for the whole grid at once with shifted
+        copies of the padded unoccupied mask.
+
+        Args:
+            return_violations (bool): Also return the cells breaking the conditions.
+
+        Returns:
+            valid (bool):               Whether or not the gridmap is valid.
+            violations (array of int):  Only if return_violations is set. An
+                                        (N, 2) array of the invalid index points (x, y).
+        """
+        invalid = self._findViolations(self.free_mask())
+        valid = not invalid.any()
+
+        if return_violations:
+            return valid, np.argwhere(invalid)[:, ::-1]
+        return valid
+
+    @staticmethod
+    def _findViolations(free):
+        """
+        Method to find the unoccupied cells that break the gridmap conditions.
+
+        Args:
+            free (matrix of bool): The unoccupied mask, indexed [y, x].
+
         Returns:
-            valid (bool): Whether or not the gridmap is valid.
-        """
-        for y in range(len(self.grid_map)):
-            for x in range(len(self.grid_map[0])):
-                if self.isUnoccupiedIndex((x,y)):
-                    currPt = (x,y)
-                    adjacentEdgePts =   [(0,-1),(0,1),(-1,0),(1,0)]
-                    diagonalCornerPts = [(1,1), (1,-1), (-1,1), (-1,-1)]
-
-                    # Check to see if there are any corners with an adjacent edge
-                    for cornerPt in diagonalCornerPts:
-                        edge1Pt = (currPt[0] + cornerPt[0], currPt[1])
-                        edge2Pt = (currPt[0], currPt[1] + cornerPt[1])
-                        cornerPt = (currPt[0] + cornerPt[0], currPt[1] + cornerPt[1])
-
-                        if self.isValidIndexPoint(cornerPt) and self.isUnoccupiedIndex(cornerPt):
-                            if not ((self.isValidIndexPoint(edge1Pt) and self.isUnoccupiedIndex(edge1Pt)) or
-                                    (self.isValidIndexPoint(edge2Pt) and self.isUnoccupiedIndex(edge2Pt))):
-                                return False
-
-                    # Check to see if there are any adjacent edges
-                    validEdge = False
-                    for edgePt in adjacentEdgePts:
-                        adjacentPt = (currPt[0] + edgePt[0], currPt[1] + edgePt[1])
-                        if self.isValidIndexPoint(adjacentPt) and self.isUnoccupiedIndex(adjacentPt):
-                            validEdge = True
-                    if not validEdge:
-                        return False
-        return True
+            invalid (matrix of bool): True where a cell breaks a condition.
+        """
+        rows, cols = free.shape
+        padded = np.pad(free, 1, constant_values=False)
+
+        def shifted(dx, dy):
+            # Unoccupied status of the cell at (x + dx, y + dy) for every (x, y)
+            return padded[1 + dy:1 + dy + rows, 1 + dx:1 + dx + cols]
+
+        # Check to see if there are any adjacent edges
+        valid_edge = np.zeros_like(free)
+        for dx, dy in NEIGHBOR_OFFSETS:
+            valid_edge |= shifted(dx, dy)
+        invalid = ~valid_edge
+
+        # Check to see if there are any corners without an adjacent edge
+        for dx, dy in ((1, 1), (1, -1), (-1, 1), (-1, -1)):
+            invalid |= shifted(dx, dy) & ~shifted(dx, 0) & ~shifted(0, dy)
+
+        return invalid & free
 
 # ------------------------------------------------------------------------------
 # End of class OccupancyGridMap
 # ------------------------------------------------------------------------------
 
+def convertCSVToGrid(csv_file, grid_file, cell_threshold=0.5, cell_size=1, trans_pt=(0,0)):
+    """
+    Converts a csv gridmap (like data/Map.csv) to the native grid file format.
+
+    The csv files only hold cell values, so the metadata is given here.
+
+    Args:
+        csv_file (string):         The file containing MxN csv data.
+        grid_file (string):        The grid file to write.
+        cell_threshold (float32):  The threshold for a cell being occupied
+        cell_size (float32):       The unitless size of a cell's length and width.
+        trans_pt (Tuple point):    A point to shift the gridmap by.
+    """
+    ogm = OccupancyGridMap(_cell_threshold=cell_threshold, _cell_size=cell_size, _trans_pt=trans_pt)
+    ogm.fromCSV(csv_file)
+    ogm.saveGrid(grid_file)
+
 # Main code for this file. Only runs if this file is the top file
 # Strictly ran for testing
 if __name__ == "__main__":
     ogm = OccupancyGridMap()
 
-    # Get keyframe data from map file
+    # Get keyframe data from map file (cached after the first run)
     print("Unpacking MSG file...")
-    unpack = Unpacker()
-    unpack.unpackMSGmap("../data/map.msg")
-    keyframes = unpack.extract_keyframe_data()
+    cache = MapCache()
+    keyframes, _ = cache.extractMapData("../data/map.msg")
     # Remove z axis data
     keyframes = np.delete(keyframes, 2, 1)
 
     # Create mapdata
     print("Loading map data...")
-    ogm.fromMapMSGData(keyframes)
+    cache.buildGrid(ogm, keyframes)
     #ogm.fromCSV("Map.csv")
     #ogm.fromKeyframesCSV("../data/keyframes.csv")
 
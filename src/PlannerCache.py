@@ -0,0 +1,229 @@
+# ------------------------------------------------------------------------------
+# Name         : PlannerCache.py
+# Date Created : 10/18/2026
+# Author(s)    : Micheal Caracciolo, Chris Lloyd, Owen Casciotti
+# Github Link  : https://github.com/michealcarac/VSLAM-Mapping
+# Description  : In-memory caches for repeated path planning queries.
+# ------------------------------------------------------------------------------
+
+from collections import OrderedDict
+
+import numpy as np
+
+from AStarOCC import annotate_path, descend_field, distance_field, save_path
+
+# Both caches key their entries by the map's map_id and version, so any change
+# to a map through setDataIndex or a rebuild makes its entries stale. Stale
+# entries are dropped when the map is next queried, and the least recently used
+# entries once a cache is full.
+
+
+class DistanceFieldCache:
+    """
+    A class to answer many path queries to the same few goals.
+
+    The first query to a goal computes the distance from every cell to it
+    with distance_field, later queries to that goal only walk downhill from
+    their start, in O(path length). Holds up to max_fields fields, keyed by
+    map, goal and map version.
+
+    Attributes:
+        max_fields (int): The maximum number of distance fields kept.
+        hits (int):       The number of queries answered from a cached field.
+        misses (int):     The number of queries that computed a new field.
+    """
+
+    def __init__(self, max_fields=8):
+        """
+        The default constructor for class DistanceFieldCache.
+
+        Args:
+            max_fields (int): The maximum number of distance fields kept.
+        """
+        self.max_fields = max_fields
+        self.hits       = 0
+        self.misses     = 0
+        self._fields    = OrderedDict()
+
+    # ----------------------------------------------------------------------------
+    # Class Methods
+    # ----------------------------------------------------------------------------
+
+    def field(self, ogm, goal):
+        """
+        Method to get the distance field of a goal on a map.
+
+        Args:
+            ogm (OccupancyGridMap): The map.
+            goal (tuple of int):    The goal index point (x, y).
+
+        Returns:
+            field (matrix of int32): The steps to the goal, -1 where unreachable.
+        """
+        goal = (int(goal[0]), int(goal[1]))
+        key = (ogm.map_id, goal, ogm.version)
+
+        field = self._fields.get(key)
+        if field is not None:
+            self._fields.move_to_end(key)
+            self.hits += 1
+            return field
+
+        self.misses += 1
+        self._dropStale(ogm)
+        field = distance_field(ogm.free_mask(), goal)
+        self._fields[key] = field
+        while len(self._fields) > self.max_fields:
+            self._fields.popitem(last=False)
+        return field
+
+    def path(self, ogm, start, goal, path_file=None):
+        """
+        Method to get a shortest path from start to goal.
+
+        Args:
+            ogm (OccupancyGridMap): The map to plan on.
+            start (tuple of int):   The start index point (x, y).
+            goal (tuple of int):    The goal index point (x, y).
+            path_file (string):     Optional .csv file to save the path to.
+
+        Returns:
+            path (list of [x, y, angle]): The path, or None if no path exists.
+        """
+        cells = descend_field(self.field(ogm, goal), start)
+        if cells is None:
+            return None
+
+        path = annotate_path(cells)
+        save_path(path, path_file)
+        return path
+
+    def clear(self):
+        """
+        Method to drop every cached field.
+        """
+        self._fields.clear()
+
+    def nbytes(self):
+        """
+        Method to get the memory used by the cached fields.
+
+        Returns:
+            nbytes (int): The bytes of field data.
+        """
+        return sum(field.nbytes for field in self._fields.values())
+
+    def _dropStale(self, ogm):
+        """
+        Method to drop the fields of older versions of a map.
+        """
+        stale = [key for key in self._fields if key[0] == ogm.map_id and key[2] != ogm.version]
+        for key in stale:
+            del self._fields[key]
+
+
+class PathCache:
+    """
+    A class to remember the results of path planner calls.
+
+    Holds up to max_paths results, keyed by map, map version, start, end,
+    planner and planner options.
+
+    Attributes:
+        max_paths (int): The maximum number of paths kept.
+        hits (int):      The number of calls answered from the cache.
+        misses (int):    The number of calls that ran the planner.
+    """
+
+    def __init__(self, max_paths=128):
+        """
+        The default constructor for class PathCache.
+
+        Args:
+            max_paths (int): The maximum number of paths kept.
+        """
+        self.max_paths = max_paths
+        self.hits      = 0
+        self.misses    = 0
+        self._paths    = OrderedDict()
+
+    # ----------------------------------------------------------------------------
+    # Class Methods
+    # ----------------------------------------------------------------------------
+
+    def plan(self, planner, ogm, start, end, path_file=None, **options):
+        """
+        Method to get the path of planner(ogm, start, end, **options).
+
+        Args:
+            planner (function):     A planner of AStarOCC, like astar_array.
+            ogm (OccupancyGridMap): The map to plan on.
+            start (tuple of int):   The start index point (x, y).
+            end (tuple of int):     The end index point (x, y).
+            path_file (string):     Optional .csv file to save the path to,
+                                    also on a cache hit.
+            options:                Hashable keyword arguments for the planner.
+                                    stats is not part of the key, it is
+                                    passed on and only filled on a miss.
+
+        Returns:
+            path (list of [x, y, angle]): The path, or None if no path exists.
+
+        Raises:
+            TypeError: If an option other than stats is not hashable.
+        """
+        stats = options.pop("stats", None)
+        key = (ogm.map_id, ogm.version, (int(start[0]), int(start[1])), (int(end[0]), int(end[1])),
+               planner.__module__, planner.__name__, tuple(sorted(options.items())))
+        try:
+            hash(key)
+        except TypeError:
+            unhashable = sorted(name for name, value in options.items() if not _isHashable(value))
+            raise TypeError(f"PathCache.plan options must be hashable, got {', '.join(unhashable)}") from None
+
+        if key in self._paths:
+            self._paths.move_to_end(key)
+            self.hits += 1
+            path = self._paths[key]
+        else:
+            self.misses += 1
+            self._dropStale(ogm)
+            if stats is not None:
+                options["stats"] = stats
+            path = planner(ogm, start, end, **options)
+            self._paths[key] = path
+            while len(self._paths) > self.max_paths:
+                self._paths.popitem(last=False)
+
+        if path is None:
+            return None
+
+        # Copy so callers can not change the cached path
+        path = [list(point) for point in path]
+        save_path(path, path_file)
+        return path
+
+    def clear(self):
+        """
+        Method to drop every cached path.
+        """
+        self._paths.clear()
+
+    def _dropStale(self, ogm):
+        """
+        Method to drop the paths of older versions of a map.
+        """
+        stale = [key for key in self._paths if key[0] == ogm.map_id and key[1] != ogm.version]
+        for key in stale:
+            del self._paths[key]
+
+
+def _isHashable(value):
+    """
+    Function to check if a value can be part of a cache key.
+    """
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
@@ -88,7 +88,7 @@ class Manual():
 
 class DQAgent(Manual):
 
-    def __init__(self, layers, inputs, start, env, path=None):
+    def __init__(self, layers, inputs, start, env, path=None, q_head='softmax'):
         # Constructor for the Deep Q agent
         # Requires:
         #   Layers: The number of dense layers to add to the Neural Network
@@ -96,13 +96,16 @@ class DQAgent(Manual):
         #   start: The starting location of the agent in (x, y, theta)
         #   env: The environment object the agent is in
         #   path: The desired path for the agent to follow, should be of the structure [(x, y, theta)]
+        #   q_head: The output activation, 'softmax' for training_episode or 'linear' for replay_episode,
+        #           whose q value targets are not limited to 0 - 1
         # Returns:
         #   The constructed Deep Q agent object
         super().__init__(start[0], start[1], start[2], inputs, env)
         self.path = path
         self.PATH = path
         self.step = 0
-        self.model = self.construct_model(layers, len(inputs), start)
+        self.q_head = q_head
+        self.model = self.construct_model(layers, len(inputs), start, q_head)
         self.LR = .1
         self.DF = .3
         self.EPSILON = 0
@@ -113,12 +116,13 @@ class DQAgent(Manual):
         self.theta += angle
         self.path = self.PATH
 
-    def construct_model(self, num_layers, sensor_data_shape, position):
+    def construct_model(self, num_layers, sensor_data_shape, position, q_head='softmax'):
         # Create the model for the agent to decide the best move from the given input data
         # Requires:
         #   num_layers: The number of dense layers to add to the model, there will always be at least 1
         #   sensor_data_shape: The shape of the incoming sensor data, must be an array for now
         #   position: The starting position of the model, just for input size
+        #   q_head: The activation of the output layer, 'softmax' or 'linear'
         # Returns:
         #   Model: The model used to predict the best move
 
@@ -133,7 +137,7 @@ class DQAgent(Manual):
             x = Dense(nodes, activation='relu')(x)
 
         # Output layer, size 3 for the 3 available directions, forward, left, right
-        model_out = Dense(3, activation='softmax')(x)
+        model_out = Dense(3, activation=q_head)(x)
         return Model(inputs=[model_in], outputs=[model_out])
 
     def get_model_input(self):
@@ -277,6 +281,102 @@ class DQAgent(Manual):
                 self.show_agent(counter, False, self.path, save=False)
                 finished = True
 
+    def replay_step(self, buffer, batch_size, optimizer):
+        # A helper function that performs one step of replay training
+        # The transition is stored in the buffer and the model is trained on a sampled mini-batch instead of it
+        # Requires:
+        #   buffer: The ReplayBuffer or PrioritizedReplayBuffer to store and sample transitions in
+        #   batch_size: The number of transitions per update
+        #   optimizer: The optimizer to apply the gradients with
+        # Returns:
+        #   1 if the move was valid, -1 if the agent hit something
+
+        observation = self.get_model_input()[0, :, 0]
+
+        # Make a move
+        if np.random.rand() < self.EPSILON:
+            move = np.random.randint(0, 3)
+        else:
+            move = int(np.argmax(self.model(observation[None])[0]))
+        hit = False
+        try:
+            self.move(move)
+        except InvalidMove:
+            hit = True
+
+        # Get reward and store the transition
+        pos = (self.x, self.y, self.theta)
+        target = self.path[0]
+        reward = float(self.get_reward(pos, target, hit=hit))
+        buffer.add(observation, move, reward, self.get_model_input()[0, :, 0], hit)
+
+        if len(buffer) >= batch_size:
+            self.replay_update(buffer, batch_size, optimizer)
+        return -1 if hit else 1
+
+    def replay_update(self, buffer, batch_size, optimizer):
+        # Trains the model on one mini-batch sampled from the buffer
+        # The target of each move is its reward plus the discounted best q value after it
+        # Requires:
+        #   buffer: The ReplayBuffer or PrioritizedReplayBuffer to sample from
+        #   batch_size: The number of transitions to sample
+        #   optimizer: The optimizer to apply the gradients with
+        # Returns:
+        #   loss: The weighted mean squared TD error of the batch
+
+        # A softmax head can not fit targets outside of 0 - 1
+        if self.q_head != 'linear':
+            raise ValueError("Replay training needs a linear q value head, create the DQAgent with q_head='linear'")
+
+        batch = buffer.sample(batch_size)
+        next_q = np.max(self.model(batch["next_observations"]), axis=1)
+        targets = batch["rewards"] + self.DF * next_q * (1 - batch["dones"])
+        targets = tf.convert_to_tensor(targets, dtype='float32')
+
+        with tf.GradientTape() as tape:
+            q_vals = self.model(batch["observations"])
+            chosen = tf.gather(q_vals, batch["actions"].astype(np.int32), axis=1, batch_dims=1)
+            errors = targets - chosen
+            loss = tf.reduce_mean(tf.square(errors) * batch["weights"])
+
+        # Get and apply the gradients
+        grads = tape.gradient(loss, self.model.trainable_weights)
+        optimizer.apply_gradients(zip(grads, self.model.trainable_weights))
+
+        buffer.update_priorities(batch["indices"], np.abs(errors.numpy()))
+        return float(loss)
+
+    def replay_episode(self, max_iter, buffer, batch_size=32, optimizer=None):
+        # A function to train an episode from a replay buffer, see training_episode
+        # An episode is defined as the agents life from start to when it reaches the target
+        # Requires:
+        #   max_iter: The max iterations to train for
+        #   buffer: The ReplayBuffer or PrioritizedReplayBuffer to use, kept across episodes
+        #   batch_size: The number of transitions per update
+        #   optimizer: The optimizer to apply the gradients with, default is Adam with LR
+        # Returns:
+        #   optimizer: The optimizer, pass it back in to keep its state across episodes
+
+        if optimizer is None:
+            optimizer = Adam(self.LR)
+        finished = False
+        counter = 0
+        while not finished and counter <= max_iter:
+            if self.replay_step(buffer, batch_size, optimizer) == 1:
+                # Check if position is close enough to the current target
+                pos = (self.x, self.y)
+                target = self.path[0][:2]
+                dist = mse(pos, target)
+                if len(self.path) == 1:
+                    finished = True
+                if dist <= self.LINEAR:
+                    self.path = self.path[1:]
+                    self.step = 0
+                counter += 1
+            else:
+                finished = True
+        return optimizer
+
     def eval_step(self):
         # A helper function that performs one step of the training
         # Requires:
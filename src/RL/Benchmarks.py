@@ -0,0 +1,303 @@
+# This file contains the timing benchmarks for the simulated environments, and the reference implementations
+# they time against, which tests/ also checks the fast versions against
+# Usage: python Benchmarks.py <benchmark>
+import argparse
+import math
+import os
+import time
+
+import numpy as np
+
+from EnvironmentClasses import Base
+from RayCaster import RayCaster, segments_array
+from ReplayBuffer import PrioritizedReplayBuffer, ReplayBuffer
+from Rollouts import RolloutWorkers, collect_rollout, make_worker_env, mlp_weights
+from VectorEnvironment import VectorEnvironment
+
+
+def get_observation_loop(env, x, y, theta, fov=[0]):
+    # The original per ray, per segment Base.get_observation, kept as a reference
+    # Requires:
+    #   env: The environment to look around in
+    #   x, y, theta, fov: See Base.get_observation
+    # Returns:
+    #   observation: a dict of distances to objects keyed by angle, see Base.get_observation
+    observations = {}
+    for radian in fov:
+        angle = theta+radian
+        radian = np.radians(angle)
+        if radian < 0:
+            radian += 2*math.pi
+        if radian > 2*math.pi:
+            radian -= 2*math.pi
+        if np.abs(radian - 2*math.pi) < 0.001:
+            radian = 0
+        best_dist = math.inf
+        for obs in env.obstacles:
+            if radian == 0:
+                (x3, y3), (x4, y4) = obs
+                x1, y1 = x3, y
+                dist = x3 - x
+                theta1 = math.atan2(y1 - y, x1 - x)
+                if theta1 < 0:
+                    theta1 += 2 * math.pi
+                if dist < best_dist and np.abs(radian - theta1) <= 0.001 and env.check_on_line((x1, y1), obs):
+                    best_dist = dist
+
+            else:
+                if radian == math.pi / 2:
+                    m1 = 100000
+                elif radian == 3 * math.pi / 2:
+                    m1 = 100000
+                else:
+                    m1 = math.tan(radian)
+                (x3, y3), (x4, y4) = obs
+                if x4 == x3:
+                    m2 = 1000000
+                else:
+                    m2 = 0
+                a = y - m1 * x
+                b = y3 - m2 * x3
+                A = [[1, -m2], [1, -m1]]
+                B = [b, a]
+                A_ = np.linalg.inv(A)
+                X = A_.dot(B)
+                y1, x1 = X
+                dist = np.sqrt((X[1] - x) ** 2 + (X[0] - y) ** 2)
+                theta1 = math.atan2(y1 - y, x1 - x)
+                if theta1 < 0:
+                    theta1 += 2 * math.pi
+                if dist < best_dist and np.abs(radian - theta1) <= 0.001 and env.check_on_line((x1, y1), obs):
+                    best_dist = dist
+        observations[angle] = best_dist
+    return observations
+
+
+def timed(func, *args, **kwargs):
+    # Runs a function once
+    # Returns:
+    #   result, seconds: The function result and the wall time it took
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def bench_raycaster(obstacle_counts=(0, 10, 50, 200), num_rays=90, seed=0):
+    # Compares get_observation to the original loop for a 90 ray FOV
+    # Requires:
+    #   obstacle_counts: The numbers of random boxes to time
+    #   num_rays: The number of rays in the FOV
+    #   seed: The random seed
+    np.random.seed(seed)
+    fov = list(np.linspace(-45, 45, num_rays, endpoint=False))
+    print(f"{'boxes':>6} {'segments':>9} {'loop (ms)':>10} {'caster (ms)':>12} {'speedup':>9}")
+    for count in obstacle_counts:
+        env = Base(width=1000, height=1000, num_obstables=count, box_w=100, box_h=100)
+        _, loop_time = timed(get_observation_loop, env, 500.5, 500.5, 30, fov)
+        repeats = 100
+        start = time.perf_counter()
+        for _ in range(repeats):
+            env.get_observation(500.5, 500.5, 30, fov)
+        caster_time = (time.perf_counter() - start) / repeats
+        print(f"{count:>6} {len(env.obstacles):>9} {loop_time * 1e3:>10.2f} {caster_time * 1e3:>12.3f} "
+              f"{loop_time / caster_time:>8.1f}x")
+
+
+def bench_spatial_index(box_counts=(10, 100, 1000, 10000), num_rays=90, positions=20, seed=0):
+    # Compares per ray latency of testing every segment and casting through the grid index
+    # Requires:
+    #   box_counts: The numbers of random boxes to time, each box is 4 segments
+    #   num_rays: The number of rays per observation
+    #   positions: The number of random observation points
+    #   seed: The random seed
+    np.random.seed(seed)
+    angles = np.radians(np.linspace(-45, 45, num_rays, endpoint=False))
+    print(f"{'boxes':>6} {'segments':>9} {'build (ms)':>11} {'all (us/ray)':>13} {'grid (us/ray)':>14} {'speedup':>9}")
+    for count in box_counts:
+        env = Base(width=1000, height=1000, num_obstables=count, box_w=50, box_h=50)
+        segments = segments_array(env.obstacles)
+        points = np.random.uniform(0, 1000, size=(positions, 3))
+
+        every = RayCaster(segments, index="none")
+        grid, build_time = timed(RayCaster, segments, index="grid")
+        times = []
+        for caster in (every, grid):
+            start = time.perf_counter()
+            for x, y, theta in points:
+                caster.cast(x, y, angles + np.radians(theta * 0.36))
+            times.append((time.perf_counter() - start) / (positions * num_rays))
+        print(f"{count:>6} {len(segments):>9} {build_time * 1e3:>11.2f} {times[0] * 1e6:>13.2f} "
+              f"{times[1] * 1e6:>14.2f} {times[0] / times[1]:>8.1f}x")
+
+
+def manual_move(env, state, dir, LINEAR=5, ROTATIONAL=5):
+    # Manual.move on a plain (x, y, theta) list, kept as a reference for the vectorized environment
+    # Requires:
+    #   env: The environment to move in
+    #   state: The [x, y, theta] of the agent, modified in place
+    #   dir: The direction to move in, see Manual.move
+    # Returns:
+    #   hit: True where the move would have raised InvalidMove
+    x, y, theta = state
+    if dir == 0:
+        dists = env.get_observation(x, y, theta)
+        if dists[theta] <= LINEAR+0.001:
+            return True
+        state[0] += LINEAR * math.cos(np.radians(theta))
+        state[1] += LINEAR * math.sin(np.radians(theta))
+    elif dir == 1:
+        state[2] += ROTATIONAL
+        if state[2] >= 360:
+            state[2] -= 360
+    else:
+        state[2] -= ROTATIONAL
+        if state[2] < 0:
+            state[2] += 360
+    return False
+
+
+def bench_vector_env(agent_counts=(1, 4, 16, 64, 256, 1024), num_obstacles=50, num_rays=90, seconds=1.0, seed=0):
+    # Times environment steps per second of the vectorized environment against one agent at a time
+    # Requires:
+    #   agent_counts: The numbers of agents to step together
+    #   num_obstacles: The number of random boxes in the environment
+    #   num_rays: The number of rays each agent observes with
+    #   seconds: About how long to time each agent count for
+    #   seed: The random seed
+    np.random.seed(seed)
+    env = Base(width=1000, height=1000, num_obstables=num_obstacles, box_w=100, box_h=100)
+    fov = list(np.linspace(-45, 45, num_rays, endpoint=False))
+    path = [(500, 500 + 10 * i, 90) for i in range(1, 50)]
+
+    # One agent at a time, a move and an observation each step
+    state = [500, 500, 90]
+    steps = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        if manual_move(env, state, np.random.randint(0, 3)):
+            state = [500, 500, 90]
+        env.get_observation(state[0], state[1], state[2], fov)
+        steps += 1
+    loop_rate = steps / (time.perf_counter() - start)
+    print(f"One agent at a time: {loop_rate:,.0f} steps/s")
+
+    print(f"{'agents':>7} {'step (ms)':>10} {'steps/s':>12} {'speedup':>9}")
+    for count in agent_counts:
+        vec_env = VectorEnvironment(env, count, (500, 500, 90), fov, path)
+        steps = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < seconds:
+            vec_env.step(np.random.randint(0, 3, count))
+            steps += 1
+        elapsed = time.perf_counter() - start
+        rate = steps * count / elapsed
+        print(f"{count:>7} {elapsed / steps * 1e3:>10.3f} {rate:>12,.0f} {rate / loop_rate:>8.1f}x")
+
+
+def bench_rollouts(worker_counts=None, num_agents=64, rollout_length=50, rollouts=5, seed=0):
+    # Times environment steps per second collected by the rollout workers and the scaling efficiency
+    # Requires:
+    #   worker_counts: The numbers of worker processes to time, default is powers of 2 up to the core count
+    #   num_agents: The agents each worker steps together
+    #   rollout_length: The steps per rollout
+    #   rollouts: The number of timed rollouts per worker count
+    #   seed: The random seed
+    cores = os.cpu_count()
+    if worker_counts is None:
+        worker_counts = [2 ** i for i in range(int(math.log2(cores)) + 1)]
+        if worker_counts[-1] != cores:
+            worker_counts.append(cores)
+    fov = list(np.linspace(-45, 45, 90, endpoint=False))
+    path = [(500, 500 + 10 * i, 90) for i in range(1, 50)]
+    env_kwargs = {"width": 1000, "height": 1000, "num_obstables": 50}
+    weights = mlp_weights(len(fov) + 6, 4, seed)
+
+    # The same work in this process, no workers
+    vec_env, rng = make_worker_env({"seed": seed, "env_kwargs": env_kwargs, "num_agents": num_agents,
+                                    "start": (500, 500, 90), "FOV": fov, "path": path, "max_steps": 100}, 0)
+    shapes = RolloutWorkers.buffer_shapes({"num_workers": 1, "rollout_length": rollout_length,
+                                           "num_agents": num_agents, "FOV": fov})
+    local = {key: np.zeros(shape[1:], dtype=dtype) for key, (shape, dtype) in shapes.items()}
+    _, elapsed = timed(lambda: [collect_rollout(vec_env, weights, local, 0.1, rng) for i in range(rollouts)])
+    local_rate = rollouts * rollout_length * num_agents / elapsed
+    print(f"{cores} cores, in process: {local_rate:,.0f} steps/s")
+
+    print(f"{'workers':>8} {'steps/s':>12} {'speedup':>9} {'efficiency':>11}")
+    base_rate = None
+    for count in worker_counts:
+        with RolloutWorkers(count, env_kwargs, (500, 500, 90), fov, path, num_agents=num_agents,
+                            rollout_length=rollout_length, seed=seed) as workers:
+            workers.collect(weights)
+            _, elapsed = timed(lambda: [workers.collect(weights, epsilon=0.1) for i in range(rollouts)])
+        rate = rollouts * count * rollout_length * num_agents / elapsed
+        base_rate = base_rate or rate
+        print(f"{count:>8} {rate:>12,.0f} {rate / base_rate:>8.2f}x {rate / (base_rate * count):>10.0%}")
+
+
+def bench_replay_buffer(capacities=(10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6), batch_size=32, observation_size=96,
+                        updates=2000, seed=0):
+    # Times replay buffer inserts and learner side updates, a sample and a priority update, and reports memory
+    # Full DQAgent updates are timed too when tensorflow is installed
+    # Requires:
+    #   capacities: The buffer sizes to time
+    #   batch_size: The transitions per update
+    #   observation_size: The size of one observation, len(FOV) + 6
+    #   updates: The number of updates to time
+    #   seed: The random seed
+    rng = np.random.RandomState(seed)
+    print(f"{'capacity':>9} {'kind':>12} {'memory (MB)':>12} {'add (us)':>9} {'updates/s':>10}")
+    for capacity in capacities:
+        for name, kind in (("uniform", ReplayBuffer), ("prioritized", PrioritizedReplayBuffer)):
+            buffer = kind(capacity, observation_size, rng=rng)
+            chunk = rng.rand(10000, observation_size).astype(np.float32)
+            while len(buffer) < capacity:
+                count = min(10000, capacity - len(buffer))
+                buffer.add_batch(chunk[:count], rng.randint(0, 3, count), rng.rand(count), chunk[:count],
+                                 np.zeros(count, dtype=bool))
+
+            _, elapsed = timed(lambda: [buffer.add(chunk[i], 0, 0.0, chunk[i], False) for i in range(1000)])
+            add_time = elapsed / 1000
+
+            errors = rng.rand(updates, batch_size)
+            start = time.perf_counter()
+            for i in range(updates):
+                batch = buffer.sample(batch_size)
+                buffer.update_priorities(batch["indices"], errors[i])
+            rate = updates / (time.perf_counter() - start)
+            print(f"{capacity:>9,} {name:>12} {buffer.nbytes() / 2 ** 20:>12.1f} "
+                  f"{add_time * 1e6:>9.2f} {rate:>10,.0f}")
+
+    try:
+        from AgentClass import DQAgent
+    except ImportError as error:
+        print(f"Skipping full DQAgent updates, {error}")
+        return
+    fov = list(range(-45, 45))
+    path = [(500, 500 + 10 * i, 90) for i in range(1, 50)]
+    env = Base(width=1000, height=1000, num_obstables=50)
+    agent = DQAgent(4, fov, (500, 500, 90), env, path, q_head='linear')
+    agent.show_agent = lambda *args, **kwargs: None
+    buffer = PrioritizedReplayBuffer(10 ** 5, len(fov) + 6, rng=rng)
+    optimizer = agent.replay_episode(batch_size, buffer, batch_size)
+    _, elapsed = timed(lambda: [agent.replay_update(buffer, batch_size, optimizer) for i in range(200)])
+    print(f"DQAgent replay updates: {200 / elapsed:,.0f} updates/s of {batch_size} transitions")
+    agent.reset()
+    _, elapsed = timed(lambda: [agent.training_step() for i in range(50)])
+    print(f"DQAgent training_step: {50 / elapsed:,.0f} updates/s of 1 transition")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulated environment benchmarks")
+    parser.add_argument("benchmark", choices=["raycast", "index", "vector", "rollouts", "replay"])
+    args = parser.parse_args()
+
+    if args.benchmark == "raycast":
+        bench_raycaster()
+    elif args.benchmark == "index":
+        bench_spatial_index()
+    elif args.benchmark == "vector":
+        bench_vector_env()
+    elif args.benchmark == "rollouts":
+        bench_rollouts()
+    elif args.benchmark == "replay":
+        bench_replay_buffer()
@@ -3,6 +3,7 @@
 import numpy as np
 import matplotlib.pyplot as plt
 import time
+from RayCaster import RayCaster, segments_array
 
 
 class Base():
@@ -21,6 +22,7 @@ class Base():
         self.height = height
         self.width = width
         self.obstacles = self.generate_obstacles(num_obstables, box_w, box_h)
+        self.caster = RayCaster(segments_array(self.obstacles))
 
     def generate_obstacles(self, num, box_w, box_h):
         # Generates a list containing the walls and random obstacle boxes to avoid
@@ -68,54 +70,13 @@ class Base():
         #   los: A list containing the angles +- of theta to look in
         # Returns:
         #   observation: a list of distances to objects in the directions of los, same dimension as los
+        # All rays are cast in one batch, see RayCaster
+        # Rebuild self.caster if self.obstacles is changed after construction
+        angles = [theta + radian for radian in fov]
+        dists = self.caster.cast(x, y, np.radians(angles))
         observations = {}
-        for radian in fov:
-            angle = theta+radian
-            radian = np.radians(angle)
-            if radian < 0:
-                radian += 2*np.math.pi
-            if radian > 2*np.math.pi:
-                radian -= 2*np.math.pi
-            if np.abs(radian - 2*np.math.pi) < 0.001:
-                radian = 0
-            best_dist = np.math.inf
-            for obs in self.obstacles:
-                if radian == 0:
-                    (x3, y3), (x4, y4) = obs
-                    x1, y1 = x3, y
-                    dist = x3 - x
-                    theta1 = np.math.atan2(y1 - y, x1 - x)
-                    if theta1 < 0:
-                        theta1 += 2 * np.math.pi
-                    if dist < best_dist and np.abs(radian - theta1) <= 0.001 and self.check_on_line((x1, y1), obs):
-                        best_dist = dist
-
-                else:
-                    if radian == np.math.pi / 2:
-                        m1 = 100000
-                    elif radian == 3 * np.math.pi / 2:
-                        m1 = 100000
-                    else:
-                        m1 = np.math.tan(radian)
-                    (x3, y3), (x4, y4) = obs
-                    if x4 == x3:
-                        m2 = 1000000
-                    else:
-                        m2 = 0
-                    a = y - m1 * x
-                    b = y3 - m2 * x3
-                    A = [[1, -m2], [1, -m1]]
-                    B = [b, a]
-                    A_ = np.linalg.inv(A)
-                    X = A_.dot(B)
-                    y1, x1 = X
-                    dist = np.sqrt((X[1] - x) ** 2 + (X[0] - y) ** 2)
-                    theta1 = np.math.atan2(y1 - y, x1 - x)
-                    if theta1 < 0:
-                        theta1 += 2 * np.math.pi
-                    if dist < best_dist and np.abs(radian - theta1) <= 0.001 and self.check_on_line((x1, y1), obs):
-                        best_dist = dist
-            observations[angle] = best_dist
+        for angle, dist in zip(angles, dists):
+            observations[angle] = float(dist)
         return observations
 
     def check_on_line(self, point, line):
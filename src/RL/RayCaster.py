@@ -0,0 +1,262 @@
+# This file contains the ray casting engine used by the environments to simulate the distance sensors
+# Every obstacle segment is stored in one (M, 4) array so a whole batch of rays is intersected with all of them at once
+# For large scenes or large batches they are also bucketed into a uniform grid, and rays only test the cells they pass through
+import numpy as np
+
+
+class RayCaster():
+
+    def __init__(self, segments, tolerance=0.001, index="auto", grid_pairs=2 ** 16):
+        # Constructor for the ray caster
+        # Requires:
+        #   Segments: The obstacle segments, anything that reshapes to (M, 4) rows of (x1, y1, x2, y2)
+        #   Tolerance: How far past the end of a segment a ray still counts as hitting it
+        #   Index: "grid" to cast through a uniform grid, "none" to test every segment, or "auto" to use
+        #          the grid only for casts of more than grid_pairs ray and segment pairs
+        #   Grid_pairs: The rays times segments above which "auto" casts through the grid
+        # Returns:
+        #   Created object
+
+        self.segments = np.asarray(segments, dtype=float).reshape(-1, 4)
+        self.tolerance = tolerance
+
+        # Segment start points and direction vectors, split once for the intersection math
+        self.starts = self.segments[:, :2]
+        self.vectors = self.segments[:, 2:] - self.segments[:, :2]
+        lengths = np.hypot(self.vectors[:, 0], self.vectors[:, 1])
+
+        # Tolerance as a fraction of each segment, zero length segments are handled as points
+        with np.errstate(divide='ignore'):
+            self.u_tolerance = np.where(lengths > 0, tolerance / lengths, np.inf)
+
+        self.index = index
+        self.grid_pairs = grid_pairs
+        self.cell_start = None
+        if index == "grid" and len(self.segments):
+            self.build_grid()
+
+    def build_grid(self, segments_per_cell=1):
+        # Buckets the segments into a uniform grid covering all of them
+        # A segment is listed in every cell it passes through, stored as one flat list sorted by cell
+        # Requires:
+        #   Segments_per_cell: Sets the cell size, so there are about this many segments per cell
+        # Returns:
+        #   Nothing
+
+        tol = self.tolerance
+        lows = np.minimum(self.segments[:, :2], self.segments[:, 2:])
+        highs = np.maximum(self.segments[:, :2], self.segments[:, 2:])
+        self.grid_min = lows.min(axis=0) - tol
+        extent = highs.max(axis=0) + tol - self.grid_min
+        cells_per_axis = max(1, int(np.ceil(np.sqrt(len(self.segments) / segments_per_cell))))
+        self.cell_size = max(extent.max() / cells_per_axis, tol)
+        self.grid_shape = (np.floor(extent / self.cell_size).astype(int) + 1)[::-1] # (rows, cols)
+        rows, cols = self.grid_shape
+
+        # The cells of every segment's bounding box
+        low_cells = np.floor((lows - tol - self.grid_min) / self.cell_size).astype(int)
+        high_cells = np.floor((highs + tol - self.grid_min) / self.cell_size).astype(int)
+        low_cells = np.clip(low_cells, 0, [cols - 1, rows - 1])
+        high_cells = np.clip(high_cells, 0, [cols - 1, rows - 1])
+        box_w = high_cells[:, 0] - low_cells[:, 0] + 1
+        counts = box_w * (high_cells[:, 1] - low_cells[:, 1] + 1)
+        seg_ids = np.repeat(np.arange(len(self.segments)), counts)
+        k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        cell_x = low_cells[seg_ids, 0] + k % box_w[seg_ids]
+        cell_y = low_cells[seg_ids, 1] + k // box_w[seg_ids]
+
+        # Drop the box cells a slanted segment does not pass near
+        centers = (np.column_stack((cell_x, cell_y)) + 0.5) * self.cell_size + self.grid_min
+        ex, ey = self.vectors[seg_ids, 0], self.vectors[seg_ids, 1]
+        cross = np.abs(ex * (centers[:, 1] - self.starts[seg_ids, 1]) - ey * (centers[:, 0] - self.starts[seg_ids, 0]))
+        length = np.hypot(ex, ey)
+        near = (cross <= (self.cell_size * np.sqrt(0.5) + tol) * length) | (length == 0)
+        seg_ids, cells = seg_ids[near], (cell_y * cols + cell_x)[near]
+
+        order = np.argsort(cells, kind='stable')
+        self.cell_items = seg_ids[order]
+        self.cell_start = np.concatenate(([0], np.cumsum(np.bincount(cells, minlength=rows * cols))))
+
+    def use_grid(self, num_rays):
+        # Decides if a cast goes through the grid, building the grid the first time it is needed
+        # Requires:
+        #   num_rays: The number of rays in the cast
+        # Returns:
+        #   use_grid: True if the cast should walk the grid
+
+        if self.index == "none" or len(self.segments) == 0:
+            return False
+        if self.index == "auto" and num_rays * len(self.segments) <= self.grid_pairs:
+            return False
+        if self.cell_start is None:
+            self.build_grid()
+        return True
+
+    def cast(self, x, y, angles):
+        # Casts a batch of rays from one point and finds the nearest hit of each
+        # Requires:
+        #   x, y: The position the rays start from
+        #   angles: An (R,) array of ray directions in radians, 0 is along the x axis
+        # Returns:
+        #   dists: An (R,) array of distances to the nearest segment, inf where a ray hits nothing
+
+        angles = np.atleast_1d(np.asarray(angles, dtype=float))
+        dx, dy = np.cos(angles)[:, None], np.sin(angles)[:, None]
+        return self.cast_dirs(x, y, dx, dy)
+
+    def cast_dirs(self, x, y, dx, dy):
+        # Casts rays given as unit direction vectors, see cast
+        # Requires:
+        #   x, y: The position the rays start from
+        #   dx, dy: (R, 1) arrays with the ray directions
+        # Returns:
+        #   dists: An (R,) array of distances to the nearest segment, inf where a ray hits nothing
+
+        if len(self.segments) == 0:
+            return np.full(len(dx), np.inf)
+
+        if self.use_grid(len(dx)):
+            cell = np.floor((np.array([x, y]) - self.grid_min) / self.cell_size).astype(int)
+            if 0 <= cell[0] < self.grid_shape[1] and 0 <= cell[1] < self.grid_shape[0]:
+                return self.cast_grid(x, y, dx[:, 0], dy[:, 0], cell)
+
+        # Every ray against every segment
+        return self.hit_distances(x, y, dx, dy, self.starts, self.vectors, self.u_tolerance).min(axis=1)
+
+    def cast_many(self, xs, ys, angles, max_pairs=2 ** 20):
+        # Casts rays from many points at once, each point with its own batch of directions
+        # Requires:
+        #   xs, ys: (N,) arrays with the position each batch of rays starts from
+        #   angles: An (N, R) array of ray directions in radians
+        #   max_pairs: The most ray and segment pairs tested at once when not using the grid, bounds memory
+        # Returns:
+        #   dists: An (N, R) array of distances to the nearest segment, inf where a ray hits nothing
+
+        angles = np.asarray(angles, dtype=float)
+        num_rays = angles.shape[1]
+        x = np.repeat(np.asarray(xs, dtype=float), num_rays)
+        y = np.repeat(np.asarray(ys, dtype=float), num_rays)
+        dx, dy = np.cos(angles).ravel(), np.sin(angles).ravel()
+        dists = np.full(len(dx), np.inf)
+        if len(self.segments) == 0:
+            return dists.reshape(angles.shape)
+
+        # Rays starting inside the grid walk it, the rest test every segment
+        rest = np.arange(len(dx))
+        if self.use_grid(len(dx)):
+            cells = np.floor((np.column_stack((x, y)) - self.grid_min) / self.cell_size).astype(int)
+            inside = (cells[:, 0] >= 0) & (cells[:, 0] < self.grid_shape[1]) & \
+                     (cells[:, 1] >= 0) & (cells[:, 1] < self.grid_shape[0])
+            rays = np.flatnonzero(inside)
+            dists[rays] = self.cast_grid(x[rays], y[rays], dx[rays], dy[rays], cells[rays].T)
+            rest = np.flatnonzero(~inside)
+
+        chunk = max(1, max_pairs // len(self.segments))
+        for first in range(0, len(rest), chunk):
+            rays = rest[first:first + chunk]
+            dists[rays] = self.hit_distances(x[rays, None], y[rays, None], dx[rays, None], dy[rays, None],
+                                             self.starts, self.vectors, self.u_tolerance).min(axis=1)
+        return dists.reshape(angles.shape)
+
+    def cast_grid(self, x, y, dx, dy, cell):
+        # Walks all rays through the grid together, one cell per ray per step (Amanatides and Woo)
+        # A ray stops at the first cell holding a hit that lies inside that cell
+        # Requires:
+        #   x, y: The position the rays start from, inside the grid, one for all rays or (R,) arrays
+        #   dx, dy: (R,) arrays with the ray directions
+        #   cell: The (x, y) grid cell of the start position, as scalars or (R,) arrays
+        # Returns:
+        #   dists: An (R,) array of distances to the nearest segment, inf where a ray hits nothing
+
+        rows, cols = self.grid_shape
+        size = self.cell_size
+        num_rays = len(dx)
+        best = np.full(num_rays, np.inf)
+        x = np.broadcast_to(np.asarray(x, dtype=float), (num_rays,))
+        y = np.broadcast_to(np.asarray(y, dtype=float), (num_rays,))
+
+        cell_x = np.full(num_rays, cell[0])
+        cell_y = np.full(num_rays, cell[1])
+        step_x = np.where(dx > 0, 1, -1)
+        step_y = np.where(dy > 0, 1, -1)
+
+        # Distance along each ray to the next vertical and horizontal cell border
+        with np.errstate(divide='ignore', invalid='ignore'):
+            next_x = self.grid_min[0] + (cell_x + (step_x > 0)) * size
+            next_y = self.grid_min[1] + (cell_y + (step_y > 0)) * size
+            t_max_x = np.where(dx != 0, (next_x - x) / dx, np.inf)
+            t_max_y = np.where(dy != 0, (next_y - y) / dy, np.inf)
+            t_delta_x = np.where(dx != 0, size / np.abs(dx), np.inf)
+            t_delta_y = np.where(dy != 0, size / np.abs(dy), np.inf)
+
+        active = np.arange(num_rays)
+        while len(active):
+            # Gather the segments of each active ray's current cell
+            cells = cell_y[active] * cols + cell_x[active]
+            first = self.cell_start[cells]
+            counts = self.cell_start[cells + 1] - first
+            t_exit = np.minimum(t_max_x[active], t_max_y[active])
+
+            if counts.sum():
+                pair_rays = np.repeat(np.arange(len(active)), counts)
+                k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+                seg = self.cell_items[first[pair_rays] + k]
+                ray = active[pair_rays]
+                dists = self.hit_distances(x[ray], y[ray], dx[ray], dy[ray], self.starts[seg],
+                                           self.vectors[seg], self.u_tolerance[seg])
+                # Hits past this cell may be beaten by a hit in a later cell
+                dists[dists > t_exit[pair_rays] + self.tolerance] = np.inf
+                np.minimum.at(best, ray, dists)
+
+            # Step every unfinished ray into its next cell
+            active = active[np.isinf(best[active])]
+            along_x = t_max_x[active] <= t_max_y[active]
+            ray_x, ray_y = active[along_x], active[~along_x]
+            cell_x[ray_x] += step_x[ray_x]
+            t_max_x[ray_x] += t_delta_x[ray_x]
+            cell_y[ray_y] += step_y[ray_y]
+            t_max_y[ray_y] += t_delta_y[ray_y]
+            inside = (cell_x[active] >= 0) & (cell_x[active] < cols) & (cell_y[active] >= 0) & (cell_y[active] < rows)
+            active = active[inside]
+
+        return best
+
+    def hit_distances(self, x, y, dx, dy, starts, vectors, u_tolerance):
+        # Distance along each ray to each segment, the arrays broadcast against each other
+        # Requires:
+        #   x, y: The position the rays start from
+        #   dx, dy: The ray directions
+        #   starts, vectors: The segment start points and direction vectors, (N, 2)
+        #   u_tolerance: The per segment end tolerance
+        # Returns:
+        #   dists: The distances, inf where a ray misses a segment
+
+        # Solve origin + t * dir = start + u * vector for every ray and segment pair
+        ex, ey = vectors[:, 0], vectors[:, 1]
+        ax, ay = starts[:, 0] - x, starts[:, 1] - y
+        denom = dx * ey - dy * ex
+        t_num = ax * ey - ay * ex
+        u_num = ax * dy - ay * dx
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = t_num / denom
+            u = u_num / denom
+        hit = (np.abs(denom) > 1e-12) & (t >= 0) & (u >= -u_tolerance) & (u <= 1 + u_tolerance)
+        dists = np.where(hit, t, np.inf)
+
+        # Rays running along a segment hit its nearer end, if the whole segment is ahead
+        collinear = (np.abs(denom) <= 1e-12) & (np.abs(u_num) <= self.tolerance)
+        if collinear.any():
+            t_start = ax * dx + ay * dy
+            t_end = t_start + ex * dx + ey * dy
+            near = np.minimum(t_start, t_end)
+            dists = np.where(collinear & (near >= 0), np.minimum(dists, near), dists)
+        return dists
+
+
+def segments_array(obstacles):
+    # Converts the obstacle list made by Base.generate_obstacles into an (M, 4) segment array
+    # Requires:
+    #   Obstacles: A list of lines ((x1, y1), (x2, y2))
+    # Returns:
+    #   Segments: An (M, 4) array of (x1, y1, x2, y2)
+    return np.asarray(obstacles, dtype=float).reshape(-1, 4)
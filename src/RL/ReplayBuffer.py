@@ -0,0 +1,267 @@
+# This file contains the experience replay buffers used to train the agents on mini-batches
+# Transitions are kept in preallocated ring arrays, the oldest transitions are overwritten once a buffer is full
+# The prioritized buffer samples in proportion to each transition's priority through a sum tree
+import numpy as np
+
+
+class ReplayBuffer():
+
+    def __init__(self, capacity, observation_size, rng=None):
+        # Constructor for the uniform replay buffer
+        # Requires:
+        #   capacity: The most transitions the buffer holds
+        #   observation_size: The size of one observation, len(FOV) + 6 for DQAgent
+        #   rng: The numpy RandomState to sample with, default is the global np.random
+        # Returns:
+        #   Created object
+
+        self.capacity = capacity
+        self.rng = np.random if rng is None else rng
+        self.observations = np.zeros((capacity, observation_size), dtype=np.float32)
+        self.actions = np.zeros(capacity, dtype=np.int8)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.next_observations = np.zeros((capacity, observation_size), dtype=np.float32)
+        self.dones = np.zeros(capacity, dtype=bool)
+
+        # The slot the next transition goes in and the number of stored transitions
+        self.position = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def add(self, observation, action, reward, next_observation, done):
+        # Stores one transition, overwriting the oldest one when full
+        # Requires:
+        #   observation: The model input before the move
+        #   action: The move taken, 0, 1, 2 for straight, left, right
+        #   reward: The reward for the move
+        #   next_observation: The model input after the move
+        #   done: True if the move ended the episode
+        # Returns:
+        #   index: The slot the transition was stored in
+
+        index = self.position
+        self.observations[index] = observation
+        self.actions[index] = action
+        self.rewards[index] = reward
+        self.next_observations[index] = next_observation
+        self.dones[index] = done
+        self.position = (index + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        return index
+
+    def add_batch(self, observations, actions, rewards, next_observations, dones):
+        # Stores a batch of transitions, like the arrays returned by VectorEnvironment.step or RolloutWorkers.collect
+        # Requires:
+        #   observations, actions, rewards, next_observations, dones: Arrays with one row per transition,
+        #       any leading axes are flattened
+        # Returns:
+        #   indices: The slots the transitions were stored in
+
+        actions = np.ravel(actions)
+        count = len(actions)
+        indices = (self.position + np.arange(count)) % self.capacity
+        # Only the newest capacity transitions survive a batch larger than the buffer
+        indices, first = indices[-self.capacity:], max(count - self.capacity, 0)
+
+        self.observations[indices] = np.reshape(observations, (count, -1))[first:]
+        self.actions[indices] = actions[first:]
+        self.rewards[indices] = np.ravel(rewards)[first:]
+        self.next_observations[indices] = np.reshape(next_observations, (count, -1))[first:]
+        self.dones[indices] = np.ravel(dones)[first:]
+        self.position = (self.position + count) % self.capacity
+        self.size = min(self.size + count, self.capacity)
+        return indices
+
+    def sample(self, batch_size):
+        # Samples a mini-batch of transitions uniformly
+        # Requires:
+        #   batch_size: The number of transitions to sample
+        # Returns:
+        #   batch: A dict of arrays, the transitions along with their indices and importance weights of one
+
+        indices = self.rng.randint(0, self.size, batch_size)
+        return self.gather(indices, np.ones(batch_size, dtype=np.float32))
+
+    def gather(self, indices, weights):
+        # Collects the stored transitions at the given slots into a mini-batch
+        # Requires:
+        #   indices: The slots to collect
+        #   weights: The importance weight of each sampled transition
+        # Returns:
+        #   batch: A dict of arrays keyed like the buffer attributes, plus indices and weights
+
+        return {
+            "observations": self.observations[indices],
+            "actions": self.actions[indices],
+            "rewards": self.rewards[indices],
+            "next_observations": self.next_observations[indices],
+            "dones": self.dones[indices],
+            "indices": indices,
+            "weights": weights,
+        }
+
+    def update_priorities(self, indices, errors):
+        # Does nothing, uniform sampling has no priorities, see PrioritizedReplayBuffer.update_priorities
+        # Requires:
+        #   indices, errors: The sampled slots and their new TD errors
+        # Returns:
+        #   Nothing
+        pass
+
+    def nbytes(self):
+        # Gets the memory used by the stored arrays
+        # Requires:
+        #   Nothing
+        # Returns:
+        #   nbytes: The bytes of the preallocated arrays
+        return sum(array.nbytes for array in (self.observations, self.actions, self.rewards,
+                                              self.next_observations, self.dones))
+
+
+class SumTree():
+
+    def __init__(self, capacity, fanout=16):
+        # Constructor for the sum tree, a tree where every node holds the sum of its children
+        # Every node has fanout children so the tree is shallow, which keeps the number of numpy calls per
+        # batch low, levels[0] is the root and levels[-1] the leaves
+        # Requires:
+        #   capacity: The number of leaves
+        #   fanout: The number of children of each node
+        # Returns:
+        #   Created object
+
+        self.fanout = fanout
+        self.levels = [np.zeros(1)]
+        while len(self.levels[-1]) < capacity:
+            self.levels.append(np.zeros(len(self.levels[-1]) * fanout))
+        self.leaves = self.levels[-1]
+
+    def total(self):
+        # The sum of every leaf
+        return self.levels[0][0]
+
+    def set(self, index, priority):
+        # Sets one leaf and fixes the sums above it
+        # Requires:
+        #   index: The leaf to set
+        #   priority: The new value of the leaf
+        # Returns:
+        #   Nothing
+
+        self.leaves[index] = priority
+        for parent, children in zip(self.levels[-2::-1], self.levels[:0:-1]):
+            index //= self.fanout
+            parent[index] = children[index * self.fanout:(index + 1) * self.fanout].sum()
+
+    def update(self, indices, priorities):
+        # Sets leaves and fixes the sums above them, one tree level at a time for the whole batch
+        # Requires:
+        #   indices: The leaves to set
+        #   priorities: The new value of each leaf
+        # Returns:
+        #   Nothing
+
+        nodes = np.asarray(indices, dtype=np.int64)
+        self.leaves[nodes] = priorities
+        # Repeated parents just write the same sum twice, so there is no need to deduplicate
+        for parent, children in zip(self.levels[-2::-1], self.levels[:0:-1]):
+            nodes = nodes // self.fanout
+            parent[nodes] = children.reshape(-1, self.fanout)[nodes].sum(axis=1)
+
+    def find(self, values):
+        # Finds the leaves whose prefix sums contain the given values, walking down the tree for all at once
+        # Only leaves with a priority above zero are found, as long as the total is above zero
+        # Requires:
+        #   values: An array of values in [0, total)
+        # Returns:
+        #   indices: The leaf of each value
+
+        values = np.array(values, dtype=float)[:, None]
+        nodes = np.zeros(len(values), dtype=np.int64)
+        rows = np.arange(len(values))
+        for children in self.levels[1:]:
+            # The child whose running sum first passes the value, then the value within that child
+            # The last child above zero always passes so rounding at the top end cannot fall off the row
+            # or onto the zero children after it
+            block = children.reshape(-1, self.fanout)[nodes]
+            sums = block.cumsum(1)
+            before = sums - block
+            sums[rows, self.fanout - 1 - (block[:, ::-1] > 0).argmax(1)] = np.inf
+            child = (sums > values).argmax(1)
+            values -= before[rows, child, None]
+            nodes = nodes * self.fanout + child
+        return nodes
+
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+
+    def __init__(self, capacity, observation_size, alpha=0.6, beta=0.4, epsilon=1e-3, rng=None):
+        # Constructor for the prioritized replay buffer (Schaul et al., Prioritized Experience Replay)
+        # Requires:
+        #   capacity, observation_size, rng: See ReplayBuffer
+        #   alpha: How strongly priorities shape sampling, 0 is uniform
+        #   beta: How much the importance weights correct for the sampling, 1 is fully
+        #   epsilon: Added to every TD error so no transition stops being sampled
+        # Returns:
+        #   Created object
+
+        super().__init__(capacity, observation_size, rng)
+        self.alpha, self.beta, self.epsilon = alpha, beta, epsilon
+        self.tree = SumTree(capacity)
+        self.max_priority = 1.0
+
+    def add(self, observation, action, reward, next_observation, done):
+        # Stores one transition with the highest priority so far, so it is sampled at least once soon
+        index = super().add(observation, action, reward, next_observation, done)
+        self.tree.set(index, self.max_priority)
+        return index
+
+    def add_batch(self, observations, actions, rewards, next_observations, dones):
+        # Stores a batch of transitions with the highest priority so far, see ReplayBuffer.add_batch
+        indices = super().add_batch(observations, actions, rewards, next_observations, dones)
+        self.tree.update(indices, self.max_priority)
+        return indices
+
+    def sample(self, batch_size):
+        # Samples a mini-batch in proportion to priority, one sample from each of batch_size equal slices
+        # of the total priority
+        # Requires:
+        #   batch_size: The number of transitions to sample
+        # Returns:
+        #   batch: A dict of arrays, see ReplayBuffer.gather, with weights that undo the sampling bias
+
+        total = self.tree.total()
+        values = (np.arange(batch_size) + self.rng.rand(batch_size)) * (total / batch_size)
+        indices = self.tree.find(values)
+
+        # Importance weights, scaled so the largest in the batch is 1
+        probabilities = self.tree.leaves[indices] / total
+        weights = (self.size * probabilities) ** -self.beta
+        return self.gather(indices, (weights / weights.max()).astype(np.float32))
+
+    def update_priorities(self, indices, errors):
+        # Sets the priorities of sampled transitions from their new TD errors
+        # Requires:
+        #   indices: The sampled slots, batch["indices"]
+        #   errors: The absolute TD error of each sampled transition
+        # Returns:
+        #   Nothing
+
+        priorities = (np.abs(errors) + self.epsilon) ** self.alpha
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+        self.tree.update(indices, priorities)
+
+    def nbytes(self):
+        # Gets the memory used by the stored arrays and the sum tree
+        return super().nbytes() + sum(level.nbytes for level in self.tree.levels)
+
+
+if __name__ == "__main__":
+    buffer = PrioritizedReplayBuffer(1000, 96)
+    for i in range(1500):
+        buffer.add(np.random.rand(96), np.random.randint(0, 3), np.random.rand(), np.random.rand(96), False)
+    batch = buffer.sample(32)
+    buffer.update_priorities(batch["indices"], np.random.rand(32))
+    print(len(buffer), batch["observations"].shape, batch["weights"].min(), buffer.nbytes())
@@ -0,0 +1,316 @@
+# This file contains the rollout workers that collect training trajectories in parallel
+# Each worker process owns its own environment and writes its trajectories straight into shared memory
+# The policy is a numpy copy of the DQAgent model so the workers never have to import tensorflow
+import multiprocessing as mp
+import queue
+import time
+import traceback
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from EnvironmentClasses import Base
+from VectorEnvironment import VectorEnvironment
+
+
+def mlp_shapes(inputs, num_layers):
+    # The weight shapes of the model made by DQAgent.construct_model, in the order of model.get_weights()
+    # Requires:
+    #   inputs: The size of the model input, len(FOV) + 6
+    #   num_layers: The number of dense layers, see DQAgent.construct_model
+    # Returns:
+    #   shapes: A list of (kernel shape, bias shape) for each dense layer, flattened
+    nodes = [8 * pow(2, num_layers)]
+    for i in range(num_layers):
+        nodes.append(nodes[-1] // 2)
+    nodes.append(3)
+    shapes = []
+    for n_in, n_out in zip([inputs] + nodes[:-1], nodes):
+        shapes += [(n_in, n_out), (n_out,)]
+    return shapes
+
+
+def mlp_weights(inputs, num_layers, seed=0):
+    # Random weights with the shapes of the DQAgent model, for running without a trained model
+    # Requires:
+    #   inputs, num_layers: See mlp_shapes
+    #   seed: The random seed
+    # Returns:
+    #   weights: A list of float32 arrays, like model.get_weights()
+    rng = np.random.default_rng(seed)
+    weights = []
+    for shape in mlp_shapes(inputs, num_layers):
+        if len(shape) == 2:
+            weights.append(rng.normal(0, np.sqrt(2 / shape[0]), shape).astype(np.float32))
+        else:
+            weights.append(np.zeros(shape, dtype=np.float32))
+    return weights
+
+
+def mlp_forward(weights, inputs):
+    # Evaluates the DQAgent model on a batch of inputs, relu dense layers and a softmax output
+    # Requires:
+    #   weights: A list of arrays, like model.get_weights()
+    #   inputs: An (N, len(FOV) + 6) array of model inputs
+    # Returns:
+    #   q_vals: An (N, 3) array of the predicted quality of each move
+    x = np.asarray(inputs, dtype=np.float32)
+    for i in range(0, len(weights) - 2, 2):
+        x = np.maximum(x @ weights[i] + weights[i + 1], 0)
+    x = x @ weights[-2] + weights[-1]
+    x = np.exp(x - x.max(axis=1, keepdims=True))
+    return x / x.sum(axis=1, keepdims=True)
+
+
+def collect_rollout(vec_env, weights, buffers, epsilon=0, rng=None):
+    # Steps a vectorized environment with the policy and records every step
+    # Requires:
+    #   vec_env: The VectorEnvironment to step, it carries on from where the last rollout stopped
+    #   weights: A list of arrays, like model.get_weights()
+    #   buffers: A dict of arrays to fill, see RolloutWorkers.buffer_shapes, the first axis is the step
+    #   epsilon: The chance of a random move instead of the best one, see DQAgent.training_step
+    #   rng: The numpy RandomState used for the random moves, default is the global np.random
+    # Returns:
+    #   Nothing
+    if rng is None:
+        rng = np.random
+    observation = vec_env.get_observation()
+    for step in range(len(buffers["actions"])):
+        moves = mlp_forward(weights, observation).argmax(axis=1)
+        explore = rng.rand(vec_env.num_agents) < epsilon
+        moves[explore] = rng.randint(0, 3, explore.sum())
+
+        buffers["observations"][step] = observation
+        observation, reward, done = vec_env.step(moves)
+        buffers["actions"][step] = moves
+        buffers["rewards"][step] = reward
+        buffers["dones"][step] = done
+        buffers["next_observations"][step] = observation
+
+
+def make_worker_env(config, worker_id):
+    # Builds the environment of one worker, every worker gets its own obstacles and random seed
+    # Requires:
+    #   config: The dict of RolloutWorkers settings
+    #   worker_id: The number of the worker
+    # Returns:
+    #   vec_env: The worker's VectorEnvironment
+    #   rng: The worker's numpy RandomState for random moves and resets
+    seed = config["seed"] + worker_id
+    np.random.seed(seed)
+    env = Base(**config["env_kwargs"])
+    rng = np.random.RandomState(seed)
+    vec_env = VectorEnvironment(env, config["num_agents"], config["start"], config["FOV"], config["path"],
+                                max_steps=config["max_steps"], rng=rng)
+    return vec_env, rng
+
+
+def rollout_worker(worker_id, config, names, commands, results):
+    # The loop run by each worker process
+    # Waits for a command, copies the current weights out of shared memory, collects one rollout into its
+    # slot of the shared buffers and reports back, until it is sent None
+    # Reports are (worker_id, None), or (worker_id, traceback text) after which the worker exits
+    # Requires:
+    #   worker_id: The number of the worker, also its slot in the shared buffers
+    #   config: The dict of RolloutWorkers settings
+    #   names: The shared memory names of the buffers and the weights
+    #   commands: The queue the worker gets commands from
+    #   results: The queue the worker reports finished rollouts on
+    # Returns:
+    #   Nothing
+    blocks = {key: shared_memory.SharedMemory(name=name) for key, name in names.items()}
+    buffers = flat_weights = slot = None
+    try:
+        buffers = RolloutWorkers.buffer_views(config, blocks)
+        flat_weights = np.ndarray((config["num_weights"],), dtype=np.float32, buffer=blocks["weights"].buf)
+        vec_env, rng = make_worker_env(config, worker_id)
+
+        while True:
+            command = commands.get()
+            if command is None:
+                break
+            # Copy the weights so the whole rollout uses one snapshot of the policy
+            weights = RolloutWorkers.unflatten(flat_weights.copy(), config["shapes"])
+            slot = {key: buffer[worker_id] for key, buffer in buffers.items()}
+            collect_rollout(vec_env, weights, slot, command["epsilon"], rng)
+            results.put((worker_id, None))
+    except Exception:
+        # Exceptions may not pickle, so the learner gets the traceback text
+        results.put((worker_id, traceback.format_exc()))
+    finally:
+        # The numpy views have to go before the blocks can be closed
+        buffers = flat_weights = slot = None
+        for block in blocks.values():
+            block.close()
+
+
+class RolloutWorkers():
+
+    def __init__(self, num_workers, env_kwargs, start, FOV, path, num_layers=4, num_agents=1,
+                 rollout_length=100, max_steps=100, seed=0, poll_interval=1.0):
+        # Constructor for the pool of rollout workers
+        # Requires:
+        #   num_workers: The number of worker processes
+        #   env_kwargs: The Base arguments every worker builds its environment with
+        #   start, FOV, path: The agent settings, see VectorEnvironment
+        #   num_layers: The number of dense layers of the policy, see DQAgent.construct_model
+        #   num_agents: The agents each worker steps together
+        #   rollout_length: The steps each worker records per collect
+        #   max_steps: The steps after which an agent is reset
+        #   seed: The random seed, worker i uses seed + i
+        #   poll_interval: The seconds collect waits for a report before checking that the workers are alive
+        # Returns:
+        #   Created object
+
+        self.num_workers = num_workers
+        self.poll_interval = poll_interval
+        shapes = mlp_shapes(len(FOV) + 6, num_layers)
+        self.config = {
+            "env_kwargs": dict(env_kwargs), "start": tuple(start), "FOV": list(FOV),
+            "path": [tuple(point) for point in path], "num_agents": num_agents, "num_workers": num_workers,
+            "rollout_length": rollout_length, "max_steps": max_steps, "seed": seed,
+            "shapes": shapes, "num_weights": sum(int(np.prod(shape)) for shape in shapes)
+        }
+
+        # The buffers all workers write into, one slot per worker, and the weights they read
+        self.blocks = {}
+        for key, (shape, dtype) in self.buffer_shapes(self.config).items():
+            size = max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize)
+            self.blocks[key] = shared_memory.SharedMemory(create=True, size=size)
+        self.blocks["weights"] = shared_memory.SharedMemory(create=True, size=self.config["num_weights"] * 4)
+        self.buffers = self.buffer_views(self.config, self.blocks)
+        self.flat_weights = np.ndarray((self.config["num_weights"],), dtype=np.float32,
+                                       buffer=self.blocks["weights"].buf)
+
+        # Spawn rather than fork so workers never inherit tensorflow state from the learner
+        context = mp.get_context("spawn")
+        names = {key: block.name for key, block in self.blocks.items()}
+        self.results = context.Queue()
+        self.commands = []
+        self.processes = []
+        for worker_id in range(num_workers):
+            commands = context.Queue()
+            process = context.Process(target=rollout_worker, daemon=True,
+                                      args=(worker_id, self.config, names, commands, self.results))
+            process.start()
+            self.commands.append(commands)
+            self.processes.append(process)
+
+    @staticmethod
+    def buffer_shapes(config):
+        # The shape and dtype of every shared buffer, (workers, steps, agents, ...)
+        # Requires:
+        #   config: The dict of RolloutWorkers settings
+        # Returns:
+        #   shapes: A dict of (shape, dtype) keyed by buffer name
+        lead = (config["num_workers"], config["rollout_length"], config["num_agents"])
+        inputs = len(config["FOV"]) + 6
+        return {
+            "observations": (lead + (inputs,), np.float32),
+            "actions": (lead, np.int8),
+            "rewards": (lead, np.float32),
+            "dones": (lead, np.bool_),
+            "next_observations": (lead + (inputs,), np.float32),
+        }
+
+    @staticmethod
+    def buffer_views(config, blocks):
+        # Wraps the shared memory blocks in numpy arrays
+        # Requires:
+        #   config: The dict of RolloutWorkers settings
+        #   blocks: The SharedMemory objects keyed by buffer name
+        # Returns:
+        #   buffers: A dict of arrays keyed by buffer name
+        return {key: np.ndarray(shape, dtype=dtype, buffer=blocks[key].buf)
+                for key, (shape, dtype) in RolloutWorkers.buffer_shapes(config).items()}
+
+    @staticmethod
+    def unflatten(flat_weights, shapes):
+        # Splits one flat weight array into the arrays of each layer
+        # Requires:
+        #   flat_weights: The concatenated weights
+        #   shapes: The shape of each array, see mlp_shapes
+        # Returns:
+        #   weights: A list of arrays, like model.get_weights()
+        weights = []
+        offset = 0
+        for shape in shapes:
+            size = int(np.prod(shape))
+            weights.append(flat_weights[offset:offset + size].reshape(shape))
+            offset += size
+        return weights
+
+    def collect(self, weights, epsilon=0, timeout=None):
+        # Has every worker record one rollout with a snapshot of the given weights
+        # Raises RuntimeError if a worker fails or dies and TimeoutError if the workers take longer than
+        # timeout, the pool should be closed after either
+        # Requires:
+        #   weights: A list of arrays, like model.get_weights()
+        #   epsilon: The chance of a random move, see DQAgent.training_step
+        #   timeout: The most seconds to wait for the workers, default is no limit
+        # Returns:
+        #   buffers: A dict of (workers, steps, agents, ...) arrays, views of the shared memory that are
+        #            overwritten by the next collect, copy them to keep them
+        self.flat_weights[:] = np.concatenate([np.ravel(weight) for weight in weights])
+        for commands in self.commands:
+            commands.put({"epsilon": epsilon})
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        pending = set(range(self.num_workers))
+        while pending:
+            try:
+                worker_id, error = self.results.get(timeout=self.poll_interval)
+            except queue.Empty:
+                # A worker that died without reporting, e.g. killed, would leave collect waiting forever
+                for worker_id in pending:
+                    process = self.processes[worker_id]
+                    if not process.is_alive():
+                        raise RuntimeError(f"Rollout worker {worker_id} exited with code {process.exitcode}")
+                if deadline is not None and time.monotonic() > deadline:
+                    raise TimeoutError(f"Rollout workers {sorted(pending)} did not finish in {timeout}s")
+                continue
+            if error is not None:
+                raise RuntimeError(f"Rollout worker {worker_id} failed:\n{error}")
+            pending.discard(worker_id)
+        return self.buffers
+
+    def close(self):
+        # Stops the workers and frees the shared memory
+        # Requires:
+        #   Nothing
+        # Returns:
+        #   Nothing
+        for commands in self.commands:
+            commands.put(None)
+        for process in self.processes:
+            # A worker stuck in a rollout is stopped rather than waited on
+            process.join(timeout=10 * self.poll_interval)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        self.buffers = self.flat_weights = None
+        for block in self.blocks.values():
+            try:
+                block.close()
+            except BufferError:
+                # The caller still holds arrays from collect, the memory is freed once they are dropped
+                pass
+            block.unlink()
+        self.blocks = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+if __name__ == "__main__":
+    fov = list(range(-45, 45, 5))
+    path = [(500, 500 + 10 * i, 90) for i in range(1, 20)]
+    env_kwargs = {"width": 1000, "height": 1000, "num_obstables": 10}
+    with RolloutWorkers(2, env_kwargs, (500, 500, 90), fov, path, num_agents=8) as workers:
+        weights = mlp_weights(len(fov) + 6, 4)
+        for i in range(3):
+            buffers = workers.collect(weights, epsilon=0.1)
+            print(f"Rollout {i}: mean reward {buffers['rewards'].mean():.4f}, {buffers['dones'].sum()} resets")
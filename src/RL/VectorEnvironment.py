@@ -0,0 +1,163 @@
+# This file contains the vectorized environment used to step many agents at once
+# Agent states are kept as arrays and every step moves all agents and casts all of their rays in one batch
+import numpy as np
+
+from EnvironmentClasses import Base
+
+
+class VectorEnvironment():
+
+    def __init__(self, env, num_agents, start, FOV, path, LINEAR=5, ROTATIONAL=5, max_steps=100, jitter=10,
+                 rng=None):
+        # Constructor for the vectorized environment
+        # Requires:
+        #   env: The Base environment all of the agents are in
+        #   num_agents: The number of agents to step together
+        #   start: The starting location of the agents in (x, y, theta), theta in degrees
+        #   FOV: The list of angle difference to look in from theta, see Manual
+        #   path: The path every agent follows, a list of (x, y, theta) waypoints
+        #   LINEAR: The speed of the agents in the forward direction
+        #   ROTATIONAL: The speed of the agents in rotation
+        #   max_steps: The steps after which an agent is reset
+        #   jitter: The most degrees a reset turns an agent away from start[2], see DQAgent.reset
+        #   rng: The numpy RandomState for the reset turns, default is the global np.random
+        # Returns:
+        #   Created object
+
+        self.env = env
+        self.num_agents = num_agents
+        self.POS = tuple(float(value) for value in start)
+        self.FOV = np.radians(np.asarray(FOV, dtype=float))
+        self.path = np.asarray(path, dtype=float).reshape(-1, 3)
+        self.LINEAR, self.ROTATIONAL = LINEAR, ROTATIONAL
+        self.max_steps = max_steps
+        self.jitter = jitter
+        self.rng = np.random if rng is None else rng
+
+        # One entry per agent
+        self.x = np.zeros(num_agents)
+        self.y = np.zeros(num_agents)
+        self.theta = np.zeros(num_agents)
+        self.waypoint = np.zeros(num_agents, dtype=int)
+        self.steps = np.zeros(num_agents, dtype=int)
+        self.reset()
+
+    def reset(self, agents=None):
+        # Puts agents back at the start of the path, see reset_agents
+        # Requires:
+        #   agents: A boolean mask or index array of the agents to reset, default is all of them
+        # Returns:
+        #   observation: The (N, len(FOV) + 6) observations of all agents, see get_observation
+
+        self.reset_agents(np.arange(self.num_agents) if agents is None else agents)
+        return self.get_observation()
+
+    def reset_agents(self, agents):
+        # Puts agents back at the start of the path with a random turn, like DQAgent.reset
+        # Requires:
+        #   agents: A boolean mask or index array of the agents to reset
+        # Returns:
+        #   Nothing
+
+        agents = np.arange(self.num_agents)[agents]
+        self.x[agents], self.y[agents] = self.POS[0], self.POS[1]
+        self.theta[agents] = self.POS[2]
+        if self.jitter:
+            self.theta[agents] += self.rng.randint(-self.jitter, self.jitter, len(agents))
+        self.waypoint[agents] = 0
+        self.steps[agents] = 0
+
+    def get_observation(self):
+        # Gets the model input of every agent, laid out like DQAgent.get_model_input
+        # Requires:
+        #   Nothing
+        # Returns:
+        #   observation: An (N, len(FOV) + 6) array of the sensor distances, the position (x, y, theta)
+        #                and the current target (x, y, theta) of each agent
+
+        angles = np.radians(self.theta)[:, None] + self.FOV
+        sensor_data = self.env.caster.cast_many(self.x, self.y, angles)
+        targets = self.path[np.minimum(self.waypoint, len(self.path) - 1)]
+        return np.column_stack((sensor_data, self.x, self.y, self.theta, targets))
+
+    def move(self, moves):
+        # Moves every agent like Manual.move, 0, 1, 2 for straight, left, right respectively
+        # Agents that would collide with an obstacle stay where they are
+        # Requires:
+        #   moves: An (N,) array of directions
+        # Modifies:
+        #   x, y, theta: The positions and rotations of the agents
+        # Returns:
+        #   hit: An (N,) boolean array, True where the straight move was invalid
+
+        moves = np.asarray(moves)
+        hit = np.zeros(self.num_agents, dtype=bool)
+
+        forward = np.flatnonzero(moves == 0)
+        if len(forward):
+            radians = np.radians(self.theta[forward])
+            dists = self.env.caster.cast_many(self.x[forward], self.y[forward], radians[:, None])[:, 0]
+            hit[forward] = dists <= self.LINEAR + 0.001
+            moved = ~hit[forward]
+            self.x[forward[moved]] += self.LINEAR * np.cos(radians[moved])
+            self.y[forward[moved]] += self.LINEAR * np.sin(radians[moved])
+
+        left = moves == 1
+        self.theta[left] += self.ROTATIONAL
+        self.theta[left & (self.theta >= 360)] -= 360
+
+        right = (moves != 0) & (moves != 1)
+        self.theta[right] -= self.ROTATIONAL
+        self.theta[right & (self.theta < 0)] += 360
+        return hit
+
+    def get_reward(self, hit):
+        # Calculates the reward of every agent for its current position, like DQAgent.get_reward
+        # Requires:
+        #   hit: An (N,) boolean array of agents that hit an object, results in very negative reward
+        # Returns:
+        #   reward: An (N,) array of rewards
+
+        targets = self.path[np.minimum(self.waypoint, len(self.path) - 1)]
+        pos = np.column_stack((self.x, self.y, self.theta))
+        pos_error = np.mean((targets - pos) ** 2, axis=1)
+        with np.errstate(divide='ignore'):
+            reward = 1 / pos_error
+        reward -= 50 * hit
+        reward += 50 * (pos_error < self.LINEAR)
+        return reward
+
+    def step(self, moves):
+        # Moves every agent, scores the move, and resets the agents that finished
+        # An agent finishes when it hits an object, passes the last waypoint, or runs out of steps
+        # Requires:
+        #   moves: An (N,) array of directions, see move
+        # Returns:
+        #   observation: The (N, len(FOV) + 6) observations after the step, of the new episode for reset agents
+        #   reward: An (N,) array of rewards for the step
+        #   done: An (N,) boolean array, True where the agent finished and was reset
+
+        hit = self.move(moves)
+        reward = self.get_reward(hit)
+        self.steps += 1
+
+        # Advance to the next waypoint when close enough to the current one, like DQAgent.training_episode
+        targets = self.path[np.minimum(self.waypoint, len(self.path) - 1)]
+        dist = np.mean((targets[:, :2] - np.column_stack((self.x, self.y))) ** 2, axis=1)
+        self.waypoint += (dist <= self.LINEAR) & ~hit
+
+        done = hit | (self.waypoint >= len(self.path)) | (self.steps >= self.max_steps)
+        if done.any():
+            self.reset_agents(done)
+        return self.get_observation(), reward, done
+
+
+if __name__ == "__main__":
+    env = Base(width=1000, height=1000, num_obstables=10, box_w=100, box_h=100)
+    fov = list(range(-45, 45))
+    path = [(500, 500 + 10 * i, 90) for i in range(1, 20)]
+    vec_env = VectorEnvironment(env, 64, (500, 500, 90), fov, path)
+    observation = vec_env.reset()
+    for i in range(100):
+        observation, reward, done = vec_env.step(np.random.randint(0, 3, vec_env.num_agents))
+    print(observation.shape, reward.mean(), done.sum())
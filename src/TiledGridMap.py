@@ -0,0 +1,415 @@
+# ------------------------------------------------------------------------------
+# Name         : TiledGridMap.py
+# Date Created : 10/18/2026
+# Author(s)    : Micheal Caracciolo, Chris Lloyd, Owen Casciotti
+# Github Link  : https://github.com/michealcarac/VSLAM-Mapping
+# Description  : A sparse, tiled storage backend for the occupancy grid map.
+# ------------------------------------------------------------------------------
+
+# Internal Imports
+from OccupancyGridMap import OccupancyGridMap
+
+# External Imports
+import numpy as np
+
+class TiledGridMap(OccupancyGridMap):
+    """
+    An occupancy grid map that stores its cells in fixed size square tiles.
+
+    Only tiles that hold a cell different from default_value are allocated,
+    every other cell reads as default_value (unknown). This keeps the cell
+    values of building scale maps, which are mostly unknown space, small in
+    memory (see nbytes) while keeping the OccupancyGridMap interface.
+
+    Only the cell values are sparse. The planners and the validity checks
+    read the free and occupied masks, which stay dense with one byte per
+    cell each. They are built tile by tile, so planning needs about 2 bytes
+    per cell rather than the 10 of the dense backend, not less. The
+    grid_map attribute still works, but builds (and on assignment splits
+    up) a dense copy of the grid. The copy is read only, cells are written
+    with setDataIndex or setRegion. Use getTile, getRegion and setRegion to
+    work on blocks of cells instead.
+    appendKeyframes writes straight into the tiles, growing the grid
+    moves the allocated tiles rather than copying the whole grid.
+
+    Attributes:
+        tiles (dict of matrix of float32): The allocated tiles, keyed by tile
+                                           point (tile x, tile y).
+        tile_size (int):                   The width and height of a tile.
+        default_value (float32):           The value of unallocated cells.
+        shape (tuple of int):              The (rows, cols) of the grid.
+    """
+
+    def __init__(self, _grid_map=[], _cell_threshold=0.5, _cell_size=1, _trans_pt = (0,0),
+                 _tile_size=64, _default_value=0.6, _shape=(0, 0)):
+        """
+        The default constructor for class TiledGridMap.
+
+        Args:
+            _grid_map (matrix of float32): A datamap to use as the gridmap.
+            _cell_threshold (float32):     The threshold for a cell being occupied
+            _cell_size (float32):          The unitless size of a cell's length and width.
+            _trans_pt (Tuple point):       A point to shift the gridmap by.
+            _tile_size (int):              The width and height of a tile.
+            _default_value (float32):      The value of unallocated cells.
+            _shape (tuple of int):         The (rows, cols) of an empty grid,
+                                           used when _grid_map is empty.
+        """
+        self.tile_size     = _tile_size
+        self.default_value = _default_value
+        self.tiles         = {}
+        self.shape         = tuple(_shape)
+
+        super().__init__(_grid_map, _cell_threshold, _cell_size, _trans_pt)
+        if len(_grid_map) == 0:
+            self.shape = tuple(_shape)
+
+    @property
+    def grid_map(self):
+        """A read only dense copy of the occupancy grid map cell data."""
+        grid_map = self.getRegion(0, 0, self.shape[1], self.shape[0])
+        grid_map.flags.writeable = False
+        return grid_map
+
+    @grid_map.setter
+    def grid_map(self, value):
+        value = np.asarray(value, dtype=float)
+        if value.ndim != 2:
+            value = value.reshape(0, 0)
+        self.tiles = {}
+        self.shape = value.shape
+        self._invalidateCache()
+        self._setTiles(0, 0, value)
+        self._notifyListeners(None)
+
+    # ----------------------------------------------------------------------------
+    # Class Methods
+    # ----------------------------------------------------------------------------
+
+    def getDataIndex(self, index_point):
+        """
+        Method to get the occupancy value at a certain index location.
+
+        Args:
+            index_point (tuple of int): An indexed point (x, y).
+
+        Returns:
+            value (float32): The value of occupancy.
+        """
+
+        # Ensure the point is valid
+        if (not self.isValidIndexPoint(index_point)):
+            print("ERROR: Entered point is invalid!")
+            return -1 # CDL=> Replace with exception later
+
+        # Get index point x,y
+        x, y = index_point
+
+        # Get the value of occupancy
+        return self._cellValue(x, y)
+
+    def setDataIndex(self, index_point, value):
+        """
+        Method to set the occupancy value at a certain index location.
+
+        Args:
+            index_point (tuple of int): An indexed point (x, y).
+            value (float32):            The value of occupancy to set.
+
+        Returns:
+            value (float32): The value of occupancy.
+        """
+
+        # Ensure the point is valid
+        if (not self.isValidIndexPoint(index_point)):
+            print("ERROR: Entered point is invalid!")
+            return -1 # CDL=> Replace with exception later
+
+        # Get index point x,y
+        x, y = index_point
+
+        key = (x // self.tile_size, y // self.tile_size)
+        tile = self.tiles.get(key)
+        if tile is None:
+            if value == self.default_value:
+                return value
+            tile = self.tiles[key] = np.full((self.tile_size, self.tile_size), self.default_value)
+        tile[y % self.tile_size, x % self.tile_size] = value
+
+        # Keep the cached classification up to date
+        if self._free_mask is not None:
+            self._free_mask[y, x]     = (0 <= value <= self.cell_threshold)
+            self._occupied_mask[y, x] = (self.cell_threshold <= value <= 1)
+            self._neighbor_mask       = None
+            self._pyramid             = None
+
+        self._notifyListeners([(x, y)])
+        return value
+
+    def isOccupiedIndex(self, index_point):
+        """
+        Method to check if index point is occupied.
+
+        Args:
+            index_point (tuple of int): An indexed point (x, y).
+
+        Returns:
+            status (bool): Whether the position is occupied.
+        """
+        # Ensure the point is valid
+        if (not self.isValidIndexPoint(index_point)):
+            print("ERROR: Entered point is invalid!")
+            return -1 # CDL=> Replace with exception later
+
+        # Get index point x,y
+        x, y = index_point
+
+        # Get the occupancy value
+        value = self._cellValue(x, y)
+
+        # Get occupied status
+        return (self.cell_threshold <= value <= 1)
+
+    def isUnoccupiedIndex(self, index_point):
+        """
+        Method to check if index point is unoccupied.
+
+        Args:
+            index_point (tuple of int): An indexed point (x, y).
+
+        Returns:
+            status (bool): Whether the position is unoccupied.
+        """
+        # Ensure the point is valid
+        if (not self.isValidIndexPoint(index_point)):
+            print("ERROR: Entered point is invalid!")
+            return -1 # CDL=> Replace with exception later
+
+        # Get index point x,y
+        x, y = index_point
+
+        # Get the occupancy value
+        value = self._cellValue(x, y)
+
+        # Get unoccupied status
+        return (0 <= value <= self.cell_threshold)
+
+    def getMaxRow(self):
+        """
+        Method to get the max row (y value).
+
+        Returns:
+            numRows (int): The max row value.
+        """
+        return self.shape[0]
+
+    def getMaxCol(self):
+        """
+        Method to get the max col (x value).
+
+        Returns:
+            numCols (int): The max col value.
+        """
+        return self.shape[1]
+
+    def getTile(self, tile_point):
+        """
+        Method to get the cells of one tile.
+
+        Args:
+            tile_point (tuple of int): A tile point (tile x, tile y).
+
+        Returns:
+            tile (matrix of float32): The tile cells, indexed [y, x]. Writing
+                                      to it changes the map only if the tile
+                                      is allocated (see allocatedTiles).
+        """
+        tile = self.tiles.get(tuple(tile_point))
+        if tile is None:
+            return np.full((self.tile_size, self.tile_size), self.default_value)
+        return tile
+
+    def allocatedTiles(self):
+        """
+        Method to list the allocated tiles.
+
+        Returns:
+            tile_points (list of (int, int)): The allocated tile points.
+        """
+        return list(self.tiles.keys())
+
+    def getRegion(self, x0, y0, x1, y1):
+        """
+        Method to get a dense block of cells, [x0, x1) x [y0, y1).
+
+        Args:
+            x0, y0 (int): The first index point of the block.
+            x1, y1 (int): One past the last index point of the block.
+
+        Returns:
+            region (matrix of float32): The cells, indexed [y - y0, x - x0].
+        """
+        size = self.tile_size
+        region = np.full((max(y1 - y0, 0), max(x1 - x0, 0)), self.default_value)
+        if x1 <= x0 or y1 <= y0:
+            return region
+
+        for ty in range(y0 // size, (y1 - 1) // size + 1):
+            for tx in range(x0 // size, (x1 - 1) // size + 1):
+                tile = self.tiles.get((tx, ty))
+                if tile is None:
+                    continue
+                # Overlap of the tile and the region
+                cx0, cy0 = max(tx * size, x0), max(ty * size, y0)
+                cx1, cy1 = min((tx + 1) * size, x1), min((ty + 1) * size, y1)
+                region[cy0 - y0:cy1 - y0, cx0 - x0:cx1 - x0] = \
+                    tile[cy0 - ty * size:cy1 - ty * size, cx0 - tx * size:cx1 - tx * size]
+        return region
+
+    def setRegion(self, x0, y0, values):
+        """
+        Method to write a dense block of cells starting at index point (x0, y0).
+
+        Tiles are only allocated where the block holds a value other than
+        default_value. The block must lie inside the grid.
+
+        Args:
+            x0, y0 (int):              The first index point of the block.
+            values (matrix of float32): The cells, indexed [y - y0, x - x0].
+        """
+        values = np.asarray(values, dtype=float)
+        rows, cols = values.shape
+        if rows == 0 or cols == 0:
+            return
+        self._setTiles(x0, y0, values)
+
+        # Keep the cached classification up to date
+        if self._free_mask is not None:
+            self._free_mask[y0:y0 + rows, x0:x0 + cols]     = (0 <= values) & (values <= self.cell_threshold)
+            self._occupied_mask[y0:y0 + rows, x0:x0 + cols] = (self.cell_threshold <= values) & (values <= 1)
+            self._neighbor_mask = None
+            self._pyramid       = None
+
+        if self._listeners:
+            ys, xs = np.mgrid[y0:y0 + rows, x0:x0 + cols]
+            self._notifyListeners(np.column_stack((xs.ravel(), ys.ravel())))
+
+    def _setTiles(self, x0, y0, values):
+        """
+        Method to write a dense block of cells into the tiles, allocating
+        tiles only where needed.
+        """
+        rows, cols = values.shape
+        size = self.tile_size
+        if rows == 0 or cols == 0:
+            return
+
+        for ty in range(y0 // size, (y0 + rows - 1) // size + 1):
+            for tx in range(x0 // size, (x0 + cols - 1) // size + 1):
+                cx0, cy0 = max(tx * size, x0), max(ty * size, y0)
+                cx1, cy1 = min((tx + 1) * size, x0 + cols), min((ty + 1) * size, y0 + rows)
+                block = values[cy0 - y0:cy1 - y0, cx0 - x0:cx1 - x0]
+
+                tile = self.tiles.get((tx, ty))
+                if tile is None:
+                    if np.all(block == self.default_value):
+                        continue
+                    tile = self.tiles[(tx, ty)] = np.full((size, size), self.default_value)
+                tile[cy0 - ty * size:cy1 - ty * size, cx0 - tx * size:cx1 - tx * size] = block
+
+    def nbytes(self):
+        """
+        Method to get the memory used by the allocated tiles.
+
+        Returns:
+            nbytes (int): The bytes of cell data.
+        """
+        return sum(tile.nbytes for tile in self.tiles.values())
+
+    def _cellValue(self, x, y):
+        """
+        Method to read one valid cell from its tile.
+        """
+        tile = self.tiles.get((x // self.tile_size, y // self.tile_size))
+        if tile is None:
+            return self.default_value
+        return tile[y % self.tile_size, x % self.tile_size]
+
+    def _buildCache(self):
+        """
+        Method to classify every cell of the grid map, one allocated tile at
+        a time so no dense copy of the cell values is made.
+        """
+        rows, cols = self.shape
+        size = self.tile_size
+        default = self.default_value
+        free     = np.full((rows, cols), 0 <= default <= self._cell_threshold)
+        occupied = np.full((rows, cols), self._cell_threshold <= default <= 1)
+
+        for (tx, ty), tile in self.tiles.items():
+            x0, y0 = tx * size, ty * size
+            block = tile[:max(min(size, rows - y0), 0), :max(min(size, cols - x0), 0)]
+            free[y0:y0 + size, x0:x0 + size]     = (0 <= block) & (block <= self._cell_threshold)
+            occupied[y0:y0 + size, x0:x0 + size] = (self._cell_threshold <= block) & (block <= 1)
+
+        self._free_mask     = free
+        self._occupied_mask = occupied
+        self._neighbor_mask = None
+        self._pyramid       = None
+
+    def _gridShape(self):
+        """
+        Method to get the (rows, cols) of the grid map.
+        """
+        return self.shape
+
+    def _prepareCellWrites(self):
+        """
+        Method to ready the cell data for _writeCells, tiles already are.
+        """
+        pass
+
+    def _resizeCells(self, x0, y0, x1, y1):
+        """
+        Method to grow the grid to the index region [x0, x1) x [y0, y1).
+
+        New cells are unknown (default_value) and need no tiles. When the
+        grid grows left or up by whole tiles only the tile points change,
+        otherwise every allocated tile is split up again at its new place.
+        """
+        old_tiles, self.tiles = self.tiles, {}
+        size = self.tile_size
+        if x0 % size == 0 and y0 % size == 0:
+            for (tx, ty), tile in old_tiles.items():
+                self.tiles[(tx - x0 // size, ty - y0 // size)] = tile
+        else:
+            for (tx, ty), tile in old_tiles.items():
+                self._setTiles(tx * size - x0, ty * size - y0, tile)
+        self.shape = (y1 - y0, x1 - x0)
+
+    def _writeCells(self, index_points, value):
+        """
+        Method to write one value into many valid cells, allocating tiles
+        only where needed.
+        """
+        size = self.tile_size
+        if len(index_points) == 0:
+            return
+
+        # Group the cells by tile
+        keys, inverse = np.unique(index_points // size, axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        order = np.argsort(inverse, kind="stable")
+        groups = np.split(index_points[order], np.cumsum(np.bincount(inverse))[:-1])
+
+        for key, cells in zip(map(tuple, keys.tolist()), groups):
+            tile = self.tiles.get(key)
+            if tile is None:
+                if value == self.default_value:
+                    continue
+                tile = self.tiles[key] = np.full((size, size), self.default_value)
+            tile[cells[:, 1] % size, cells[:, 0] % size] = value
+
+# ------------------------------------------------------------------------------
+# End of class TiledGridMap
+# ------------------------------------------------------------------------------
@@ -10,24 +10,25 @@
 import numpy as np
 import time
 
-from AStarOCC import astar
+from AStarOCC import astar, astar_turns
 from OccupancyGridMap import OccupancyGridMap
-from MapFileUnpacker import Unpacker
+from MapCache import MapCache
+from PlannerCache import PathCache
 from send_location import send_live_location
 from JetsonMotorInterface import *
 
 initPins()
 
-unpacker = Unpacker()
+cache = MapCache()
+path_cache = PathCache()
 occ_map = OccupancyGridMap()
 # map_file = '../data/map.msg'
 map_file = '../../ECELAB_V3_map.msg'
 
 # Steps
 
-# 1. Extract Keyframes
-unpacker.unpackMSGmap(map_file)
-keyframes = unpacker.extract_keyframe_data()
+# 1. Extract Keyframes (cached after the first run)
+keyframes, _ = cache.extractMapData(map_file)
 
 t = 1  # Set 1 if need rotation
 p = np.deg2rad(-10)  # Rotation value
@@ -41,12 +42,14 @@ if t == 1:
 # Remove z axis data
 keyframes = np.delete(keyframes, 2, 1)
 
-# 2. Generate OCC Map
-occ_map.fromMapMSGData(keyframes)
+# 2. Generate OCC Map (cached after the first run)
+cache.buildGrid(occ_map, keyframes)
 
 # 4. Find start on OCC
 # Ideal: To find current localized point in real time
 start = (0, 12)  # Col, Row (x, y)
+# Heading the robot faces at start (0, 90, 180 or 270 degrees), None if unknown
+start_angle = None
 
 
 # 5. Send OCC + start to android
@@ -60,7 +63,16 @@ def main(end=None):
         end = (6, 19)  # Col, Row (x,y)
 
     # 7. Run A* and save path
-    path = astar(occ_map, start, end)
+    if start_angle is None:
+        # The robot is set down facing the first step of the path
+        path = path_cache.plan(astar, occ_map, start, end, path_file='../data/path.csv')
+        poses = path
+    else:
+        # Weigh turns by how long they take on the robot, starting from its heading
+        path = path_cache.plan(astar_turns, occ_map, start, end, path_file='../data/path.csv',
+                               forward_cost=1.4, turn_cost=4.2, start_angle=start_angle)
+        # Turn in place from the start heading to the first step before moving
+        poses = [[start[0], start[1], start_angle]] + path
     print(path)
 
     # Visualize gridmap
@@ -79,20 +91,20 @@ def main(end=None):
     # 8. Follow A* path and send to android
     # Python File
     print('Starting')
-    for j in range(len(path) - 1):
+    for j in range(len(poses) - 1):
         # Explanation: These Y values and sleep values were measured in real time, Not needed if running with
         # localization, however, we are not using localization as OPEN-VSLAM is now a terminated program.
-        if path[j][1] <= 19 & path[j][1] >= 12:  # Check Y Value
+        if poses[j][1] <= 19 & poses[j][1] >= 12:  # Check Y Value
             sleep_time_forward = 1.4  # Change these values according to speed
             sleep_time_turn = 4.2  # Change these values according to speed
             print('Going Speed 1')
-        elif path[j][1] >= 0 & path[j][1] < 12:  # Check Y Value
+        elif poses[j][1] >= 0 & poses[j][1] < 12:  # Check Y Value
             sleep_time_forward = 2.44  # Change these values according to speed
             sleep_time_turn = 4.2  # Change these values according to speed
             print('Going Speed 2')
 
-        pos1 = path[j]
-        pos2 = path[j + 1]
+        pos1 = poses[j]
+        pos2 = poses[j + 1]
         print(j, pos1, pos2)
         # send_live_location(pos2)
         # Move Forward
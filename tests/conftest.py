@@ -0,0 +1,32 @@
+# ------------------------------------------------------------------------------
+# Name         : conftest.py
+# Date Created : 10/18/2026
+# Author(s)    : Micheal Caracciolo, Chris Lloyd, Owen Casciotti
+# Github Link  : https://github.com/michealcarac/VSLAM-Mapping
+# Description  : Puts the source directories on the path for the tests.
+# ------------------------------------------------------------------------------
+
+import importlib.util
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.join(ROOT, "src", "RL"))
+
+
+def load_module(name, path):
+    """
+    Imports a source file under the given module name.
+    """
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+# Both directories have a Benchmarks.py holding the reference implementations
+# the tests compare against, so they are imported under distinct names
+load_module("MapBenchmarks", os.path.join(ROOT, "src", "Benchmarks.py"))
+load_module("EnvironmentBenchmarks", os.path.join(ROOT, "src", "RL", "Benchmarks.py"))
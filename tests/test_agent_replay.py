@@ -0,0 +1,51 @@
+# ------------------------------------------------------------------------------
+# Name         : test_agent_replay.py
+# Date Created : 10/18/2026
+# Author(s)    : Micheal Caracciolo, Chris Lloyd, Owen Casciotti
+# Github Link  : https://github.com/michealcarac/VSLAM-Mapping
+# Description  : Tests for training the DQAgent from a replay buffer.
+# ------------------------------------------------------------------------------
+
+import numpy as np
+import pytest
+
+pytest.importorskip("tensorflow")
+
+from keras.optimizers import Adam
+
+from AgentClass import DQAgent
+from EnvironmentClasses import Base
+from ReplayBuffer import PrioritizedReplayBuffer
+
+FOV = list(range(-45, 45, 15))
+PATH = [(50, 50 + 10 * i, 90) for i in range(1, 5)]
+
+
+def make_agent(q_head):
+    return DQAgent(2, FOV, (50, 50, 90), Base(width=100, height=100), PATH, q_head=q_head)
+
+
+def fill_buffer(size=64, seed=0):
+    rng = np.random.RandomState(seed)
+    buffer = PrioritizedReplayBuffer(size, len(FOV) + 6, rng=rng)
+    observations = rng.rand(size, len(FOV) + 6) * 100
+    # Rewards well outside of 0 - 1, like the +-50 of DQAgent.get_reward
+    buffer.add_batch(observations, rng.randint(0, 3, size), rng.uniform(-50, 50, size),
+                     np.roll(observations, 1, axis=0), rng.rand(size) < 0.1)
+    return buffer
+
+
+def test_replay_update_uses_linear_head():
+    agent = make_agent("linear")
+    assert agent.model.layers[-1].get_config()["activation"] == "linear"
+    buffer = fill_buffer()
+
+    loss = agent.replay_update(buffer, 16, Adam(0.001))
+    assert np.isfinite(loss)
+    # The TD errors of the sampled transitions became their priorities
+    assert buffer.max_priority > 1
+
+
+def test_replay_update_rejects_softmax_head():
+    with pytest.raises(ValueError, match="linear"):
+        make_agent("softmax").replay_update(fill_buffer(), 16, Adam(0.001))
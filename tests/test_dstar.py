@@ -0,0 +1,47 @@
+# ------------------------------------------------------------------------------
+# Name         : test_dstar.py
+# Date Created : 10/18/2026
+# Author(s)    : Micheal Caracciolo, Chris Lloyd, Owen Casciotti
+# Github Link  : https://github.com/michealcarac/VSLAM-Mapping
+# Description  : Tests for the D* Lite incremental planner.
+# ------------------------------------------------------------------------------
+
+import numpy as np
+
+from AStarOCC import astar_cells
+from DStarLite import DStarLite
+from OccupancyGridMap import OccupancyGridMap
+
+
+def test_dstar_matches_astar_while_map_changes():
+    # Paths stay as short as astar_cells paths while the robot moves and random cells change
+    rng = np.random.default_rng(0)
+    plans = 0
+    for trial in range(500):
+        rows, cols = rng.integers(2, 25, size=2)
+        grid_map = np.where(rng.random((rows, cols)) < rng.uniform(0, 0.4), 0.9, 0.1)
+        ogm = OccupancyGridMap(grid_map)
+        free_cells = np.argwhere(ogm.free_mask())
+        if len(free_cells) < 2:
+            continue
+        start = tuple(int(v) for v in free_cells[rng.integers(len(free_cells))][::-1])
+        goal = tuple(int(v) for v in free_cells[rng.integers(len(free_cells))][::-1])
+
+        planner = DStarLite(ogm, start, goal)
+        for step in range(10):
+            path = planner.plan()
+            expected = astar_cells(ogm.free_mask(), planner.start, goal)
+            assert (path is None) == (expected is None), f"Mismatch on trial {trial}, step {step}"
+            if path is None:
+                break
+            assert len(path) == len(expected), f"Longer path on trial {trial}, step {step}"
+            plans += 1
+
+            # Drive part of the way, then change cells other than the robot's
+            planner.moveTo(path[min(len(path) - 1, int(rng.integers(0, 4)))][:2])
+            for _ in range(rng.integers(1, 4)):
+                x, y = int(rng.integers(cols)), int(rng.integers(rows))
+                if (x, y) != planner.start:
+                    ogm.setDataIndex((x, y), 0.9 if rng.random() < 0.6 else 0.1)
+        planner.close()
+    assert plans > 1000
@@ -0,0 +1,94 @@
+# ------------------------------------------------------------------------------
+# Name         : test_map_cache.py
+# Date Created : 10/18/2026
+# Author(s)    : Micheal Caracciolo, Chris Lloyd, Owen Casciotti
+# Github Link  : https://github.com/michealcarac/VSLAM-Mapping
+# Description  : Tests for the on-disk map cache.
+# ------------------------------------------------------------------------------
+
+import os
+
+import numpy as np
+import pytest
+
+from MapBenchmarks import write_map_file
+from MapCache import MapCache
+from OccupancyGridMap import OccupancyGridMap
+
+
+def make_keyframes(seed=0):
+    rng = np.random.default_rng(seed)
+    return np.cumsum(rng.normal(scale=0.05, size=(40, 2)), axis=0)
+
+
+def test_grid_hit_restores_stats_and_hits(tmp_path):
+    cache = MapCache(str(tmp_path))
+    keyframes = make_keyframes()
+    built = cache.buildGrid(OccupancyGridMap(), keyframes, count_hits=True)
+    loaded = cache.buildGrid(OccupancyGridMap(), keyframes, count_hits=True)
+
+    assert np.array_equal(loaded.grid_map, built.grid_map)
+    assert loaded.cell_size == built.cell_size
+    assert loaded.scale_search_stats == built.scale_search_stats
+    assert np.array_equal(loaded.hit_counts, built.hit_counts)
+
+
+@pytest.mark.parametrize("contents", [b"", b"not a zip file", b"PK\x03\x04truncated"])
+def test_corrupt_entry_is_rebuilt(tmp_path, contents):
+    cache = MapCache(str(tmp_path))
+    keyframes = make_keyframes()
+    expected = cache.buildGrid(OccupancyGridMap(), keyframes).grid_map
+
+    (path, _, _), = cache._entries()
+    with open(path, "wb") as fd:
+        fd.write(contents)
+    assert np.array_equal(cache.buildGrid(OccupancyGridMap(), keyframes).grid_map, expected)
+
+
+def test_entry_missing_arrays_is_rebuilt(tmp_path):
+    cache = MapCache(str(tmp_path))
+    keyframes = make_keyframes()
+    expected = cache.buildGrid(OccupancyGridMap(), keyframes).grid_map
+
+    (path, _, _), = cache._entries()
+    with open(path, "wb") as fd:
+        np.savez(fd, grid_map=expected)
+    assert np.array_equal(cache.buildGrid(OccupancyGridMap(), keyframes).grid_map, expected)
+
+
+def test_temp_files_are_not_entries(tmp_path):
+    cache = MapCache(str(tmp_path))
+    cache.buildGrid(OccupancyGridMap(), make_keyframes())
+    (path, _, _), = cache._entries()
+    assert sorted(os.listdir(tmp_path)) == [os.path.basename(path)]
+
+    # A write interrupted before the rename
+    with open(path + ".tmp", "wb") as fd:
+        fd.write(b"partial")
+    assert [entry[0] for entry in cache._entries()] == [path]
+
+
+def test_changed_map_replaces_its_entry(tmp_path, monkeypatch):
+    cache = MapCache(str(tmp_path / "cache"))
+    map_file, other_file = str(tmp_path / "map.msg"), str(tmp_path / "other.msg")
+    write_map_file(map_file, 5, 20, num_keypoints=10, seed=0)
+    write_map_file(other_file, 5, 20, num_keypoints=10, seed=1)
+    cache.extractMapData(map_file)
+    cache.extractMapData(other_file)
+    cache.buildGrid(OccupancyGridMap(), make_keyframes())
+    before = {entry[0] for entry in cache._entries()}
+
+    # The old entry is found without opening any entry
+    write_map_file(map_file, 5, 20, num_keypoints=10, seed=2)
+    def load(*args, **kwargs):
+        raise AssertionError("np.load called while storing")
+    monkeypatch.setattr(np, "load", load)
+    keyframes, _ = cache.extractMapData(map_file)
+    monkeypatch.undo()
+
+    after = {entry[0] for entry in cache._entries()}
+    assert len(before) == len(after) == 3
+    (removed,), (added,) = before - after, after - before
+    assert os.path.basename(removed).startswith(cache._sourcePrefix("map", map_file))
+    assert os.path.basename(added).startswith(cache._sourcePrefix("map", map_file))
+    assert np.array_equal(cache.extractMapData(map_file)[0], keyframes)
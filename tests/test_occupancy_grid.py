@@ -0,0 +1,365 @@
+# ------------------------------------------------------------------------------
+# Name         : test_occupancy_grid.py
+# Date Created : 10/18/2026
+# Author(s)    : Micheal Caracciolo, Chris Lloyd, Owen Casciotti
+# Github Link  : https://github.com/michealcarac/VSLAM-Mapping
+# Description  : Tests for building and validating occupancy grid maps.
+# ------------------------------------------------------------------------------
+
+import struct
+import tracemalloc
+
+import msgpack
+
+import numpy as np
+import pytest
+
+from MapBenchmarks import is_map_valid_loop, make_keyframe_walk, rasterize_loop
+from MapFileUnpacker import Unpacker
+from OccupancyGridMap import (CELL_INVALID, CELL_OCCUPIED, CELL_UNKNOWN, CELL_UNOCCUPIED,
+                              NEIGHBOR_OFFSETS, OccupancyGridMap)
+from TiledGridMap import TiledGridMap
+
+
+def unpack_map(tmp_path, num_keyframes=20, num_landmarks=60, seed=0):
+    """
+    Writes a synthetic .msg map and unpacks it the way the mapping scripts do.
+    Every keyframe observes a random half of the landmarks.
+
+    Returns:
+        keyframes, landmarks, observations: The extract_* outputs, unchanged.
+    """
+    rng = np.random.default_rng(seed)
+    quats = rng.normal(size=(num_keyframes, 4))
+    quats /= np.linalg.norm(quats, axis=1, keepdims=True)
+    trans = rng.normal(scale=5, size=(num_keyframes, 3))
+    positions = rng.normal(scale=5, size=(num_landmarks, 3))
+    data = {
+        'keyframes': {str(i): {'rot_cw': quats[i].tolist(), 'trans_cw': trans[i].tolist(),
+                               'lm_ids': rng.permutation(num_landmarks)[:num_landmarks // 2].tolist()}
+                      for i in range(num_keyframes)},
+        'landmarks': {str(i): {'pos_w': positions[i].tolist()} for i in range(num_landmarks)},
+    }
+    map_file = str(tmp_path / "map.msg")
+    with open(map_file, "wb") as msg_pack_file:
+        msg_pack_file.write(msgpack.packb(data))
+
+    unpack = Unpacker()
+    unpack.unpackMSGmap(map_file)
+    keyframes = unpack.extract_keyframe_data()
+    landmarks = unpack.extract_landmark_data()
+    observations = unpack.extract_observation_data()
+    return keyframes, landmarks, observations
+
+
+def test_landmark_rays_take_unpacker_output(tmp_path):
+    keyframes, landmarks, observations = unpack_map(tmp_path)
+    assert keyframes.shape[1] == 3 and landmarks.shape[1] == 3
+    assert len(observations)
+
+    ogm = OccupancyGridMap()
+    ogm.fromLandmarkRays(keyframes, landmarks, observations, cell_size=0.5)
+    expected = OccupancyGridMap()
+    expected.fromLandmarkRays(keyframes[:, :2], landmarks[:, :2], observations, cell_size=0.5)
+
+    assert np.array_equal(ogm.grid_map, expected.grid_map)
+    assert np.array_equal(ogm.log_odds, expected.log_odds)
+    assert ogm.trans_pt == expected.trans_pt
+
+
+def test_append_keyframes_takes_unpacker_output(tmp_path):
+    keyframes, landmarks, _ = unpack_map(tmp_path)
+    grids = []
+    for kfs, lms in ((keyframes, landmarks), (keyframes[:, :2], landmarks[:, :2])):
+        ogm = OccupancyGridMap()
+        ogm._buildGridAtScale(kfs[:10, :2], 0.5, np.empty((10, 2)))
+        valid = ogm.appendKeyframes(kfs[10:], lms)
+        grids.append((valid, ogm.grid_map.copy(), ogm.trans_pt))
+
+    (valid, grid, trans_pt), (expected_valid, expected_grid, expected_trans_pt) = grids
+    assert valid == expected_valid
+    assert np.array_equal(grid, expected_grid)
+    assert trans_pt == expected_trans_pt
+
+
+@pytest.mark.parametrize("tile_size", [4, 7])
+def test_tiled_append_keyframes_matches_dense(tile_size):
+    rng = np.random.default_rng(tile_size)
+    walk = np.cumsum(rng.normal(scale=0.5, size=(200, 2)), axis=0)
+    # Start from the middle of the walk so the grid grows on every side
+    walk = np.concatenate([walk[100:150], walk[:100], walk[150:]])
+    landmarks = walk + rng.normal(scale=2, size=walk.shape)
+
+    dense = OccupancyGridMap()
+    dense._buildGridAtScale(walk[:50], 0.5, np.empty((50, 2)))
+    tiled = TiledGridMap(dense.grid_map.copy(), _cell_size=dense.cell_size,
+                         _trans_pt=dense.trans_pt, _tile_size=tile_size)
+    for first in range(50, 200, 25):
+        batch = slice(first, first + 25)
+        expected = dense.appendKeyframes(walk[batch], landmarks[batch], return_violations=True)
+        valid, violations = tiled.appendKeyframes(walk[batch], landmarks[batch], return_violations=True)
+        assert valid == expected[0]
+        assert np.array_equal(violations, expected[1])
+        assert np.array_equal(tiled.grid_map, dense.grid_map)
+        assert tiled.trans_pt == dense.trans_pt
+    assert np.array_equal(tiled.free_mask(), dense.free_mask())
+    assert tiled.isMapValid() == dense.isMapValid()
+
+
+@pytest.mark.parametrize("threshold", [0.5, 0.7])
+def test_tiled_masks_match_dense(threshold):
+    rng = np.random.default_rng(0)
+    grid = np.full((45, 70), 0.6)
+    grid[5:20, 10:60] = rng.choice([0.0, 0.3, 1.0], size=(15, 50))
+    dense = OccupancyGridMap(grid, threshold)
+    tiled = TiledGridMap(grid, threshold, _tile_size=16)
+    assert np.array_equal(tiled.free_mask(), dense.free_mask())
+    assert np.array_equal(tiled.occupied_mask(), dense.occupied_mask())
+
+
+def test_tiled_masks_skip_dense_copy():
+    tiled = TiledGridMap(_shape=(2048, 2048))
+    tiled.setRegion(1000, 1000, np.zeros((10, 10)))
+    tracemalloc.start()
+    tiled.free_mask()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    # The two masks take one byte per cell, a float copy would take eight
+    assert peak < 3 * 2048 * 2048
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_rasterize_matches_loop(seed):
+    rng = np.random.default_rng(seed)
+    # Scattered points, an offset walk, and points on cell edges that fall off the grid
+    keyframe_sets = [rng.normal(scale=3, size=(rng.integers(1, 500), 2)),
+                     make_keyframe_walk(int(rng.integers(50, 2000)), seed=seed) + rng.uniform(-5, 5, size=2),
+                     rng.integers(0, 20, size=(100, 2)) * 0.5]
+    for keyframes in keyframe_sets:
+        for scale in (0.1, 0.25, 0.5):
+            expected = OccupancyGridMap()
+            rasterize_loop(expected, keyframes, scale)
+            ogm = OccupancyGridMap()
+            ogm._buildGridAtScale(keyframes, scale, np.empty_like(keyframes))
+            assert np.array_equal(ogm.grid_map, expected.grid_map), f"Mismatch at scale {scale}"
+
+
+def test_tiled_grid_map_is_read_only():
+    tiled = TiledGridMap(_shape=(300, 200), _tile_size=16)
+    tiled.setDataIndex((150, 250), 0.0)
+    tracemalloc.start()
+    assert tiled.getMaxPoint() == (200, 300)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert peak < 300 * 200
+
+    # Writes into the dense copy would be lost, so they fail
+    with pytest.raises(ValueError, match="read-only"):
+        tiled.grid_map[10][20] = 0.0
+    tiled.setRegion(20, 10, np.zeros((1, 1)))
+    assert tiled.grid_map[10, 20] == 0.0 and tiled.grid_map[250, 150] == 0.0
+
+
+def expected_masks(grid_map, threshold):
+    """
+    Classifies every cell on its own, the (free, occupied) masks indexed [y, x].
+    """
+    free = np.array([[0 <= value <= threshold for value in row] for row in grid_map], dtype=bool)
+    occupied = np.array([[threshold <= value <= 1 for value in row] for row in grid_map], dtype=bool)
+    return free, occupied
+
+
+def random_cells(rows, cols, seed=0):
+    # Unoccupied, occupied, unknown and out of range values, and cells at the threshold
+    return np.random.default_rng(seed).choice([-0.5, 0.0, 0.2, 0.5, 0.6, 0.7, 1.0, 1.5], size=(rows, cols))
+
+
+@pytest.mark.parametrize("backend", [OccupancyGridMap, TiledGridMap])
+@pytest.mark.parametrize("threshold", [0.5, 0.7])
+def test_classify_and_masks_match_cells(backend, threshold):
+    rows, cols = 13, 19
+    grid_map = random_cells(rows, cols)
+    ogm = backend(grid_map, threshold)
+    free, occupied = expected_masks(grid_map, threshold)
+
+    assert np.array_equal(ogm.free_mask(), free)
+    assert np.array_equal(ogm.occupied_mask(), occupied)
+    assert np.array_equal(ogm.unknown_mask(), ~free & ~occupied)
+
+    points = [(x, y) for y in range(-1, rows + 1) for x in range(-1, cols + 1)]
+    classes = ogm.classify(points)
+    for (x, y), cell_class in zip(points, classes):
+        if not (0 <= x < cols and 0 <= y < rows):
+            assert cell_class == CELL_INVALID
+            assert ogm.neighbors_free((x, y)) == -1
+            continue
+        # Cells at the threshold are both, and classified as unoccupied
+        expected = (CELL_UNOCCUPIED if free[y, x] else CELL_OCCUPIED if occupied[y, x] else CELL_UNKNOWN)
+        assert cell_class == expected
+        assert ogm.isUnknownIndex((x, y)) == (expected == CELL_UNKNOWN)
+
+        bits = sum(1 << bit for bit, (dx, dy) in enumerate(NEIGHBOR_OFFSETS)
+                   if 0 <= x + dx < cols and 0 <= y + dy < rows and free[y + dy, x + dx])
+        assert ogm.neighbor_mask()[y, x] == bits
+        assert ogm.neighbors_free((x, y)) == bits
+
+
+def assert_cache_matches(ogm, grid_map, threshold):
+    free, occupied = expected_masks(grid_map, threshold)
+    assert np.array_equal(ogm.free_mask(), free)
+    assert np.array_equal(ogm.occupied_mask(), occupied)
+    # A new map builds its neighbor masks and pyramid from scratch
+    expected = OccupancyGridMap(grid_map.copy(), threshold)
+    assert np.array_equal(ogm.neighbor_mask(), expected.neighbor_mask())
+    for got, want in zip(ogm.buildPyramid(3), expected.buildPyramid(3)):
+        assert np.array_equal(got, want)
+
+
+@pytest.mark.parametrize("backend", [OccupancyGridMap, TiledGridMap])
+def test_cached_masks_follow_changes(backend):
+    grid_map = random_cells(12, 10, seed=1)
+    ogm = backend(grid_map.copy())
+    assert_cache_matches(ogm, grid_map, 0.5)
+
+    # Assigning a new grid map
+    grid_map = random_cells(9, 14, seed=2)
+    ogm.grid_map = grid_map.copy()
+    assert_cache_matches(ogm, grid_map, 0.5)
+
+    # Changing the threshold
+    ogm.cell_threshold = 0.7
+    assert_cache_matches(ogm, grid_map, 0.7)
+
+    # Setting cells in place, to every kind of value
+    for x, y, value in ((0, 0, 0.0), (5, 4, 1.0), (13, 8, 0.6), (6, 4, 0.7), (7, 2, -0.5)):
+        ogm.setDataIndex((x, y), value)
+        grid_map[y, x] = value
+        assert_cache_matches(ogm, grid_map, 0.7)
+
+
+def test_scale_searches_share_lattice():
+    rng = np.random.default_rng(1)
+    keyframes = np.cumsum(rng.normal(scale=0.05, size=(300, 2)), axis=0)
+    linear = OccupancyGridMap()
+    linear.fromMapMSGData(keyframes, scale_search="linear")
+    bisect = OccupancyGridMap()
+    bisect.fromMapMSGData(keyframes, scale_search="bisect")
+
+    # Both searches build candidates at exactly steps * 0.01
+    assert linear.cell_size == linear.scale_search_stats["candidates"] * 0.01
+    steps = round(bisect.cell_size / 0.01)
+    assert bisect.cell_size == steps * 0.01
+    check = OccupancyGridMap()
+    check._buildGridAtScale(keyframes, steps * 0.01, np.empty_like(keyframes))
+    assert np.array_equal(check.grid_map, bisect.grid_map)
+
+
+def test_scale_search_error_saves_stats():
+    ogm = OccupancyGridMap()
+    ogm.fromMapMSGData(np.zeros((2, 2)), scale_search="unknown")
+    assert ogm.scale_search_stats["mode"] == "unknown"
+    assert ogm.scale_search_stats["candidates"] == 0
+
+
+def test_map_valid_matches_loop():
+    # Grids of random shape and density cover both valid and invalid maps
+    rng = np.random.default_rng(0)
+    counts = {True: 0, False: 0}
+    for trial in range(2000):
+        rows, cols = rng.integers(1, 16, size=2)
+        grid_map = np.where(rng.random((rows, cols)) < rng.uniform(0, 1), 0.6, 0.0)
+        ogm = OccupancyGridMap(grid_map)
+
+        valid, violations = ogm.isMapValid(return_violations=True)
+        assert valid == is_map_valid_loop(ogm), f"Mismatch on trial {trial}:\n{grid_map}"
+        assert valid == (len(violations) == 0)
+        assert all(ogm.isUnoccupiedIndex(tuple(pt)) for pt in violations)
+        counts[valid] += 1
+    assert counts[True] and counts[False]
+
+
+def make_grid_file(tmp_path, grid_map):
+    ogm = OccupancyGridMap(grid_map, 0.55)
+    ogm.cell_size = 0.07
+    ogm.trans_pt = (-3.5, 1.25)
+    grid_file = str(tmp_path / "map.grid")
+    ogm.saveGrid(grid_file)
+    return ogm, grid_file
+
+
+@pytest.mark.parametrize("grid_map", [np.random.default_rng(0).random((37, 53)),
+                                      np.random.default_rng(1).random((1, 9)).astype(np.float32),
+                                      np.empty((0, 0))])
+def test_grid_file_round_trip(tmp_path, grid_map):
+    ogm, grid_file = make_grid_file(tmp_path, grid_map)
+    loaded = OccupancyGridMap()
+    loaded.loadGrid(grid_file)
+
+    assert loaded.grid_map.dtype == grid_map.dtype
+    assert np.array_equal(loaded.grid_map, ogm.grid_map)
+    assert loaded.cell_threshold == ogm.cell_threshold
+    assert loaded.cell_size == ogm.cell_size
+    assert loaded.trans_pt == ogm.trans_pt
+
+
+@pytest.mark.parametrize("offset, value, match", [(0, b"NOPE", "not a version"),
+                                                  (4, struct.pack("<H", 99), "not a version")])
+def test_grid_file_bad_header_is_rejected(tmp_path, offset, value, match):
+    _, grid_file = make_grid_file(tmp_path, np.zeros((4, 4)))
+    with open(grid_file, "r+b") as fd:
+        fd.seek(offset)
+        fd.write(value)
+    with pytest.raises(ValueError, match=match):
+        OccupancyGridMap().loadGrid(grid_file)
+
+
+@pytest.mark.parametrize("keep", [0, 10, -1])
+def test_truncated_grid_file_is_rejected(tmp_path, keep):
+    # An empty file, a partial header, and a file missing its last data byte
+    _, grid_file = make_grid_file(tmp_path, np.zeros((4, 4)))
+    with open(grid_file, "rb") as fd:
+        contents = fd.read()
+    with open(grid_file, "wb") as fd:
+        fd.write(contents[:keep])
+    with pytest.raises(ValueError, match="grid file"):
+        OccupancyGridMap().loadGrid(grid_file)
+
+
+def test_grid_file_copy_on_write(tmp_path):
+    _, grid_file = make_grid_file(tmp_path, np.full((6, 8), 0.6))
+    with open(grid_file, "rb") as fd:
+        contents = fd.read()
+
+    loaded = OccupancyGridMap()
+    loaded.loadGrid(grid_file)
+    loaded.setDataIndex((3, 2), 0.0)
+    assert loaded.getDataIndex((3, 2)) == 0.0
+    del loaded
+    with open(grid_file, "rb") as fd:
+        assert fd.read() == contents
+
+    # r+ writes the change back to the file
+    loaded = OccupancyGridMap()
+    loaded.loadGrid(grid_file, mode="r+")
+    loaded.setDataIndex((3, 2), 0.0)
+    loaded.grid_map.flush()
+    reloaded = OccupancyGridMap()
+    reloaded.loadGrid(grid_file)
+    assert reloaded.getDataIndex((3, 2)) == 0.0
+
+
+def test_cell_queries_skip_classifying_grid_file(tmp_path):
+    grid_map = np.random.default_rng(2).choice([0.0, 0.3, 0.5, 0.6, 1.0], size=(20, 30))
+    _, grid_file = make_grid_file(tmp_path, grid_map)
+    loaded = OccupancyGridMap()
+    loaded.loadGrid(grid_file)
+
+    cells = [(x, y) for y in range(20) for x in range(30)]
+    occupied = [loaded.isOccupiedIndex(cell) for cell in cells]
+    unoccupied = [loaded.isUnoccupiedIndex(cell) for cell in cells]
+    assert loaded._occupied_mask is None and loaded._free_mask is None
+
+    # The single cell reads agree with the cached masks
+    assert occupied == loaded.occupied_mask().ravel().tolist()
+    assert unoccupied == loaded.free_mask().ravel().tolist()
+    assert occupied == [loaded.isOccupiedIndex(cell) for cell in cells]
@@ -0,0 +1,85 @@
+# ------------------------------------------------------------------------------
+# Name         : test_planner_cache.py
+# Date Created : 10/18/2026
+# Author(s)    : Micheal Caracciolo, Chris Lloyd, Owen Casciotti
+# Github Link  : https://github.com/michealcarac/VSLAM-Mapping
+# Description  : Tests for the in-memory path planning caches.
+# ------------------------------------------------------------------------------
+
+import gc
+
+import numpy as np
+import pytest
+
+from AStarOCC import astar_array, astar_cells, astar_turns
+from OccupancyGridMap import OccupancyGridMap
+from PlannerCache import DistanceFieldCache, PathCache
+
+
+def make_map(wall):
+    """
+    Builds a 20x20 open map, optionally with a wall down column 10 that
+    leaves a gap in the last row. Both kinds end at the same version.
+    """
+    ogm = OccupancyGridMap(np.zeros((20, 20)))
+    if wall:
+        grid = ogm.grid_map.copy()
+        grid[:19, 10] = 1.0
+        ogm.grid_map = grid
+    else:
+        ogm.setDataIndex((0, 0), 0.0)
+    ogm.setDataIndex((0, 1), 0.0)
+    return ogm
+
+
+def test_field_cache_separates_maps():
+    cache = DistanceFieldCache()
+    versions = set()
+    for i in range(40):
+        wall = i % 3 == 0
+        # Free the previous map so its id() can be handed to a new one
+        gc.collect()
+        ogm = make_map(wall)
+        path = cache.path(ogm, (0, 0), (19, 0))
+        expected = astar_cells(ogm.free_mask(), (0, 0), (19, 0))
+        assert len(path) == len(expected)
+        versions.add(ogm.version)
+        del ogm
+    assert len(versions) == 1
+
+
+def test_field_cache_drops_stale_fields():
+    cache = DistanceFieldCache()
+    ogm = make_map(False)
+    cache.path(ogm, (0, 0), (19, 0))
+    ogm.setDataIndex((5, 0), 1.0)
+    path = cache.path(ogm, (0, 0), (19, 0))
+    assert [5, 0] not in [point[:2] for point in path]
+    assert len(cache._fields) == 1
+
+
+def test_path_cache_separates_maps():
+    cache = PathCache()
+    for i in range(40):
+        wall = i % 3 == 0
+        gc.collect()
+        ogm = make_map(wall)
+        path = cache.plan(astar_array, ogm, (0, 0), (19, 0))
+        assert len(path) == len(astar_cells(ogm.free_mask(), (0, 0), (19, 0)))
+        del ogm
+
+
+def test_path_cache_forwards_stats():
+    cache = PathCache()
+    ogm = make_map(True)
+    stats = {}
+    path = cache.plan(astar_turns, ogm, (0, 0), (19, 0), stats=stats)
+    assert stats["expansions"] > 0
+    assert cache.plan(astar_turns, ogm, (0, 0), (19, 0), stats={}) == path
+    assert cache.hits == 1
+
+
+def test_path_cache_rejects_unhashable_options():
+    cache = PathCache()
+    with pytest.raises(TypeError, match="start_angle"):
+        cache.plan(astar_turns, make_map(False), (0, 0), (19, 0), start_angle=[0])
@@ -0,0 +1,271 @@
+# ------------------------------------------------------------------------------
+# Name         : test_planners.py
+# Date Created : 10/18/2026
+# Author(s)    : Micheal Caracciolo, Chris Lloyd, Owen Casciotti
+# Github Link  : https://github.com/michealcarac/VSLAM-Mapping
+# Description  : Fuzz tests of the grid planners against plain Dijkstra searches.
+# ------------------------------------------------------------------------------
+
+import heapq
+
+import numpy as np
+import pytest
+
+from AStarOCC import (astar, astar_array, astar_cells, astar_hierarchical, bidirectional_cells, descend_field,
+                      distance_field, heading_cells, jps_cells)
+from OccupancyGridMap import OccupancyGridMap
+
+SQRT2 = 2 ** 0.5
+
+# Headings 0, 1, 2, 3 face +x, +y, -x, -y like heading_cells
+HEADINGS = ((1, 0), (0, 1), (-1, 0), (0, -1))
+
+
+def random_problems(trials, seed=0, max_size=20):
+    """
+    Yields random free masks with a start and end free cell, (mask, start, end).
+    """
+    rng = np.random.default_rng(seed)
+    for trial in range(trials):
+        rows, cols = rng.integers(1, max_size, size=2)
+        free = rng.random((rows, cols)) >= rng.uniform(0, 0.5)
+        free_cells = np.argwhere(free)
+        if len(free_cells) == 0:
+            continue
+        start = tuple(int(v) for v in free_cells[rng.integers(len(free_cells))][::-1])
+        end = tuple(int(v) for v in free_cells[rng.integers(len(free_cells))][::-1])
+        yield free, start, end
+
+
+def free_map(free):
+    """
+    An OccupancyGridMap with the free cells unoccupied and the rest occupied.
+    """
+    return OccupancyGridMap(np.where(free, 0.0, 1.0))
+
+
+def cell_moves(free, x, y, diagonal):
+    """
+    Yields the cells reachable in one step from (x, y) and the step cost.
+    Diagonal steps need both cells they pass between to be free.
+    """
+    rows, cols = free.shape
+    for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+        if 0 <= x + dx < cols and 0 <= y + dy < rows and free[y + dy, x + dx]:
+            yield (x + dx, y + dy), 1.0
+    if diagonal:
+        for dx, dy in ((1, 1), (1, -1), (-1, 1), (-1, -1)):
+            if (0 <= x + dx < cols and 0 <= y + dy < rows and free[y + dy, x + dx] and
+                    free[y, x + dx] and free[y + dy, x]):
+                yield (x + dx, y + dy), SQRT2
+
+
+def dijkstra_cost(free, start, end, diagonal=False):
+    """
+    The cost of the cheapest path between two cells, or None if there is none.
+    """
+    costs = {start: 0.0}
+    open_list = [(0.0, start)]
+    while open_list:
+        cost, cell = heapq.heappop(open_list)
+        if cell == end:
+            return cost
+        if cost > costs[cell]:
+            continue
+        for child, step in cell_moves(free, cell[0], cell[1], diagonal):
+            if cost + step < costs.get(child, np.inf):
+                costs[child] = cost + step
+                heapq.heappush(open_list, (cost + step, child))
+    return None
+
+
+def path_cost(free, cells, start, end, diagonal=False):
+    """
+    Checks that cells is a path of free cells from start to end and returns its cost.
+    """
+    assert cells[0] == start and cells[-1] == end
+    cost = 0.0
+    for (x, y), child in zip(cells, cells[1:]):
+        steps = dict(cell_moves(free, x, y, diagonal))
+        assert child in steps, f"Invalid step from {(x, y)} to {child}"
+        cost += steps[child]
+    return cost
+
+
+@pytest.mark.parametrize("diagonal", [False, True])
+def test_jps_matches_dijkstra(diagonal):
+    for free, start, end in random_problems(1500, seed=int(diagonal)):
+        expected = dijkstra_cost(free, start, end, diagonal)
+        cells = jps_cells(free, start, end, diagonal)
+        assert (cells is None) == (expected is None), f"Mismatch from {start} to {end}:\n{free.astype(int)}"
+        if cells is not None:
+            assert np.isclose(path_cost(free, cells, start, end, diagonal), expected), \
+                f"Longer path from {start} to {end}:\n{free.astype(int)}"
+
+
+def heading_dijkstra_cost(free, start, end, forward_cost, turn_cost, start_heading=None):
+    """
+    The cost of the cheapest drive between two cells over (cell, heading)
+    states, or None if there is none.
+    """
+    rows, cols = free.shape
+    headings = range(4) if start_heading is None else (start_heading,)
+    costs = {(start, heading): 0.0 for heading in headings}
+    open_list = [(0.0, start, heading) for heading in headings]
+    while open_list:
+        cost, cell, heading = heapq.heappop(open_list)
+        if cell == end:
+            return cost
+        if cost > costs[(cell, heading)]:
+            continue
+        moves = [(cell, (heading + 1) % 4, turn_cost), (cell, (heading - 1) % 4, turn_cost)]
+        x, y = cell[0] + HEADINGS[heading][0], cell[1] + HEADINGS[heading][1]
+        if 0 <= x < cols and 0 <= y < rows and free[y, x]:
+            moves.append(((x, y), heading, forward_cost))
+        for child, child_heading, step in moves:
+            if cost + step < costs.get((child, child_heading), np.inf):
+                costs[(child, child_heading)] = cost + step
+                heapq.heappush(open_list, (cost + step, child, child_heading))
+    return None
+
+
+def drive_cost(free, cells, start, end, forward_cost, turn_cost, start_heading=None):
+    """
+    Checks that cells is a 4-connected path of free cells from start to end
+    and returns the cost of driving it, turning the short way at every corner.
+    """
+    path_cost(free, cells, start, end)
+    cost = 0.0
+    heading = start_heading
+    for (x, y), (nx, ny) in zip(cells, cells[1:]):
+        step_heading = HEADINGS.index((nx - x, ny - y))
+        if heading is not None:
+            cost += min((step_heading - heading) % 4, (heading - step_heading) % 4) * turn_cost
+        cost += forward_cost
+        heading = step_heading
+    return cost
+
+
+def test_heading_cells_matches_dijkstra():
+    rng = np.random.default_rng(2)
+    for free, start, end in random_problems(800, seed=2, max_size=14):
+        forward_cost, turn_cost = rng.uniform(0.5, 3, size=2)
+        start_angle = None if rng.random() < 0.5 else int(rng.integers(4)) * 90
+        start_heading = None if start_angle is None else start_angle // 90
+        stats = {}
+        cells = heading_cells(free, start, end, forward_cost, turn_cost, start_angle, stats)
+        expected = heading_dijkstra_cost(free, start, end, forward_cost, turn_cost, start_heading)
+
+        assert (cells is None) == (expected is None), f"Mismatch from {start} to {end}:\n{free.astype(int)}"
+        if cells is not None:
+            assert np.isclose(stats["cost"], expected), f"Costlier path from {start} to {end}:\n{free.astype(int)}"
+            driven = drive_cost(free, cells, start, end, forward_cost, turn_cost, start_heading)
+            assert np.isclose(driven, expected)
+
+
+def test_bidirectional_matches_astar():
+    for free, start, end in random_problems(1500, seed=3):
+        expected = dijkstra_cost(free, start, end)
+        astar_path = astar_cells(free, start, end)
+        cells = bidirectional_cells(free, start, end)
+
+        assert (cells is None) == (expected is None), f"Mismatch from {start} to {end}:\n{free.astype(int)}"
+        assert (astar_path is None) == (expected is None)
+        if cells is not None:
+            assert path_cost(free, cells, start, end) == expected, \
+                f"Longer path from {start} to {end}:\n{free.astype(int)}"
+            assert len(cells) == len(astar_path)
+
+
+def test_astar_array_matches_legacy_astar():
+    for free, start, end in random_problems(400, seed=4, max_size=12):
+        ogm = free_map(free)
+        expected = dijkstra_cost(free, start, end)
+        legacy = astar(ogm, start, end)
+        path = astar_array(ogm, start, end)
+        cells = astar_cells(free, start, end)
+
+        assert (legacy is None) == (expected is None), f"Legacy mismatch from {start} to {end}:\n{free.astype(int)}"
+        assert (path is None) == (expected is None), f"Mismatch from {start} to {end}:\n{free.astype(int)}"
+        if path is not None:
+            assert [tuple(pos[:2]) for pos in path] == cells
+            assert path_cost(free, cells, start, end) == expected
+            # The legacy search does not count steps in g, so it is never shorter
+            legacy_cells = [tuple(pos[:2]) for pos in legacy]
+            assert len(cells) <= len(legacy_cells) == path_cost(free, legacy_cells, start, end) + 1
+
+
+def test_astar_array_no_path():
+    free = np.ones((7, 9), dtype=bool)
+    free[:, 4] = False
+    ogm = free_map(free)
+    assert astar(ogm, (1, 3), (7, 3)) is None
+    assert astar_array(ogm, (1, 3), (7, 3)) is None
+    assert astar_cells(free, (1, 3), (7, 3)) is None
+    # A start or end off the grid has no path either
+    assert astar_cells(free, (1, 3), (9, 3)) is None
+
+
+@pytest.mark.parametrize("mode", ["all", "any"])
+@pytest.mark.parametrize("level", [1, 2, 3])
+def test_hierarchical_matches_dijkstra(level, mode):
+    for free, start, end in random_problems(300, seed=10 + level, max_size=40):
+        ogm = free_map(free)
+        expected = dijkstra_cost(free, start, end)
+        stats = {}
+        path = astar_hierarchical(ogm, start, end, level=level, mode=mode, stats=stats)
+        # A corridor as wide as the map holds every path
+        wide = astar_hierarchical(ogm, start, end, level=level, corridor_radius=40, mode=mode)
+
+        assert (path is None) == (expected is None), f"Mismatch from {start} to {end}:\n{free.astype(int)}"
+        assert (wide is None) == (expected is None)
+        if path is not None:
+            cost = path_cost(free, [tuple(pos[:2]) for pos in path], start, end)
+            # Only optimal within the corridor, unless it fell back to the full map
+            assert cost >= expected
+            if stats["fallback"]:
+                assert cost == expected
+            assert path_cost(free, [tuple(pos[:2]) for pos in wide], start, end) == expected, \
+                f"Longer path from {start} to {end}:\n{free.astype(int)}"
+
+
+@pytest.mark.parametrize("mode", ["all", "any"])
+def test_hierarchical_falls_back_when_corridor_blocked(mode):
+    # A wall between start and end with a gap on the far side of the map,
+    # the coarse path goes straight across
+    free = np.ones((16, 16), dtype=bool)
+    free[:15, 8] = False
+    start, end = (2, 0), (13, 0)
+    stats = {}
+    path = astar_hierarchical(free_map(free), start, end, level=2, mode=mode, stats=stats)
+
+    assert stats["coarse_expansions"] > 0 and stats["fallback"]
+    assert path_cost(free, [tuple(pos[:2]) for pos in path], start, end) == dijkstra_cost(free, start, end)
+
+
+def test_descended_field_matches_astar():
+    for free, start, end in random_problems(1500, seed=5):
+        field = distance_field(free, end)
+        cells = descend_field(field, start)
+        astar_path = astar_cells(free, start, end)
+
+        assert (cells is None) == (astar_path is None), f"Mismatch from {start} to {end}:\n{free.astype(int)}"
+        if cells is not None:
+            assert path_cost(free, cells, start, end) == len(astar_path) - 1 == field[start[1], start[0]], \
+                f"Longer path from {start} to {end}:\n{free.astype(int)}"
+        else:
+            assert field[start[1], start[0]] == -1
+
+
+def test_distance_field_unreachable_goal():
+    free = np.ones((6, 9), dtype=bool)
+    free[:, 4] = False
+    field = distance_field(free, (7, 2))
+    assert np.all(field[:, :5] == -1) and np.all(field[:, 5:] >= 0)
+    assert descend_field(field, (1, 2)) is None
+
+    # A goal on an occupied cell or off the grid is reached from nowhere
+    for goal in ((4, 2), (9, 2), (-1, 0)):
+        field = distance_field(free, goal)
+        assert np.all(field == -1)
+        assert descend_field(field, (7, 2)) is None
@@ -0,0 +1,50 @@
+# ------------------------------------------------------------------------------
+# Name         : test_raycaster.py
+# Date Created : 10/18/2026
+# Author(s)    : Micheal Caracciolo, Chris Lloyd, Owen Casciotti
+# Github Link  : https://github.com/michealcarac/VSLAM-Mapping
+# Description  : Tests for the vectorized ray casting of the simulated environments.
+# ------------------------------------------------------------------------------
+
+import numpy as np
+
+from EnvironmentBenchmarks import get_observation_loop
+from EnvironmentClasses import Base
+from RayCaster import RayCaster, segments_array
+
+
+def test_observation_matches_loop():
+    # Rays that hit a segment exactly at its end point can go either way in the original loop,
+    # so a small number of rays is allowed to differ
+    np.random.seed(0)
+    fov = list(range(-45, 45))
+    rays = mismatches = 0
+    for trial in range(50):
+        env = Base(width=1000, height=1000, num_obstables=np.random.randint(0, 40), box_w=200, box_h=200)
+        x, y = np.random.uniform(1, 999, size=2)
+        theta = np.random.randint(0, 360)
+        expected = get_observation_loop(env, x, y, theta, fov)
+        observed = env.get_observation(x, y, theta, fov)
+        assert list(observed.keys()) == list(expected.keys())
+        for angle in expected:
+            rays += 1
+            if not np.isclose(observed[angle], expected[angle], rtol=1e-3, atol=0.05):
+                mismatches += 1
+    assert mismatches <= rays * 0.001, f"{mismatches} of {rays} rays differ"
+
+
+def test_grid_index_matches_every_segment():
+    # Box scenes and scenes of random slanted segments
+    rng = np.random.default_rng(0)
+    for trial in range(300):
+        count = int(rng.integers(1, 600))
+        if trial % 2:
+            np.random.seed(trial)
+            segments = segments_array(Base(width=1000, height=1000, num_obstables=count // 4).obstacles)
+        else:
+            segments = rng.uniform(0, 1000, size=(count, 4))
+        angles = rng.uniform(0, 2 * np.pi, 200)
+        x, y = rng.uniform(0, 1000, size=2)
+        expected = RayCaster(segments, index="none").cast(x, y, angles)
+        observed = RayCaster(segments, index="grid").cast(x, y, angles)
+        assert np.allclose(observed, expected, rtol=1e-9, atol=1e-6), f"Mismatch on trial {trial}"
@@ -0,0 +1,71 @@
+# ------------------------------------------------------------------------------
+# Name         : test_replay_buffer.py
+# Date Created : 10/18/2026
+# Author(s)    : Micheal Caracciolo, Chris Lloyd, Owen Casciotti
+# Github Link  : https://github.com/michealcarac/VSLAM-Mapping
+# Description  : Tests for the experience replay buffers.
+# ------------------------------------------------------------------------------
+
+import numpy as np
+
+from ReplayBuffer import PrioritizedReplayBuffer
+
+
+def make_buffer(capacity=1000, seed=0):
+    # A full prioritized buffer that wrapped around, with priorities set both ways
+    rng = np.random.RandomState(seed)
+    buffer = PrioritizedReplayBuffer(capacity, 8, alpha=1, rng=rng)
+    buffer.add_batch(rng.rand(capacity + 37, 8), rng.randint(0, 3, capacity + 37), rng.rand(capacity + 37),
+                     rng.rand(capacity + 37, 8), np.zeros(capacity + 37, dtype=bool))
+    assert len(buffer) == capacity and buffer.position == 37
+    for i in range(50):
+        indices = rng.randint(0, capacity, 64)
+        buffer.update_priorities(indices, rng.rand(64) * 10)
+        buffer.tree.set(rng.randint(0, capacity), rng.rand())
+    return buffer, rng
+
+
+def test_sum_tree_sums_and_search():
+    buffer, rng = make_buffer()
+    tree = buffer.tree
+    for parent, children in zip(tree.levels, tree.levels[1:]):
+        assert np.allclose(parent, children.reshape(-1, tree.fanout).sum(axis=1))
+    values = rng.rand(10000) * tree.total()
+    expected = np.minimum(np.searchsorted(np.cumsum(tree.leaves), values, side="right"), len(tree.leaves) - 1)
+    assert np.array_equal(tree.find(values), expected), "Sum tree search does not match the prefix sums"
+
+
+def test_sampling_follows_priorities():
+    buffer, _ = make_buffer()
+    trials = 20000
+    counts = np.zeros(buffer.capacity)
+    for i in range(trials):
+        np.add.at(counts, buffer.sample(32)["indices"], 1)
+    leaves = buffer.tree.leaves
+    expected = leaves[:buffer.capacity] / leaves.sum() * trials * 32
+    error = np.abs(counts - expected).sum() / counts.sum()
+    assert error < 0.05, f"Sampling is off the priorities by {error:.1%}"
+
+
+class TopEndRandomState(np.random.RandomState):
+    # Draws the largest value below one, so every sample lands at the top end of its slice
+    def rand(self, *size):
+        return np.full(size, np.nextafter(1.0, 0.0))
+
+
+def test_sampling_skips_zero_priorities():
+    rng = TopEndRandomState(0)
+    # A buffer that is not full, and a full one whose last slots have zero priority
+    partial = PrioritizedReplayBuffer(100, 8, alpha=1, rng=rng)
+    partial.add_batch(rng.random_sample((37, 8)), np.zeros(37), np.zeros(37), rng.random_sample((37, 8)),
+                      np.zeros(37, dtype=bool))
+    full, _ = make_buffer(100)
+    full.tree.update(np.arange(90, 100), 0.0)
+    full.rng = rng
+
+    for buffer in (partial, full):
+        priorities = buffer.tree.leaves.copy()
+        for batch_size in (1, 7, 32):
+            batch = buffer.sample(batch_size)
+            assert np.all(priorities[batch["indices"]] > 0)
+            assert np.all(np.isfinite(batch["weights"])) and batch["weights"].max() == 1
@@ -0,0 +1,52 @@
+# ------------------------------------------------------------------------------
+# Name         : test_rollouts.py
+# Date Created : 10/18/2026
+# Author(s)    : Micheal Caracciolo, Chris Lloyd, Owen Casciotti
+# Github Link  : https://github.com/michealcarac/VSLAM-Mapping
+# Description  : Tests for the multiprocess rollout workers.
+# ------------------------------------------------------------------------------
+
+import numpy as np
+import pytest
+
+from Rollouts import RolloutWorkers, collect_rollout, make_worker_env, mlp_weights
+
+FOV = list(range(-45, 45, 15))
+PATH = [(200, 200 + 10 * i, 90) for i in range(1, 20)]
+ENV_KWARGS = {"width": 400, "height": 400, "num_obstables": 5, "box_w": 80, "box_h": 80}
+
+
+def make_workers(env_kwargs=ENV_KWARGS, num_workers=2):
+    return RolloutWorkers(num_workers, env_kwargs, (200, 200, 90), FOV, PATH, num_agents=2,
+                          rollout_length=5, poll_interval=0.1)
+
+
+def test_worker_exception_reaches_learner():
+    with make_workers(dict(ENV_KWARGS, num_obstacles=5)) as workers:
+        with pytest.raises(RuntimeError, match="num_obstacles"):
+            workers.collect(mlp_weights(len(FOV) + 6, 4))
+
+
+def test_dead_worker_is_detected():
+    with make_workers() as workers:
+        weights = mlp_weights(len(FOV) + 6, 4)
+        workers.collect(weights)
+        workers.processes[1].kill()
+        workers.processes[1].join()
+        with pytest.raises(RuntimeError, match="exited"):
+            workers.collect(weights)
+
+
+def test_worker_rollouts_match_local_collect():
+    # The rollouts the workers write to shared memory match collecting them in this process
+    weights = mlp_weights(len(FOV) + 6, 4)
+    with make_workers() as workers:
+        local = [make_worker_env(workers.config, worker_id) for worker_id in range(workers.num_workers)]
+        for rollout in range(3):
+            buffers = workers.collect(weights, epsilon=0.2)
+            for worker_id, (vec_env, rng) in enumerate(local):
+                expected = {key: np.zeros_like(buffer[worker_id]) for key, buffer in buffers.items()}
+                collect_rollout(vec_env, weights, expected, 0.2, rng)
+                for key in expected:
+                    assert np.array_equal(buffers[key][worker_id], expected[key]), \
+                        f"{key} mismatch for worker {worker_id} in rollout {rollout}"
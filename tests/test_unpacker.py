@@ -0,0 +1,137 @@
+# ------------------------------------------------------------------------------
+# Name         : test_unpacker.py
+# Date Created : 10/18/2026
+# Author(s)    : Micheal Caracciolo, Chris Lloyd, Owen Casciotti
+# Github Link  : https://github.com/michealcarac/VSLAM-Mapping
+# Description  : Tests for reading .msg maps with the Unpacker.
+# ------------------------------------------------------------------------------
+
+import msgpack
+
+import numpy as np
+import pytest
+
+from MapBenchmarks import delete_points_loop, extract_keyframe_loop, make_map_data, write_map_file
+from MapFileUnpacker import Unpacker
+
+
+@pytest.mark.parametrize("num_keyframes", [1, 2, 50, 1000])
+def test_keyframe_positions_match_loop(num_keyframes):
+    unpack = Unpacker()
+    unpack.data = make_map_data(num_keyframes, seed=num_keyframes)
+    assert np.allclose(unpack.extract_keyframe_data(), extract_keyframe_loop(unpack.data))
+
+
+def test_keyframe_positions_of_no_keyframes():
+    unpack = Unpacker()
+    unpack.data = make_map_data(0)
+    assert unpack.extract_keyframe_data().shape == (0, 3)
+
+
+@pytest.mark.parametrize("field", ["rot_cw", "trans_cw"])
+def test_keyframe_missing_pose_is_rejected(field):
+    unpack = Unpacker()
+    unpack.data = make_map_data(10)
+    del unpack.data['keyframes']['7'][field]
+    with pytest.raises(ValueError, match=f"Keyframe 7 has no {field}"):
+        unpack.extract_keyframe_data()
+
+
+def unpack_file(map_file, **kwargs):
+    unpack = Unpacker()
+    unpack.unpackMSGmap(map_file, **kwargs)
+    return unpack.extract_keyframe_data(), unpack.extract_landmark_data(), unpack.extract_observation_data()
+
+
+@pytest.mark.parametrize("use_mmap", [False, True])
+def test_streaming_matches_unpackb(tmp_path, use_mmap):
+    map_file = str(tmp_path / "map.msg")
+    # descs and the landmark n_vis and n_fnd are not in STREAM_FIELDS and are skipped
+    write_map_file(map_file, 30, 200, num_keypoints=40, seed=3)
+    expected = unpack_file(map_file)
+    for streamed, unpacked in zip(unpack_file(map_file, streaming=True, use_mmap=use_mmap), expected):
+        assert np.array_equal(streamed, unpacked)
+
+
+def test_streaming_skips_unknown_fields_and_sections(tmp_path):
+    data = make_map_data(10, 50, seed=4)
+    data['cameras'] = {'camera': {'model': 'perspective', 'fx': 500.0}}
+    data['keyframes']['2']['ts'] = 1.5
+    data['keyframes']['3']['lm_ids'] = [-1, 4, 4, 49]
+    data['landmarks']['5']['ref_keyfrm'] = 3
+    map_file = str(tmp_path / "map.msg")
+    with open(map_file, "wb") as msg_pack_file:
+        msg_pack_file.write(msgpack.packb(data))
+
+    unpack = Unpacker()
+    unpack.unpackMSGmap(map_file, streaming=True)
+    assert set(unpack.streamed) == {'keyframes', 'landmarks', 'rot_cw', 'trans_cw', 'lm_ids', 'pos_w'}
+    # Keyframes without lm_ids observe nothing, like kf.get('lm_ids', []) on the unpackb path
+    assert [len(ids) for ids in unpack.streamed['lm_ids']] == [0, 0, 0, 4] + [0] * 6
+    expected = unpack_file(map_file)
+    for streamed, unpacked in zip(unpack_file(map_file, streaming=True), expected):
+        assert np.array_equal(streamed, unpacked)
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_truncated_file_is_rejected(tmp_path, streaming):
+    map_file = str(tmp_path / "map.msg")
+    write_map_file(map_file, 10, 50, num_keypoints=10)
+    with open(map_file, "rb") as msg_pack_file:
+        contents = msg_pack_file.read()
+    with open(map_file, "wb") as msg_pack_file:
+        msg_pack_file.write(contents[:len(contents) // 2])
+
+    with pytest.raises(ValueError, match="incomplete input"):
+        Unpacker().unpackMSGmap(map_file, streaming=streaming)
+
+
+def points_with_outliers(outliers):
+    """
+    Returns a 5x5x5 lattice of inliers in [-1, 1] with the given outlier
+    points inserted, and the indexes of the outliers.
+    """
+    lattice = np.stack(np.meshgrid(*[np.linspace(-1, 1, 5)] * 3), axis=-1).reshape(-1, 3)
+    outliers = np.asarray(outliers, dtype=float)
+    outlier_indexes = np.arange(len(outliers)) * 4 + 3
+    points = np.insert(lattice, outlier_indexes - np.arange(len(outliers)), outliers, axis=0)
+    assert np.array_equal(points[outlier_indexes], outliers)
+    return points, outlier_indexes
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_sequential_outliers_match_loop(seed):
+    landmarks = np.random.default_rng(seed).standard_t(3, size=(5000, 3))
+    keep = Unpacker().filter_outliers(landmarks, mode="sequential")
+    assert np.all(np.diff(keep) > 0)
+    assert np.array_equal(landmarks[keep], delete_points_loop(landmarks))
+
+
+@pytest.mark.parametrize("mode", ["combined", "mad"])
+def test_outliers_are_dropped(mode):
+    points, outlier_indexes = points_with_outliers([[50, 0, 0], [0, -60, 0], [0, 0, 40]])
+    keep = Unpacker().filter_outliers(points, mode=mode)
+    assert np.array_equal(keep, np.setdiff1d(np.arange(len(points)), outlier_indexes))
+
+
+def test_mad_outliers_survive_masking():
+    # So many outliers that they inflate the std past themselves, the MAD is not moved
+    points, outlier_indexes = points_with_outliers([[8, 0, 0]] * 30)
+    inliers = np.setdiff1d(np.arange(len(points)), outlier_indexes)
+    unpack = Unpacker()
+    assert np.array_equal(unpack.filter_outliers(points, mode="mad"), inliers)
+    assert np.array_equal(unpack.filter_outliers(points, mode="combined"), np.arange(len(points)))
+
+
+@pytest.mark.parametrize("far_points", [[], [[0, 1e9, 0], [0, 0, -1e9]]])
+def test_voxel_keeps_first_point_per_voxel(far_points):
+    # The far points give too many voxels for one integer key per voxel
+    points = np.array([[0.01, 0.0, 0.0], [0.02, 0.01, 0.04], [0.06, 0.0, 0.0], [-0.01, 0.0, 0.0],
+                       [0.07, 0.04, 0.0], [-0.04, -0.0, 0.01], [0.0, 0.06, -0.06]] + far_points)
+    keep = Unpacker().filter_outliers(points, mode="voxel", voxel_size=0.05)
+    assert np.array_equal(keep, [0, 2, 3, 6] + list(range(7, len(points))))
+
+
+def test_unknown_outlier_mode_is_rejected():
+    with pytest.raises(ValueError, match="Unknown outlier mode"):
+        Unpacker().filter_outliers(np.zeros((3, 3)), mode="median")
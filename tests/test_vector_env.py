@@ -0,0 +1,40 @@
+# ------------------------------------------------------------------------------
+# Name         : test_vector_env.py
+# Date Created : 10/18/2026
+# Author(s)    : Micheal Caracciolo, Chris Lloyd, Owen Casciotti
+# Github Link  : https://github.com/michealcarac/VSLAM-Mapping
+# Description  : Tests for the batched vectorized environment.
+# ------------------------------------------------------------------------------
+
+import numpy as np
+
+from EnvironmentBenchmarks import manual_move
+from EnvironmentClasses import Base
+from VectorEnvironment import VectorEnvironment
+
+
+def test_vector_env_matches_manual_move():
+    # Stepping every agent at once moves and observes like one agent at a time
+    np.random.seed(0)
+    num_agents, num_steps = 32, 300
+    env = Base(width=400, height=400, num_obstables=15, box_w=80, box_h=80)
+    fov = list(range(-45, 45, 5))
+    vec_env = VectorEnvironment(env, num_agents, (200, 200, 90), fov, [(-1000, -1000, 0)],
+                                max_steps=num_steps + 1, jitter=0)
+    vec_env.theta[:] = np.random.randint(0, 72, num_agents) * 5
+    states = [[x, y, theta] for x, y, theta in zip(vec_env.x, vec_env.y, vec_env.theta)]
+    hits = 0
+    for step in range(num_steps):
+        moves = np.random.choice(3, num_agents, p=[0.6, 0.2, 0.2])
+        observation, reward, done = vec_env.step(moves)
+        for i, state in enumerate(states):
+            hit = manual_move(env, state, moves[i])
+            assert hit == done[i], f"Collision mismatch for agent {i} on step {step}"
+            if hit:
+                # Put the reference agent where the vectorized environment reset it
+                state[:] = [vec_env.x[i], vec_env.y[i], vec_env.theta[i]]
+                hits += 1
+            expected = list(env.get_observation(state[0], state[1], state[2], fov).values())
+            assert np.allclose(observation[i, :len(fov)], expected), f"Observation mismatch for agent {i}"
+            assert np.allclose(observation[i, len(fov):len(fov) + 3], state)
+    assert hits